@@ -17,9 +17,9 @@ import json
 import math
 import threading
 from datetime import datetime
-import yfinance as yf
 import pandas as pd
 import backtrader as bt
+from candle_store import load_yf_history
 
 STATE_FILE = 'trendbot_state.json'
 TRADES_FILE = 'trendbot_trades.csv'
@@ -243,18 +243,7 @@ class AsymmetricStrat(bt.Strategy):
 
 def main():
     DAYS = 60
-    df = yf.download('SPXL', period=f'{DAYS}d', interval='1d', auto_adjust=True)
-    df.dropna(inplace=True)
-    # normalize
-    new_cols = []
-    for c in df.columns:
-        if isinstance(c, tuple):
-            new_cols.append(str(c[0]).lower())
-        else:
-            new_cols.append(str(c).lower())
-    df.columns = new_cols
-    if 'adj close' in df.columns and 'close' not in df.columns:
-        df['close'] = df['adj close']
+    df = load_yf_history('SPXL', days=DAYS, interval='1d')
     for req in ('open', 'high', 'low', 'close', 'volume'):
         if req not in df.columns:
             raise RuntimeError(f'missing required column from data: {req}')
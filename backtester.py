@@ -5,8 +5,22 @@ Backtest forex strategies using historical OANDA data with Backtrader.
 import backtrader as bt
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import contextlib
+import io
+import itertools
 import math
+import os
 
+import vector_backtester
+from indicators import sma, crossover
+from result_cache import ResultCache, data_digest, result_key, source_digest
+from shared_prices import SharedPriceData, attach
+from vector_backtester import VectorizedBacktester
+
+
+# Commission per side (0.01%, typical for forex)
+COMMISSION = 0.0001
 
 class ForexStrategy(bt.Strategy):
     """
@@ -117,15 +131,102 @@ class ForexStrategy(bt.Strategy):
                 self.order = self.close()
 
 
+# Parameters a sweep grid may vary (run_backtest keyword arguments)
+SWEEP_PARAMS = ('short_ma', 'long_ma', 'risk_per_trade', 'stop_loss_pct', 'take_profit_pct')
+
+# Price data of the current sweep, set once per worker process
+_sweep_data = None
+_sweep_memory = None
+_sweep_digest = None
+_sweep_cache = None
+
+
+def expand_grid(grid):
+    """
+    Expand a parameter grid into parameter combinations.
+    
+    Args:
+        grid: dict of parameter -> list of values (all combinations are
+            taken), or a list of parameter dicts
+        
+    Returns:
+        List of parameter dicts; combinations with short_ma >= long_ma are dropped
+    """
+    if isinstance(grid, dict):
+        names = list(grid)
+        combos = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    else:
+        combos = [dict(params) for params in grid]
+    
+    for params in combos:
+        unknown = set(params) - set(SWEEP_PARAMS)
+        if unknown:
+            raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    
+    return [
+        params for params in combos
+        if params.get('short_ma', 50) < params.get('long_ma', 200)
+    ]
+
+
+def _init_sweep_worker(data_df, cache=None, digest=None):
+    """Keep the sweep's price data in the worker, so tasks only carry parameters."""
+    global _sweep_data, _sweep_cache, _sweep_digest
+    _sweep_data = data_df
+    _sweep_cache = cache
+    _sweep_digest = digest
+
+
+def _attach_sweep_worker(handle, cache=None, digest=None):
+    """Attach a worker to the sweep's shared price data (see shared_prices)."""
+    global _sweep_memory
+    _sweep_memory, data_df = attach(handle)
+    _init_sweep_worker(data_df, cache, digest)
+
+
+def _run_sweep_chunk(combos, initial_cash, engine):
+    """
+    Run a batch of sweep combinations on the worker's price data.
+    
+    Returns:
+        List of (params, results) with results None if the backtest failed
+    """
+    output = []
+    for params in combos:
+        try:
+            # Keep the Backtrader engine's per-order log out of the sweep output
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = ForexBacktester(cache=_sweep_cache).run_backtest(
+                    _sweep_data, initial_cash=initial_cash, engine=engine,
+                    data_digest=_sweep_digest, **params
+                )
+        except Exception as e:
+            print(f"Error running backtest {params}: {e}")
+            results = None
+        output.append((params, results))
+    return output
+
+
 class ForexBacktester:
     """
     Backtester for forex strategies using historical data.
     """
     
-    def __init__(self):
-        """Initialize backtester."""
+    def __init__(self, cache=None):
+        """
+        Initialize backtester.
+        
+        Args:
+            cache: ResultCache for run_backtest results, True for the
+                default on-disk cache (backtest_cache/), or None to
+                always recompute
+        """
         self.cerebro = None
         self.results = {}
+        self.cache = ResultCache() if cache is True else (cache or None)
+        
+        # Inputs of the last run, to replay it with Backtrader for a plot
+        self._last_run = None
         
     def prepare_data(self, df):
         """
@@ -148,10 +249,15 @@ class ForexBacktester:
         return data
     
     def run_backtest(self, data_df, initial_cash=10000, short_ma=50, long_ma=200,
-                     risk_per_trade=0.01, stop_loss_pct=0.01, take_profit_pct=0.02):
+                     risk_per_trade=0.01, stop_loss_pct=0.01, take_profit_pct=0.02,
+                     engine='backtrader', data_digest=None):
         """
         Run backtest with given parameters.
         
+        With a result cache, results are looked up there first (keyed by
+        the data content, strategy source, parameters, commission and
+        initial cash) and stored there after a run.
+        
         Args:
             data_df: DataFrame with OHLCV data
             initial_cash: Initial capital
@@ -160,10 +266,63 @@ class ForexBacktester:
             risk_per_trade: Risk per trade (fraction)
             stop_loss_pct: Stop-loss percentage
             take_profit_pct: Take-profit percentage
+            engine: 'backtrader' (event loop, plots) or 'vectorized'
+                (NumPy, same results, no per-order log)
+            data_digest: Precomputed result_cache.data_digest(data_df)
             
         Returns:
             dict with backtest results
         """
+        if engine not in ('backtrader', 'vectorized'):
+            raise ValueError(f"Unknown engine: {engine}")
+        
+        params = {
+            'short_ma': short_ma,
+            'long_ma': long_ma,
+            'risk_per_trade': risk_per_trade,
+            'stop_loss_pct': stop_loss_pct,
+            'take_profit_pct': take_profit_pct,
+        }
+        
+        self._last_run = (data_df, initial_cash, params)
+        key = self._cache_key(data_df, data_digest, params, initial_cash, engine)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                print(f"Using cached backtest results ({key[:12]})")
+                self.cerebro = None
+                self.results = cached
+                return self.results
+        
+        self._run_backtest(data_df, initial_cash, engine, **params)
+        
+        if key is not None:
+            self.cache.put(key, self.results)
+        return self.results
+    
+    def _cache_key(self, data_df, digest, params, initial_cash, engine):
+        """Get the result cache key for a run, or None without a cache."""
+        if self.cache is None or STRATEGY_VERSION is None:
+            return None
+        try:
+            digest = digest or data_digest(data_df)
+        except Exception as e:
+            print(f"Error hashing backtest data: {e}")
+            return None
+        return result_key(digest, ForexStrategy.__name__, STRATEGY_VERSION, params,
+                          COMMISSION, initial_cash, engine)
+    
+    def _run_backtest(self, data_df, initial_cash, engine, short_ma, long_ma,
+                      risk_per_trade, stop_loss_pct, take_profit_pct):
+        """Run a backtest on the chosen engine and set self.results."""
+        if engine == 'vectorized':
+            self.cerebro = None
+            self.results = VectorizedBacktester(commission=COMMISSION).run_backtest(
+                data_df, initial_cash, short_ma, long_ma,
+                risk_per_trade, stop_loss_pct, take_profit_pct
+            )
+            return self.results
+        
         # Initialize Cerebro
         self.cerebro = bt.Cerebro()
         
@@ -183,7 +342,7 @@ class ForexBacktester:
         
         # Set broker parameters
         self.cerebro.broker.setcash(initial_cash)
-        self.cerebro.broker.setcommission(commission=0.0001)  # 0.01% commission (typical for forex)
+        self.cerebro.broker.setcommission(commission=COMMISSION)
         
         # Add analyzers
         self.cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
@@ -222,6 +381,107 @@ class ForexBacktester:
         
         return self.results
     
+    def iter_sweep(self, grid, data, workers=None, initial_cash=10000, engine='vectorized',
+                   chunksize=None):
+        """
+        Run a parameter grid across a process pool, yielding results as they finish.
+        
+        The price columns are placed once in shared memory and workers
+        attach to them zero-copy; tasks carry only batches of parameter
+        dicts.
+        
+        Args:
+            grid: Parameter grid (see expand_grid)
+            data: DataFrame with OHLCV data
+            workers: Number of processes (default: CPU count; 1 runs in-process)
+            initial_cash: Initial capital
+            engine: Backtest engine for each combination (see run_backtest)
+            chunksize: Combinations per task (default: about 4 tasks per worker)
+            
+        Yields:
+            (params, results) in completion order; failed combinations are skipped
+        """
+        combos = expand_grid(grid)
+        if not combos:
+            return
+        
+        workers = workers or os.cpu_count() or 1
+        workers = min(workers, len(combos))
+        if chunksize is None:
+            chunksize = max(1, min(64, math.ceil(len(combos) / (workers * 4))))
+        chunks = [combos[i:i + chunksize] for i in range(0, len(combos), chunksize)]
+        
+        # Hash the data once for every combination's result cache lookup
+        digest = None
+        if self.cache is not None:
+            try:
+                digest = data_digest(data)
+            except Exception as e:
+                print(f"Error hashing backtest data: {e}")
+        
+        if workers == 1:
+            _init_sweep_worker(data, self.cache, digest)
+            try:
+                for chunk in chunks:
+                    for params, results in _run_sweep_chunk(chunk, initial_cash, engine):
+                        if results is not None:
+                            yield params, results
+            finally:
+                _init_sweep_worker(None)
+            return
+        
+        with SharedPriceData(data) as shared, \
+                ProcessPoolExecutor(max_workers=workers, initializer=_attach_sweep_worker,
+                                    initargs=(shared.handle, self.cache, digest)) as executor:
+            futures = [executor.submit(_run_sweep_chunk, chunk, initial_cash, engine) for chunk in chunks]
+            try:
+                for future in as_completed(futures):
+                    for params, results in future.result():
+                        if results is not None:
+                            yield params, results
+            finally:
+                for future in futures:
+                    future.cancel()
+    
+    def sweep(self, grid, data, workers=None, initial_cash=10000, engine='vectorized',
+              rank_by='sharpe_ratio', ascending=False, callback=None, chunksize=None):
+        """
+        Backtest every combination of a parameter grid in parallel.
+        
+        Args:
+            grid: dict of parameter -> list of values, or a list of parameter dicts
+            data: DataFrame with OHLCV data
+            workers: Number of processes (default: CPU count)
+            initial_cash: Initial capital
+            engine: 'vectorized' (default) or 'backtrader'
+            rank_by: Results column to rank by
+            ascending: Rank the smallest values first (e.g., for max_drawdown)
+            callback: Optional function(params, results) called as each
+                combination finishes
+            chunksize: Combinations per task
+            
+        Returns:
+            DataFrame with one row per combination (parameters and results
+            columns), best first
+        """
+        rows = []
+        combos = len(expand_grid(grid))
+        print(f"Sweeping {combos} parameter combinations...")
+        
+        for params, results in self.iter_sweep(grid, data, workers, initial_cash, engine, chunksize):
+            rows.append({**params, **results})
+            if callback:
+                callback(params, results)
+        
+        print(f"Sweep completed: {len(rows)}/{combos} combinations")
+        if not rows:
+            return pd.DataFrame()
+        
+        table = pd.DataFrame(rows)
+        table[rank_by] = pd.to_numeric(table[rank_by])
+        table = table.sort_values(rank_by, ascending=ascending, na_position='last', kind='stable')
+        return table.reset_index(drop=True)
+    
     def print_results(self):
         """Print backtest results."""
         if not self.results:
@@ -245,22 +505,51 @@ class ForexBacktester:
         print("=" * 50 + "\n")
     
     def plot_results(self):
-        """Plot backtest results."""
+        """
+        Plot backtest results.
+        
+        Results served from the cache or the vectorized engine have no
+        Backtrader run behind them, so the last backtest is rerun with
+        Backtrader first.
+        """
+        if self.cerebro is None and self._last_run is not None:
+            print("Rerunning backtest with Backtrader to plot it")
+            data_df, initial_cash, params = self._last_run
+            results = self.results
+            self._run_backtest(data_df, initial_cash, 'backtrader', **params)
+            self.results = results
         if self.cerebro:
             self.cerebro.plot(style='candlestick')
 
 
-def run_sample_backtest(broker_connector, symbol='EUR/USD', timeframe='1h'):
+# Cached results are keyed on the source of the code that produces them, so
+# editing the strategy rules or either engine invalidates the old entries
+# (None, if the source is unavailable, disables the cache)
+STRATEGY_VERSION = source_digest(ForexStrategy, ForexBacktester._run_backtest, vector_backtester, sma, crossover)
+
+
+def run_sample_backtest(broker_connector, symbol='EUR/USD', timeframe='1h', limit=500,
+                        start=None, end=None):
     """
     Run a sample backtest with historical data from OANDA.
     
+    History is served from the connector's candle store when available,
+    so only bars missing locally are downloaded.
+    
     Args:
         broker_connector: OANDAConnector instance
         symbol: Trading pair
         timeframe: Timeframe for data
+        limit: Number of candles to backtest on (ignored when start is given)
+        start: Backtest from this date (e.g., '2020-01-01'); the range is
+            backfilled page by page, so multi-year runs are possible
+        end: Backtest up to this date (defaults to now)
     """
     print(f"Fetching historical data for {symbol}...")
-    df = broker_connector.get_ohlcv(symbol, timeframe, limit=500)
+    if start is not None:
+        df = broker_connector.backfill(symbol, timeframe, start, end)
+    else:
+        df = broker_connector.get_ohlcv(symbol, timeframe, limit=limit)
     
     if df.empty:
         print("Failed to fetch data")
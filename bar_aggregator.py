@@ -0,0 +1,144 @@
+"""
+Bar Aggregator Module
+Builds OHLCV bars locally from a tick stream.
+
+Each tick updates the forming bar of every tracked timeframe in constant
+time. When a tick lands in a new time bucket (or `flush()` is called after
+a boundary), the previous bar is closed, handed to the sink (for example
+OANDAConnector.ingest_bars) and announced through `on_bar_close`.
+"""
+import threading
+import time
+
+from candle_store import timeframe_to_ms
+
+
+DEFAULT_TIMEFRAMES = ('1m', '5m', '15m', '1h', '4h', '1d')
+
+
+class BarAggregator:
+    """
+    Tick-to-bar aggregator.
+
+    Bars are lists of [timestamp, open, high, low, close, volume] with the
+    timestamp (ms) marking the bar start, matching ccxt's OHLCV rows.
+    Volume is the tick count, like OANDA's candle volume. `on_tick` and
+    `flush` may be called from different threads (a stream and a timer);
+    the sink and callbacks run after the aggregator is unlocked, so a slow
+    callback does not hold up tick ingestion.
+    """
+
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES, on_bar_close=None, sink=None, price='mid'):
+        """
+        Initialize aggregator.
+
+        Args:
+            timeframes: Timeframes to build (e.g., ['1m', '1h'])
+            on_bar_close: Callback(symbol, timeframe, bar) for each closed bar
+            sink: Callback(symbol, timeframe, bars) that stores closed bars
+            price: Tick field to aggregate ('mid', 'bid' or 'ask')
+        """
+        self.timeframes = {tf: timeframe_to_ms(tf) for tf in timeframes}
+        self.on_bar_close = on_bar_close
+        self.sink = sink
+        self.price = price
+
+        # (symbol, timeframe) -> forming bar
+        self.bars = {}
+        # (symbol, timeframe) -> start of the newest bar seen
+        self._starts = {}
+        # Keys whose forming bar started before the first tick we saw
+        self._partial = set()
+        self.lock = threading.Lock()
+
+    def on_tick(self, tick):
+        """
+        Add a tick to every timeframe's forming bar.
+
+        Args:
+            tick: price_stream.Tick
+        """
+        with self.lock:
+            closed = self._add_tick(tick)
+        self._emit(closed)
+
+    def _add_tick(self, tick):
+        """Update the forming bars and get the (key, bar) pairs closed by the tick."""
+        price = getattr(tick, self.price)
+        ts = tick.timestamp
+        closed = []
+
+        for timeframe, length in self.timeframes.items():
+            key = (tick.symbol, timeframe)
+            start = ts - ts % length
+            bar = self.bars.get(key)
+
+            if bar is not None:
+                if start == bar[0]:
+                    if price > bar[2]:
+                        bar[2] = price
+                    elif price < bar[3]:
+                        bar[3] = price
+                    bar[4] = price
+                    bar[5] += 1
+                    continue
+                if start < bar[0]:
+                    continue  # Late tick for an already closed bar
+                self._close(key, bar, closed)
+            elif key in self._starts:
+                if start <= self._starts[key]:
+                    continue  # Late tick for a bar closed by flush()
+            elif ts != start:
+                # Joined mid-bar: we cannot know its true open/high/low
+                self._partial.add(key)
+
+            self.bars[key] = [start, price, price, price, price, 1]
+            self._starts[key] = start
+
+        return closed
+
+    def flush(self, now=None):
+        """
+        Close every forming bar whose period has ended.
+
+        Call this from a timer just after bar boundaries so bars close on
+        time even when no tick arrives.
+
+        Args:
+            now: Current time in ms (defaults to the wall clock)
+
+        Returns:
+            Number of bars closed
+        """
+        now = int(time.time() * 1000) if now is None else now
+        closed = []
+        ended = 0
+        with self.lock:
+            for key, bar in list(self.bars.items()):
+                if bar[0] + self.timeframes[key[1]] <= now:
+                    del self.bars[key]
+                    self._close(key, bar, closed)
+                    ended += 1
+        self._emit(closed)
+        return ended
+
+    def current_bar(self, symbol, timeframe):
+        """Get the forming bar for (symbol, timeframe), or None."""
+        with self.lock:
+            bar = self.bars.get((symbol, timeframe))
+            return list(bar) if bar else None
+
+    def _close(self, key, bar, closed):
+        # Called with the lock held; partial bars are dropped, not announced
+        if key in self._partial:
+            self._partial.discard(key)
+            return
+        closed.append((key, bar))
+
+    def _emit(self, closed):
+        """Hand closed bars to the sink and callback (without the lock held)."""
+        for (symbol, timeframe), bar in closed:
+            if self.sink:
+                self.sink(symbol, timeframe, [bar])
+            if self.on_bar_close:
+                self.on_bar_close(symbol, timeframe, bar)
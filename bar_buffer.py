@@ -0,0 +1,143 @@
+"""
+Bar Buffer Module
+Fixed-size per-pair bar history for the live strategy path.
+
+Each column is preallocated at twice the capacity and every bar is
+written to two slots, `i` and `i + capacity`. The newest `n` bars are
+therefore always one contiguous slice, so windows are NumPy views: no
+copy, no wrap-around handling, and constant memory per pair. Appending
+a bar and updating the forming bar are O(1).
+"""
+import numpy as np
+import pandas as pd
+
+from candle_store import frame_to_columns
+
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class BarRingBuffer:
+    """
+    Ring buffer of OHLCV bars with zero-copy contiguous windows.
+
+    `buffer['close']` returns a read-only view of the close prices, oldest
+    first, so it can be used where a DataFrame column would be.
+    """
+
+    def __init__(self, capacity=250, dtype=np.float64):
+        """
+        Initialize buffer.
+
+        Args:
+            capacity: Number of bars kept
+            dtype: Price/volume dtype
+        """
+        self.capacity = capacity
+        self.timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self.values = np.zeros((len(PRICE_FIELDS), 2 * capacity), dtype=dtype)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, field):
+        if field == 'timestamp':
+            return self._view(self.timestamps)
+        return self._view(self.values[PRICE_FIELDS.index(field)])
+
+    def _view(self, column, n=None):
+        n = self.size if n is None else min(n, self.size)
+        end = self.start + self.size
+        view = column[..., end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def last_timestamp(self):
+        """Get the newest bar's timestamp in ms, or None if empty."""
+        if self.size == 0:
+            return None
+        return int(self.timestamps[self.start + self.size - 1])
+
+    def append(self, timestamp, open_, high, low, close, volume):
+        """Add a bar after the newest one, dropping the oldest when full."""
+        if self.size < self.capacity:
+            slot = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            slot = self.start
+            self.start = (self.start + 1) % self.capacity
+        self._write(slot, timestamp, (open_, high, low, close, volume))
+
+    def update_last(self, open_, high, low, close, volume):
+        """Overwrite the newest (forming) bar in place."""
+        slot = (self.start + self.size - 1) % self.capacity
+        self._write(slot, self.timestamps[slot], (open_, high, low, close, volume))
+
+    def _write(self, slot, timestamp, row):
+        mirror = slot + self.capacity
+        self.timestamps[slot] = timestamp
+        self.timestamps[mirror] = timestamp
+        self.values[:, slot] = row
+        self.values[:, mirror] = row
+
+    def extend(self, bars):
+        """
+        Merge [timestamp, open, high, low, close, volume] rows.
+
+        Rows older than the newest bar are ignored, a row with the newest
+        bar's timestamp updates it in place, newer rows are appended.
+
+        Returns:
+            Number of bars appended
+        """
+        appended = 0
+        for bar in bars:
+            last = self.last_timestamp()
+            ts = int(bar[0])
+            if last is not None and ts < last:
+                continue
+            if ts == last:
+                self.update_last(*bar[1:6])
+            else:
+                self.append(ts, *bar[1:6])
+                appended += 1
+        return appended
+
+    def update(self, df):
+        """
+        Merge a timestamp-indexed OHLCV DataFrame, touching only new rows.
+
+        Returns:
+            Number of bars appended
+        """
+        if df is None or df.empty:
+            return 0
+        columns = frame_to_columns(df)
+        timestamps = columns['timestamp']
+        first = 0
+        last = self.last_timestamp()
+        if last is not None:
+            first = int(np.searchsorted(timestamps, last, side='left'))
+        rows = np.column_stack([timestamps[first:]] + [columns[f][first:] for f in PRICE_FIELDS])
+        return self.extend(rows.tolist())
+
+    def window(self, n=None):
+        """
+        Get the newest `n` bars as read-only column views.
+
+        Returns:
+            dict of column name -> NumPy view, oldest bar first
+        """
+        result = {'timestamp': self._view(self.timestamps, n)}
+        block = self._view(self.values, n)
+        for i, field in enumerate(PRICE_FIELDS):
+            result[field] = block[i]
+        return result
+
+    def frame(self, n=None):
+        """Get the newest `n` bars as a DataFrame backed by the buffer."""
+        block = self._view(self.values, n)
+        index = pd.DatetimeIndex(self._view(self.timestamps, n).view('datetime64[ms]'), name='timestamp')
+        return pd.DataFrame(block.T, index=index, columns=list(PRICE_FIELDS), copy=False)
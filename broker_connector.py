@@ -2,16 +2,169 @@
 Broker Connector Module
 Handles connection to OANDA broker via CCXT library for forex trading.
 """
+import asyncio
+import itertools
 import ccxt
+import ccxt.async_support as ccxt_async
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from candle_store import CandleStore, timeframe_to_ms, to_ms
+from resampler import TimeframeResampler, can_derive
+from rate_limiter import RequestLimiter, AsyncRequestLimiter
 
 
-class OANDAConnector:
-    """Connects to OANDA broker using CCXT library."""
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# OANDA returns at most 5000 candles per request
+MAX_CANDLES_PER_REQUEST = 5000
+
+# Forex has no weekend bars, so time windows need slack to hold `limit` bars
+WEEKEND_SLACK = 1.4
+
+
+def candles_to_columns(ohlcv):
+    """
+    Convert ccxt OHLCV rows to a (6, n) float64 column block in one pass.
+    
+    Row 0 holds the ms timestamps (exact in float64), rows 1-5 hold
+    open/high/low/close/volume. No per-candle Python objects are created.
+    """
+    n = len(ohlcv)
+    try:
+        flat = np.fromiter(itertools.chain.from_iterable(ohlcv), dtype=np.float64, count=n * 6)
+    except (TypeError, ValueError):
+        # Missing values (None) need NumPy's slower NaN-aware conversion
+        flat = np.array(ohlcv, dtype=np.float64).reshape(-1)
+    return flat.reshape(n, 6).T
+
+
+def candles_to_frame(ohlcv, dtype=np.float64):
+    """
+    Convert ccxt OHLCV rows to a timestamp-indexed DataFrame.
+    
+    Args:
+        ohlcv: List of [timestamp, open, high, low, close, volume] rows
+        dtype: Price/volume dtype (np.float64 or np.float32)
+        
+    Returns:
+        DataFrame backed by a single contiguous NumPy block
+    """
+    block = candles_to_columns(ohlcv)
+    index = pd.DatetimeIndex(block[0].astype(np.int64).view('datetime64[ms]'), name='timestamp')
+    values = np.ascontiguousarray(block[1:], dtype=dtype)
+    return pd.DataFrame(values.T, index=index, columns=OHLCV_COLUMNS[1:], copy=False)
+
+
+def dedupe_candles(df):
+    """Sort candles by time and keep the newest copy of duplicated bars."""
+    if df.index.is_monotonic_increasing and df.index.is_unique:
+        return df
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+def merge_candles(cached, new, limit):
+    """
+    Merge freshly fetched candles into cached history.
+    
+    Args:
+        cached: DataFrame with previously known candles
+        new: DataFrame with candles fetched since the last cached bar
+        limit: Page size used for the incremental fetch
+        
+    Returns:
+        Merged DataFrame, or None if a full refetch is needed
+    """
+    # A full page means the gap may not be bridged yet
+    if len(new) >= limit:
+        return None
+    df = dedupe_candles(pd.concat([cached, new]))
+    return df if len(df) >= limit else None
+
+
+def page_bounds(start_ms, end_ms, timeframe, page_size, reverse=False):
+    """
+    Split [start_ms, end_ms) into broker-sized pages.
     
-    def __init__(self, api_key, account_id, practice=True):
+    Args:
+        start_ms: Range start (ms)
+        end_ms: Range end (ms, exclusive)
+        timeframe: Timeframe
+        page_size: Candles per page
+        reverse: Order pages newest first
+        
+    Returns:
+        List of (page_start, page_end) tuples in fetch order
+    """
+    step = page_size * timeframe_to_ms(timeframe)
+    bounds = [(t, min(t + step, end_ms)) for t in range(start_ms, end_ms, step)]
+    return bounds[::-1] if reverse else bounds
+
+
+def _closed_bars(df, tf_ms, now_ms):
+    """Drop bars that have not closed by `now_ms`."""
+    starts = (df.index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1)
+    return df[starts + tf_ms <= now_ms]
+
+
+def since_last_candle(cached):
+    """Get the ccxt `since` value (ms) for topping up cached candles."""
+    return int(cached.index[-1].timestamp() * 1000)
+
+
+class AccountSnapshot:
+    """
+    Short-lived cache of account state (balance, positions).
+    
+    Entries expire after `ttl` seconds and are dropped explicitly whenever
+    an order is sent, so readers never see pre-fill state for long.
+    """
+    
+    def __init__(self, ttl=5.0):
+        """
+        Initialize snapshot cache.
+        
+        Args:
+            ttl: Seconds a fetched value stays valid
+        """
+        self.ttl = ttl
+        self._entries = {}
+    
+    def get(self, name):
+        """Get a cached value, or None if missing or expired."""
+        entry = self._entries.get(name)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+    
+    def put(self, name, value):
+        """Cache a freshly fetched value."""
+        self._entries[name] = (time.monotonic(), value)
+    
+    def invalidate(self):
+        """Drop all cached account state."""
+        self._entries.clear()
+
+
+class OANDAConnectorBase:
+    """
+    State and helpers shared by the blocking and asyncio OANDA connectors.
+    
+    Holds the candle cache and store, the account snapshot and the
+    resampler, and everything that does not talk to the broker: parsing
+    responses, merging candles and planning backfill pages. Subclasses
+    add the request methods, either blocking (OANDAConnector) or as
+    coroutines (AsyncOANDAConnector).
+    """
+    
+    # ccxt package the exchange is created from, and the limiter it uses
+    ccxt_module = ccxt
+    limiter_class = RequestLimiter
+    
+    def __init__(self, api_key, account_id, practice=True, store=None, snapshot_ttl=5.0,
+                 base_timeframe=None, limiter=None, exchange=None, price_dtype=np.float64):
         """
         Initialize OANDA connection.
         
@@ -19,13 +172,23 @@ class OANDAConnector:
             api_key: OANDA API key
             account_id: OANDA account ID
             practice: True for practice account, False for live
+            store: CandleStore for persisted history (None for the default
+                local store, False to disable persistence)
+            snapshot_ttl: Seconds balance/positions are reused before refetching
+            base_timeframe: If set (e.g., '5m'), only this timeframe is
+                downloaded and coarser timeframes are derived from it
+            limiter: RequestLimiter shared with other connectors on the same
+                account (a private one is created if None)
+            exchange: ccxt-compatible exchange to use instead of creating
+                one (e.g., broker_replay.ReplayExchange)
+            price_dtype: dtype for candle prices (np.float32 halves memory)
         """
         self.api_key = api_key
         self.account_id = account_id
         self.practice = practice
         
         # Initialize CCXT OANDA exchange
-        self.exchange = ccxt.oanda({
+        self.exchange = exchange or self.ccxt_module.oanda({
             'apiKey': api_key,
             'accountId': account_id,
             'practice': practice,
@@ -34,55 +197,521 @@ class OANDAConnector:
         self.positions = {}
         self.orders = []
         
-    def get_balance(self):
-        """Get account balance."""
+        # Candle history per (symbol, timeframe), topped up incrementally
+        self._candles = {}
+        # Oldest bar (ms) per (symbol, timeframe) built from ticks rather than
+        # fetched; the next top-up refetches from there and only broker
+        # candles are persisted
+        self._local_bars = {}
+        self.store = CandleStore() if store is None else (store or None)
+        self.account_snapshot = AccountSnapshot(snapshot_ttl)
+        self.base_timeframe = base_timeframe
+        self.resampler = TimeframeResampler(base_timeframe) if base_timeframe else None
+        self.price_dtype = price_dtype
+        
+        # Every broker request goes through one throttled, coalescing gate
+        self.limiter = limiter or self.limiter_class()
+    
+    @staticmethod
+    def _request_key(method, args, kwargs, coalesce):
+        """Coalescing key of a request, or None if it must always be sent."""
+        return (method, args, tuple(sorted(kwargs.items()))) if coalesce else None
+    
+    def request_stats(self):
+        """Get broker request counters (sent, throttled, coalesced)."""
+        return self.limiter.stats()
+    
+    def _parse_balance(self, balance):
+        """Turn a ccxt balance into USD totals and cache them."""
+        balance = {
+            'total': balance.get('total', {}).get('USD', 0),
+            'free': balance.get('free', {}).get('USD', 0),
+            'used': balance.get('used', {}).get('USD', 0)
+        }
+        self.account_snapshot.put('balance', balance)
+        return balance
+    
+    def _parse_positions(self, positions):
+        """Key open ccxt positions by symbol and cache them."""
+        self.positions = {pos['symbol']: pos for pos in positions if pos['contracts'] != 0}
+        self.account_snapshot.put('positions', self.positions)
+        return self.positions
+    
+    def _order_sent(self, order, message):
+        """Record a sent order; account state is stale from now on."""
+        self.account_snapshot.invalidate()
+        self.orders.append(order)
+        print(message)
+        return order
+    
+    def _order_failed(self, action, error):
+        """Report a failed order request; it may still have reached the broker."""
+        self.account_snapshot.invalidate()
+        print(f"Error {action}: {error}")
+        return None
+    
+    def _closing_order(self, positions, symbol):
+        """Get the (side, amount) of the market order closing a position, or None."""
+        if symbol not in positions:
+            print(f"No open position for {symbol}")
+            return None
+        pos = positions[symbol]
+        side = 'sell' if pos['side'] == 'long' else 'buy'
+        return side, abs(pos['contracts'])
+    
+    def _account_info(self, balance, positions):
+        """Assemble the account information dict."""
+        return {
+            'balance': balance,
+            'positions': positions,
+            'account_id': self.account_id,
+            'practice': self.practice,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _is_derived(self, timeframe):
+        """Check whether a timeframe is built locally from the base timeframe."""
+        return (self.resampler is not None and timeframe != self.base_timeframe
+                and can_derive(self.base_timeframe, timeframe))
+    
+    def _derive(self, symbol, base, timeframe, limit):
+        """Derive `limit` bars of `timeframe` from base-timeframe candles."""
+        if base.empty:
+            return base
+        return self.resampler.derive(symbol, base, timeframe).iloc[-limit:].copy()
+    
+    def _base_limit(self, timeframes, limit):
+        """Base-timeframe bars needed to derive `limit` bars of every timeframe."""
+        return max([limit] + [self.resampler.base_limit(tf, limit) for tf in timeframes])
+    
+    def _paged_bounds(self, timeframe, since, limit):
+        """Page bounds for a request too large for one call."""
+        tf_ms = timeframe_to_ms(timeframe)
+        end_ms = int(time.time() * 1000) + tf_ms
+        start_ms = since if since is not None else end_ms - int(limit * tf_ms * WEEKEND_SLACK)
+        return page_bounds(start_ms, end_ms, timeframe, MAX_CANDLES_PER_REQUEST)
+    
+    def _page_frame(self, ohlcv, page_start, page_end):
+        """Keep the candles of one page, [page_start, page_end)."""
+        return candles_to_frame([row for row in ohlcv if page_start <= row[0] < page_end], self.price_dtype)
+    
+    def _cached_candles(self, symbol, timeframe, limit):
+        """Get known candles from memory, falling back to the candle store."""
+        cached = self._candles.get((symbol, timeframe))
+        if cached is None and self.store is not None:
+            cached = self.store.read(symbol, timeframe, limit=limit)
+        return cached
+    
+    def _top_up_since(self, symbol, timeframe, cached):
+        """Get the `since` (ms) of a top-up, reaching back to any tick-built bars."""
+        since = since_last_candle(cached)
+        local = self._local_bars.get((symbol, timeframe))
+        return min(since, local) if local is not None else since
+    
+    def _remember_candles(self, symbol, timeframe, df, cached, limit):
+        """
+        Keep fetched candles in memory.
+        
+        Returns:
+            DataFrame with the closed candles to persist, or None
+        """
+        if df.empty:
+            return None
+        key = (symbol, timeframe)
+        keep = max(limit, len(cached)) if cached is not None else limit
+        self._candles[key] = df.iloc[-keep:]
+        # The fetch replaced any tick-built bars with the broker's candles
+        local = self._local_bars.pop(key, None)
+        if self.store is not None:
+            # The newest bar may still be forming, persist closed bars only
+            closed = df.iloc[:-1]
+            if cached is not None and not cached.empty:
+                # Older bars were persisted on earlier calls
+                start = cached.index[-1]
+                if local is not None:
+                    start = min(start, pd.Timestamp(local, unit='ms'))
+                closed = closed.loc[start:]
+            return closed
+        return None
+    
+    def _store_gap(self, symbol, timeframe, closed):
+        """
+        Get the range between the stored history and newer candles.
+        
+        The store only tracks its first/last bar, so candles appended after
+        a gap would hide it for good (see _backfill_pages).
+        
+        Returns:
+            (start, end) in ms to backfill before appending, or None
+        """
+        if self.store is None or closed is None or closed.empty:
+            return None
+        last = self.store.last_timestamp(symbol, timeframe)
+        if last is None:
+            return None
+        start = last + timeframe_to_ms(timeframe)
+        first = int(closed.index[0].value // 1000000)
+        return (start, first) if first > start else None
+    
+    def _store_closed(self, symbol, timeframe, closed):
+        """Append closed candles to the store."""
+        if self.store is not None and closed is not None:
+            self.store.append(symbol, timeframe, closed)
+    
+    @staticmethod
+    def _backfill_range(start, end):
+        """Get (now, start, end) in ms for a backfill, with end capped at now."""
+        now_ms = int(time.time() * 1000)
+        end_ms = min(to_ms(end), now_ms) if end is not None else now_ms
+        return now_ms, to_ms(start), end_ms
+    
+    def _backfill_pages(self, symbol, timeframe, start_ms, end_ms, page_size):
+        """Plan the pages still missing from the store, one list per gap."""
+        tf_ms = timeframe_to_ms(timeframe)
+        first = self.store.first_timestamp(symbol, timeframe) if self.store is not None else None
+        last = self.store.last_timestamp(symbol, timeframe) if self.store is not None else None
+        
+        if first is None:
+            ranges = [(start_ms, end_ms, False)]
+        else:
+            # The store only tracks its first/last bar, so new ranges must touch
+            # it: an older range runs up to `first` and a newer one starts right
+            # after `last`, even when the requested range is further away.
+            # Older pages are fetched newest first so writes stay adjacent.
+            ranges = [(start_ms, first, True), (last + tf_ms, end_ms, False)]
+        
+        plan = []
+        for range_start, range_end, reverse in ranges:
+            if range_start < range_end:
+                bounds = page_bounds(range_start, range_end, timeframe, page_size, reverse)
+                print(f"Backfilling {symbol} {timeframe}: {len(bounds)} pages")
+                plan.append(bounds)
+        return plan
+    
+    def _persist_pages(self, symbol, timeframe, frames, now_ms, collected):
+        """Write completed backfill pages to the store (or keep them in memory)."""
+        # Never persist a bar that has not closed yet
+        df = _closed_bars(pd.concat(frames), timeframe_to_ms(timeframe), now_ms)
+        if self.store is not None:
+            self.store.append(symbol, timeframe, df)
+        else:
+            collected.append(df)
+    
+    def _backfill_result(self, symbol, timeframe, start_ms, end_ms, collected):
+        """Read back the backfilled range."""
+        if self.store is not None:
+            return self.store.read(symbol, timeframe, start=start_ms, end=end_ms)
+        if not collected:
+            return candles_to_frame([])
+        return dedupe_candles(pd.concat(collected))
+    
+    def ingest_bars(self, symbol, timeframe, bars):
+        """
+        Merge locally built closed bars into the candle cache.
+        
+        Tick-built bars come from another feed (mid prices, tick-count
+        volume), so they are kept in memory only. The next top-up refetches
+        them from the broker, and only the broker's candles are persisted.
+        
+        Args:
+            symbol: Trading pair
+            timeframe: Timeframe
+            bars: List of [timestamp, open, high, low, close, volume] rows
+        """
+        new = candles_to_frame(bars, self.price_dtype)
+        key = (symbol, timeframe)
+        cached = self._candles.get(key)
+        if cached is not None and not cached.empty and not new.empty:
+            df = dedupe_candles(pd.concat([cached, new]))
+            self._candles[key] = df.iloc[-len(cached):]
+            self._local_bars.setdefault(key, int(new.index[0].value // 1000000))
+    
+    def get_cached_ohlcv(self, symbol, timeframe='1h', limit=500):
+        """
+        Get cached candles without contacting the broker.
+        
+        Returns:
+            DataFrame with OHLCV data (empty if nothing is cached)
+        """
+        cached = self._candles.get((symbol, timeframe))
+        if cached is None:
+            return pd.DataFrame()
+        return cached.iloc[-limit:].copy()
+    
+    def clear_candle_cache(self, symbol=None, timeframe=None):
+        """Drop cached candles, optionally only for one symbol and/or timeframe."""
+        for key in list(self._candles):
+            if symbol in (None, key[0]) and timeframe in (None, key[1]):
+                del self._candles[key]
+
+
+class OANDAConnector(OANDAConnectorBase):
+    """Connects to OANDA broker using CCXT library."""
+    
+    def _request(self, method, *args, coalesce=True, **kwargs):
+        """
+        Send one broker request through the rate limiter.
+        
+        Args:
+            method: ccxt exchange method name (e.g., 'fetch_positions')
+            coalesce: Share the result with identical concurrent requests
+                (must be False for orders and other side effects)
+            
+        Returns:
+            Result of the exchange call
+        """
+        key = self._request_key(method, args, kwargs, coalesce)
+        return self.limiter.call(key, getattr(self.exchange, method), *args, **kwargs)
+    
+    def get_balance(self, refresh=False):
+        """
+        Get account balance.
+        
+        Args:
+            refresh: Bypass the account snapshot and always hit the broker
+        """
+        cached = None if refresh else self.account_snapshot.get('balance')
+        if cached is not None:
+            return cached
+        
         try:
-            balance = self.exchange.fetch_balance()
-            return {
-                'total': balance.get('total', {}).get('USD', 0),
-                'free': balance.get('free', {}).get('USD', 0),
-                'used': balance.get('used', {}).get('USD', 0)
-            }
+            return self._parse_balance(self._request('fetch_balance'))
         except Exception as e:
             print(f"Error fetching balance: {e}")
             return {'total': 0, 'free': 0, 'used': 0}
     
-    def get_positions(self):
-        """Get current open positions."""
+    def get_positions(self, refresh=False):
+        """
+        Get current open positions.
+        
+        Args:
+            refresh: Bypass the account snapshot and always hit the broker
+        """
+        cached = None if refresh else self.account_snapshot.get('positions')
+        if cached is not None:
+            return cached
+        
         try:
-            positions = self.exchange.fetch_positions()
-            self.positions = {pos['symbol']: pos for pos in positions if pos['contracts'] != 0}
-            return self.positions
+            return self._parse_positions(self._request('fetch_positions'))
         except Exception as e:
             print(f"Error fetching positions: {e}")
             return {}
     
-    def get_ohlcv(self, symbol, timeframe='1h', limit=500):
+    def get_ohlcv(self, symbol, timeframe='1h', limit=500, use_cache=True):
         """
         Fetch OHLCV (candlestick) data for a forex pair.
         
+        Candles already fetched for (symbol, timeframe) are kept in memory
+        and closed candles are persisted to the candle store. Later calls,
+        including the first call after a restart, only ask the broker for
+        bars from the last known bar onwards and merge them in.
+        
         Args:
             symbol: Trading pair (e.g., 'EUR/USD')
             timeframe: Timeframe (e.g., '1h', '4h', '1d')
             limit: Number of candles to fetch
+            use_cache: Reuse cached history and fetch only newer bars
             
         Returns:
             DataFrame with OHLCV data
         """
+        if self._is_derived(timeframe):
+            base = self.get_ohlcv(symbol, self.base_timeframe,
+                                  self.resampler.base_limit(timeframe, limit), use_cache)
+            return self._derive(symbol, base, timeframe, limit)
+        
         try:
-            # Fetch OHLCV data
-            ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
+            df = self._load_candles(symbol, timeframe, limit, use_cache)
+            # Callers add indicator columns, so never hand out the cached frame
+            return df.iloc[-limit:].copy()
+        except Exception as e:
+            print(f"Error fetching OHLCV data for {symbol}: {e}")
+            return pd.DataFrame()
+    
+    def get_ohlcv_since(self, symbol, timeframe, since, limit=500):
+        """
+        Fetch candles from `since` onwards, topping up the cache first.
+        
+        For callers that keep their own history (e.g., a BarRingBuffer):
+        only the bars at or after `since` are copied out, not the window.
+        
+        Args:
+            symbol: Trading pair
+            timeframe: Timeframe
+            since: Timestamp (ms) of the newest bar the caller already has
+            limit: History length the cache should hold
             
-            return df
+        Returns:
+            DataFrame with OHLCV data from `since` on
+        """
+        if self._is_derived(timeframe):
+            df = self.get_ohlcv(symbol, timeframe, limit)
+            return df[df.index >= pd.Timestamp(since, unit='ms')] if not df.empty else df
+        
+        try:
+            df = self._load_candles(symbol, timeframe, limit, use_cache=True)
+            return df.loc[pd.Timestamp(since, unit='ms'):].copy()
         except Exception as e:
             print(f"Error fetching OHLCV data for {symbol}: {e}")
             return pd.DataFrame()
     
+    def _load_candles(self, symbol, timeframe, limit, use_cache):
+        """Top up (or fetch) the candle history and return the cached frame."""
+        cached = self._cached_candles(symbol, timeframe, limit) if use_cache else None
+        
+        df = None
+        if cached is not None and not cached.empty:
+            new = self._fetch_candles(symbol, timeframe, since=self._top_up_since(symbol, timeframe, cached),
+                                      limit=limit)
+            df = merge_candles(cached, new, limit)
+        
+        if df is None:
+            df = self._fetch_candles(symbol, timeframe, limit=limit)
+        
+        if use_cache:
+            closed = self._remember_candles(symbol, timeframe, df, cached, limit)
+            gap = self._store_gap(symbol, timeframe, closed)
+            if gap is not None:
+                # A full refetch did not reach the stored history (e.g., after a
+                # long restart); weekends make this a no-op when nothing is missing
+                try:
+                    self.backfill(symbol, timeframe, *gap)
+                except Exception as e:
+                    print(f"Error backfilling {symbol} {timeframe}, new candles not stored: {e}")
+                    return df
+            self._store_closed(symbol, timeframe, closed)
+        return df
+    
+    def get_ohlcv_timeframes(self, symbol, timeframes, limit=500):
+        """
+        Fetch several timeframes for a pair with a single base download.
+        
+        Args:
+            symbol: Trading pair
+            timeframes: List of timeframes (e.g., ['5m', '1h', '4h'])
+            limit: Number of candles per timeframe
+            
+        Returns:
+            dict of timeframe -> DataFrame with OHLCV data
+        """
+        derived = [tf for tf in timeframes if self._is_derived(tf)]
+        if not derived:
+            return {tf: self.get_ohlcv(symbol, tf, limit) for tf in timeframes}
+        
+        base = self.get_ohlcv(symbol, self.base_timeframe, self._base_limit(derived, limit))
+        result = {tf: self._derive(symbol, base, tf, limit) for tf in derived}
+        for tf in timeframes:
+            if tf not in result:
+                result[tf] = base.iloc[-limit:].copy() if tf == self.base_timeframe else self.get_ohlcv(symbol, tf, limit)
+        return {tf: result[tf] for tf in timeframes}
+    
+    def _fetch_candles(self, symbol, timeframe, since=None, limit=500):
+        """Fetch raw candles from the broker as a timestamp-indexed DataFrame."""
+        if limit > MAX_CANDLES_PER_REQUEST:
+            # Too many for one request, page through the time range instead
+            df = self._fetch_pages(symbol, timeframe, self._paged_bounds(timeframe, since, limit))
+            return df.iloc[:limit] if since is not None else df.iloc[-limit:]
+        
+        ohlcv = self._request('fetch_ohlcv', symbol, timeframe, since=since, limit=limit)
+        return candles_to_frame(ohlcv, self.price_dtype)
+    
+    def _fetch_page(self, symbol, timeframe, page_start, page_end, page_size):
+        """Fetch the candles of one page, [page_start, page_end)."""
+        ohlcv = self._request('fetch_ohlcv', symbol, timeframe, since=page_start, limit=page_size)
+        return self._page_frame(ohlcv, page_start, page_end)
+    
+    def _fetch_pages(self, symbol, timeframe, bounds, page_size=MAX_CANDLES_PER_REQUEST,
+                     max_workers=4, on_pages=None):
+        """
+        Fetch pages in parallel and stitch them together.
+        
+        Args:
+            symbol: Trading pair
+            timeframe: Timeframe
+            bounds: List of (page_start, page_end) in the order to deliver them
+            page_size: Candles per request
+            max_workers: Concurrent requests
+            on_pages: Callback(list of DataFrames) invoked as soon as the next
+                pages in `bounds` order are complete
+                
+        Returns:
+            De-duplicated, sorted DataFrame with all pages
+        """
+        frames = []
+        done = {}
+        next_page = 0
+        error = None
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='backfill')
+        try:
+            futures = {
+                pool.submit(self._fetch_page, symbol, timeframe, start, end, page_size): i
+                for i, (start, end) in enumerate(bounds)
+            }
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                try:
+                    done[futures[future]] = future.result()
+                except Exception as e:
+                    # Stop queueing new pages but keep what already finished
+                    error = error or e
+                    for pending in futures:
+                        pending.cancel()
+                    continue
+                
+                # Deliver pages in order so callers can persist a contiguous range
+                ready = []
+                while next_page in done:
+                    ready.append(done.pop(next_page))
+                    next_page += 1
+                if ready:
+                    frames.extend(ready)
+                    if on_pages:
+                        on_pages(ready)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        
+        if error is not None:
+            raise error
+        
+        if not frames:
+            return candles_to_frame([])
+        return dedupe_candles(pd.concat(frames))
+    
+    def backfill(self, symbol, timeframe, start, end=None, page_size=MAX_CANDLES_PER_REQUEST,
+                 max_workers=4):
+        """
+        Download a historical date range into the candle store.
+        
+        The range is split into broker-sized pages that are fetched in
+        parallel. Pages are written to the store as soon as they extend the
+        stored range without a gap, so an interrupted backfill resumes from
+        where it stopped. Ranges already in the store are not downloaded, and
+        a range that does not touch the stored history is widened to reach
+        it, so the store never has a gap.
+        
+        Args:
+            symbol: Trading pair (e.g., 'EUR/USD')
+            timeframe: Timeframe (e.g., '1h', '5m')
+            start: Range start (datetime, string or ms)
+            end: Range end (defaults to now)
+            page_size: Candles per request
+            max_workers: Concurrent requests
+            
+        Returns:
+            DataFrame with OHLCV data for the range
+        """
+        now_ms, start_ms, end_ms = self._backfill_range(start, end)
+        
+        collected = []
+        for bounds in self._backfill_pages(symbol, timeframe, start_ms, end_ms, page_size):
+            self._fetch_pages(
+                symbol, timeframe, bounds, page_size=page_size, max_workers=max_workers,
+                on_pages=lambda frames: self._persist_pages(symbol, timeframe, frames, now_ms, collected)
+            )
+        
+        return self._backfill_result(symbol, timeframe, start_ms, end_ms, collected)
+    
     def create_market_order(self, symbol, side, amount):
         """
         Create a market order.
@@ -96,13 +725,10 @@ class OANDAConnector:
             Order info dict
         """
         try:
-            order = self.exchange.create_market_order(symbol, side, amount)
-            self.orders.append(order)
-            print(f"Market order created: {side} {amount} {symbol}")
-            return order
+            order = self._request('create_market_order', symbol, side, amount, coalesce=False)
         except Exception as e:
-            print(f"Error creating market order: {e}")
-            return None
+            return self._order_failed('creating market order', e)
+        return self._order_sent(order, f"Market order created: {side} {amount} {symbol}")
     
     def create_limit_order(self, symbol, side, amount, price):
         """
@@ -118,13 +744,10 @@ class OANDAConnector:
             Order info dict
         """
         try:
-            order = self.exchange.create_limit_order(symbol, side, amount, price)
-            self.orders.append(order)
-            print(f"Limit order created: {side} {amount} {symbol} @ {price}")
-            return order
+            order = self._request('create_limit_order', symbol, side, amount, price, coalesce=False)
         except Exception as e:
-            print(f"Error creating limit order: {e}")
-            return None
+            return self._order_failed('creating limit order', e)
+        return self._order_sent(order, f"Limit order created: {side} {amount} {symbol} @ {price}")
     
     def create_stop_loss_order(self, symbol, side, amount, stop_price):
         """
@@ -139,38 +762,34 @@ class OANDAConnector:
         Returns:
             Order info dict
         """
+        params = {'stopPrice': stop_price}
         try:
-            params = {'stopPrice': stop_price}
-            order = self.exchange.create_order(symbol, 'stop', side, amount, stop_price, params)
-            self.orders.append(order)
-            print(f"Stop-loss order created: {side} {amount} {symbol} @ {stop_price}")
-            return order
+            order = self._request('create_order', symbol, 'stop', side, amount, stop_price, params, coalesce=False)
         except Exception as e:
-            print(f"Error creating stop-loss order: {e}")
-            return None
+            return self._order_failed('creating stop-loss order', e)
+        return self._order_sent(order, f"Stop-loss order created: {side} {amount} {symbol} @ {stop_price}")
     
     def cancel_order(self, order_id, symbol):
         """Cancel an order."""
         try:
-            result = self.exchange.cancel_order(order_id, symbol)
-            print(f"Order {order_id} cancelled")
-            return result
+            result = self._request('cancel_order', order_id, symbol, coalesce=False)
         except Exception as e:
-            print(f"Error cancelling order: {e}")
-            return None
+            return self._order_failed('cancelling order', e)
+        self.account_snapshot.invalidate()
+        print(f"Order {order_id} cancelled")
+        return result
     
     def close_position(self, symbol):
-        """Close a position entirely."""
-        try:
-            positions = self.get_positions()
-            if symbol in positions:
-                pos = positions[symbol]
-                side = 'sell' if pos['side'] == 'long' else 'buy'
-                amount = abs(pos['contracts'])
-                return self.create_market_order(symbol, side, amount)
-            else:
-                print(f"No open position for {symbol}")
-                return None
+        """
+        Close a position entirely.
+        
+        Reads positions from the broker, not the snapshot: closing a trade
+        the broker already closed (e.g., server-side stop-loss) would open
+        a reverse position instead.
+        """
+        try:
+            order = self._closing_order(self.get_positions(refresh=True), symbol)
+            return self.create_market_order(symbol, *order) if order else None
         except Exception as e:
             print(f"Error closing position: {e}")
             return None
@@ -178,7 +797,7 @@ class OANDAConnector:
     def get_ticker(self, symbol):
         """Get current ticker/price for a symbol."""
         try:
-            ticker = self.exchange.fetch_ticker(symbol)
+            ticker = self._request('fetch_ticker', symbol)
             return ticker
         except Exception as e:
             print(f"Error fetching ticker for {symbol}: {e}")
@@ -187,16 +806,280 @@ class OANDAConnector:
     def get_account_info(self):
         """Get detailed account information."""
         try:
-            balance = self.get_balance()
-            positions = self.get_positions()
+            return self._account_info(self.get_balance(), self.get_positions())
+        except Exception as e:
+            print(f"Error fetching account info: {e}")
+            return {}
+
+class AsyncOANDAConnector(OANDAConnectorBase):
+    """
+    Asyncio OANDA connector using ccxt.async_support.
+    
+    Offers the OANDAConnector methods as coroutines on the same candle
+    cache and store. All requests share one event loop and the exchange's
+    connection pool, so many requests can be in flight without a thread
+    per request; candle store reads and writes run in a worker thread so
+    they never block the loop. Call `close()` when done.
+    """
+    
+    ccxt_module = ccxt_async
+    limiter_class = AsyncRequestLimiter
+    
+    async def _request(self, method, *args, coalesce=True, **kwargs):
+        """Send one broker request through the rate limiter."""
+        key = self._request_key(method, args, kwargs, coalesce)
+        return await self.limiter.call(key, getattr(self.exchange, method), *args, **kwargs)
+    
+    async def _store_io(self, fn, *args):
+        """Run a method that may touch the candle store off the event loop."""
+        if self.store is None:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def close(self):
+        """Close the exchange session and its connection pool."""
+        await self.exchange.close()
+    
+    async def get_balance(self, refresh=False):
+        """
+        Get account balance.
+        
+        Args:
+            refresh: Bypass the account snapshot and always hit the broker
+        """
+        cached = None if refresh else self.account_snapshot.get('balance')
+        if cached is not None:
+            return cached
+        
+        try:
+            return self._parse_balance(await self._request('fetch_balance'))
+        except Exception as e:
+            print(f"Error fetching balance: {e}")
+            return {'total': 0, 'free': 0, 'used': 0}
+    
+    async def get_positions(self, refresh=False):
+        """
+        Get current open positions.
+        
+        Args:
+            refresh: Bypass the account snapshot and always hit the broker
+        """
+        cached = None if refresh else self.account_snapshot.get('positions')
+        if cached is not None:
+            return cached
+        
+        try:
+            return self._parse_positions(await self._request('fetch_positions'))
+        except Exception as e:
+            print(f"Error fetching positions: {e}")
+            return {}
+    
+    async def get_ohlcv(self, symbol, timeframe='1h', limit=500, use_cache=True):
+        """
+        Fetch OHLCV (candlestick) data for a forex pair.
+        
+        Uses the same candle cache and store as OANDAConnector.get_ohlcv.
+        
+        Args:
+            symbol: Trading pair (e.g., 'EUR/USD')
+            timeframe: Timeframe (e.g., '1h', '4h', '1d')
+            limit: Number of candles to fetch
+            use_cache: Reuse cached history and fetch only newer bars
             
-            return {
-                'balance': balance,
-                'positions': positions,
-                'account_id': self.account_id,
-                'practice': self.practice,
-                'timestamp': datetime.now().isoformat()
-            }
+        Returns:
+            DataFrame with OHLCV data
+        """
+        if self._is_derived(timeframe):
+            base = await self.get_ohlcv(symbol, self.base_timeframe,
+                                        self.resampler.base_limit(timeframe, limit), use_cache)
+            return self._derive(symbol, base, timeframe, limit)
+        
+        try:
+            df = await self._load_candles(symbol, timeframe, limit, use_cache)
+            return df.iloc[-limit:].copy()
+        except Exception as e:
+            print(f"Error fetching OHLCV data for {symbol}: {e}")
+            return pd.DataFrame()
+    
+    async def get_ohlcv_since(self, symbol, timeframe, since, limit=500):
+        """
+        Fetch candles from `since` onwards, topping up the cache first.
+        
+        See OANDAConnector.get_ohlcv_since.
+        """
+        if self._is_derived(timeframe):
+            df = await self.get_ohlcv(symbol, timeframe, limit)
+            return df[df.index >= pd.Timestamp(since, unit='ms')] if not df.empty else df
+        
+        try:
+            df = await self._load_candles(symbol, timeframe, limit, use_cache=True)
+            return df.loc[pd.Timestamp(since, unit='ms'):].copy()
+        except Exception as e:
+            print(f"Error fetching OHLCV data for {symbol}: {e}")
+            return pd.DataFrame()
+    
+    async def _load_candles(self, symbol, timeframe, limit, use_cache):
+        """Top up (or fetch) the candle history and return the cached frame."""
+        cached = await self._store_io(self._cached_candles, symbol, timeframe, limit) if use_cache else None
+        
+        df = None
+        if cached is not None and not cached.empty:
+            new = await self._fetch_candles(symbol, timeframe, since=self._top_up_since(symbol, timeframe, cached),
+                                            limit=limit)
+            df = merge_candles(cached, new, limit)
+        
+        if df is None:
+            df = await self._fetch_candles(symbol, timeframe, limit=limit)
+        
+        if use_cache:
+            closed = self._remember_candles(symbol, timeframe, df, cached, limit)
+            gap = await self._store_io(self._store_gap, symbol, timeframe, closed)
+            if gap is not None:
+                # See OANDAConnector._load_candles
+                try:
+                    await self.backfill(symbol, timeframe, *gap)
+                except Exception as e:
+                    print(f"Error backfilling {symbol} {timeframe}, new candles not stored: {e}")
+                    return df
+            await self._store_io(self._store_closed, symbol, timeframe, closed)
+        return df
+    
+    async def get_ohlcv_timeframes(self, symbol, timeframes, limit=500):
+        """
+        Fetch several timeframes for a pair with a single base download.
+        
+        See OANDAConnector.get_ohlcv_timeframes.
+        """
+        derived = [tf for tf in timeframes if self._is_derived(tf)]
+        if not derived:
+            frames = await asyncio.gather(*(self.get_ohlcv(symbol, tf, limit) for tf in timeframes))
+            return dict(zip(timeframes, frames))
+        
+        base = await self.get_ohlcv(symbol, self.base_timeframe, self._base_limit(derived, limit))
+        result = {tf: self._derive(symbol, base, tf, limit) for tf in derived}
+        for tf in timeframes:
+            if tf not in result:
+                result[tf] = base.iloc[-limit:].copy() if tf == self.base_timeframe else await self.get_ohlcv(symbol, tf, limit)
+        return {tf: result[tf] for tf in timeframes}
+    
+    async def _fetch_candles(self, symbol, timeframe, since=None, limit=500):
+        """Fetch raw candles from the broker as a timestamp-indexed DataFrame."""
+        if limit > MAX_CANDLES_PER_REQUEST:
+            # Too many for one request, page through the time range instead
+            df = await self._fetch_pages(symbol, timeframe, self._paged_bounds(timeframe, since, limit))
+            return df.iloc[:limit] if since is not None else df.iloc[-limit:]
+        
+        ohlcv = await self._request('fetch_ohlcv', symbol, timeframe, since=since, limit=limit)
+        return candles_to_frame(ohlcv, self.price_dtype)
+    
+    async def _fetch_page(self, symbol, timeframe, page_start, page_end, page_size):
+        """Fetch the candles of one page, [page_start, page_end)."""
+        ohlcv = await self._request('fetch_ohlcv', symbol, timeframe, since=page_start, limit=page_size)
+        return self._page_frame(ohlcv, page_start, page_end)
+    
+    async def _fetch_pages(self, symbol, timeframe, bounds, page_size=MAX_CANDLES_PER_REQUEST,
+                           max_workers=4, on_pages=None):
+        """
+        Fetch pages concurrently, `max_workers` at a time, and stitch them together.
+        
+        `on_pages` is called with each completed batch, in a worker thread.
+        """
+        frames = []
+        for i in range(0, len(bounds), max_workers):
+            batch = await asyncio.gather(*(
+                self._fetch_page(symbol, timeframe, start, end, page_size)
+                for start, end in bounds[i:i + max_workers]
+            ))
+            frames.extend(batch)
+            if on_pages:
+                await self._store_io(on_pages, list(batch))
+        
+        if not frames:
+            return candles_to_frame([])
+        return dedupe_candles(pd.concat(frames))
+    
+    async def backfill(self, symbol, timeframe, start, end=None, page_size=MAX_CANDLES_PER_REQUEST,
+                       max_workers=4):
+        """
+        Download a historical date range into the candle store.
+        
+        See OANDAConnector.backfill.
+        """
+        now_ms, start_ms, end_ms = self._backfill_range(start, end)
+        
+        collected = []
+        plan = await self._store_io(self._backfill_pages, symbol, timeframe, start_ms, end_ms, page_size)
+        for bounds in plan:
+            await self._fetch_pages(
+                symbol, timeframe, bounds, page_size=page_size, max_workers=max_workers,
+                on_pages=lambda frames: self._persist_pages(symbol, timeframe, frames, now_ms, collected)
+            )
+        
+        return await self._store_io(self._backfill_result, symbol, timeframe, start_ms, end_ms, collected)
+    
+    async def create_market_order(self, symbol, side, amount):
+        """Create a market order (see OANDAConnector.create_market_order)."""
+        try:
+            order = await self._request('create_market_order', symbol, side, amount, coalesce=False)
+        except Exception as e:
+            return self._order_failed('creating market order', e)
+        return self._order_sent(order, f"Market order created: {side} {amount} {symbol}")
+    
+    async def create_limit_order(self, symbol, side, amount, price):
+        """Create a limit order (see OANDAConnector.create_limit_order)."""
+        try:
+            order = await self._request('create_limit_order', symbol, side, amount, price, coalesce=False)
+        except Exception as e:
+            return self._order_failed('creating limit order', e)
+        return self._order_sent(order, f"Limit order created: {side} {amount} {symbol} @ {price}")
+    
+    async def create_stop_loss_order(self, symbol, side, amount, stop_price):
+        """Create a stop-loss order (see OANDAConnector.create_stop_loss_order)."""
+        params = {'stopPrice': stop_price}
+        try:
+            order = await self._request('create_order', symbol, 'stop', side, amount, stop_price, params, coalesce=False)
+        except Exception as e:
+            return self._order_failed('creating stop-loss order', e)
+        return self._order_sent(order, f"Stop-loss order created: {side} {amount} {symbol} @ {stop_price}")
+    
+    async def cancel_order(self, order_id, symbol):
+        """Cancel an order."""
+        try:
+            result = await self._request('cancel_order', order_id, symbol, coalesce=False)
+        except Exception as e:
+            return self._order_failed('cancelling order', e)
+        self.account_snapshot.invalidate()
+        print(f"Order {order_id} cancelled")
+        return result
+    
+    async def close_position(self, symbol):
+        """Close a position entirely (from fresh positions, see OANDAConnector.close_position)."""
+        try:
+            order = self._closing_order(await self.get_positions(refresh=True), symbol)
+            return await self.create_market_order(symbol, *order) if order else None
+        except Exception as e:
+            print(f"Error closing position: {e}")
+            return None
+    
+    async def get_ticker(self, symbol):
+        """Get current ticker/price for a symbol."""
+        try:
+            return await self._request('fetch_ticker', symbol)
+        except Exception as e:
+            print(f"Error fetching ticker for {symbol}: {e}")
+            return None
+    
+    async def get_account_info(self):
+        """Get detailed account information."""
+        try:
+            balance, positions = await asyncio.gather(self.get_balance(), self.get_positions())
+            return self._account_info(balance, positions)
         except Exception as e:
             print(f"Error fetching account info: {e}")
             return {}
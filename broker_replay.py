@@ -0,0 +1,320 @@
+"""
+Broker Replay Module
+Records broker responses to disk and replays them without a network.
+
+RecordingExchange wraps the ccxt exchange inside an OANDAConnector and
+appends every request and its response (or error) to a JSON-lines log,
+gzip-compressed when the path ends in '.gz'. ReplayExchange serves that
+log back to a connector, either at full speed or paced by the recorded
+timings, so ForexTradingBot can be run and benchmarked end to end
+without OANDA credentials and production incidents can be reproduced.
+"""
+import asyncio
+import gzip
+import inspect
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+import ccxt
+
+from broker_connector import OANDAConnector, AsyncOANDAConnector
+from rate_limiter import RequestLimiter, AsyncRequestLimiter
+
+
+# Exchange methods that talk to the broker and are recorded
+REQUEST_PREFIXES = ('fetch_', 'create_', 'cancel_', 'edit_')
+
+
+def _is_request(name):
+    return name.startswith(REQUEST_PREFIXES)
+
+
+def _open_log(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def call_key(method, args, kwargs):
+    """Build the canonical lookup key for a request."""
+    return json.dumps([method, list(args), kwargs], sort_keys=True, default=str, separators=(',', ':'))
+
+
+def load_log(path):
+    """
+    Load a broker log written by RecordingExchange.
+
+    Args:
+        path: Log file path
+
+    Returns:
+        List of entry dicts (t, method, args, kwargs, result or error)
+    """
+    entries = []
+    with _open_log(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return entries
+
+
+class RecordingExchange:
+    """
+    Proxy around a ccxt exchange that logs every request and response.
+
+    Works with both sync and async_support exchanges. Attributes other
+    than request methods pass straight through to the wrapped exchange.
+    """
+
+    def __init__(self, exchange, path):
+        """
+        Initialize recorder.
+
+        Args:
+            exchange: ccxt exchange instance to wrap
+            path: Log file to append to ('.gz' for gzip)
+        """
+        self.exchange = exchange
+        self.path = path
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.file = _open_log(path, 'a')
+        self.count = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.exchange, name)
+        if not _is_request(name) or not callable(attr):
+            return attr
+
+        if inspect.iscoroutinefunction(attr):
+            async def record_async(*args, **kwargs):
+                t = time.monotonic()
+                try:
+                    result = await attr(*args, **kwargs)
+                except Exception as e:
+                    self._write(t, name, args, kwargs, error=e)
+                    raise
+                self._write(t, name, args, kwargs, result=result)
+                return result
+            return record_async
+
+        def record(*args, **kwargs):
+            t = time.monotonic()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self._write(t, name, args, kwargs, error=e)
+                raise
+            self._write(t, name, args, kwargs, result=result)
+            return result
+        return record
+
+    def _write(self, t, method, args, kwargs, result=None, error=None):
+        entry = {
+            't': round(t - self.started, 3),
+            'method': method,
+            'args': list(args),
+            'kwargs': kwargs,
+        }
+        if error is not None:
+            entry['error'] = [type(error).__name__, str(error)]
+        else:
+            entry['result'] = result
+        line = json.dumps(entry, default=str, separators=(',', ':'))
+        with self.lock:
+            if self.file.closed:
+                return  # Requests still in flight when the log was closed
+            self.file.write(line + '\n')
+            self.file.flush()
+            self.count += 1
+
+    def close_log(self):
+        """Close the log file; later responses are not recorded."""
+        with self.lock:
+            self.file.close()
+
+
+class ReplayExchange:
+    """
+    Stand-in for a ccxt exchange that serves recorded responses.
+
+    Responses are matched on method and arguments and served in recorded
+    order per request, so concurrent callers get deterministic results.
+    Once a request's recordings run out its last response is repeated;
+    requests never recorded with these arguments fall back to the latest
+    response for the same method and symbol.
+    """
+
+    def __init__(self, path_or_entries, speed=None):
+        """
+        Initialize replay.
+
+        Args:
+            path_or_entries: Log file path or list of log entries
+            speed: None for full speed, or wall-clock multiplier
+                (1.0 = recorded pace, 10.0 = ten times faster)
+        """
+        entries = load_log(path_or_entries) if isinstance(path_or_entries, str) else path_or_entries
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.started = None
+
+        self._queues = defaultdict(deque)
+        self._last = {}
+        self._fallback = {}
+        for entry in entries:
+            key = call_key(entry['method'], entry['args'], entry.get('kwargs', {}))
+            self._queues[key].append(entry)
+        self.calls = 0
+        self.misses = 0
+
+    def __getattr__(self, name):
+        if not _is_request(name):
+            raise AttributeError(name)
+
+        def replay(*args, **kwargs):
+            return self._respond(self._next(name, args, kwargs))
+        return replay
+
+    def _next(self, method, args, kwargs):
+        key = call_key(method, args, kwargs)
+        fallback_key = (method, str(args[0]) if args else None)
+        with self.lock:
+            self.calls += 1
+            if self.started is None:
+                self.started = time.monotonic()
+
+            queue = self._queues.get(key)
+            if queue:
+                entry = queue.popleft()
+                self._last[key] = entry
+                self._fallback[fallback_key] = entry
+                return entry
+            if key in self._last:
+                return self._last[key]
+
+            self.misses += 1
+            entry = self._fallback.get(fallback_key) or self._first_for(fallback_key)
+            if entry is None:
+                raise ccxt.ExchangeError(f"No recorded response for {method}{tuple(args)}")
+            return entry
+
+    def _first_for(self, fallback_key):
+        method, symbol = fallback_key
+        for queue in self._queues.values():
+            for entry in queue:
+                first = str(entry['args'][0]) if entry['args'] else None
+                if entry['method'] == method and first == symbol:
+                    return entry
+        return None
+
+    def _delay(self, entry):
+        if not self.speed:
+            return 0.0
+        due = self.started + entry['t'] / self.speed
+        return max(0.0, due - time.monotonic())
+
+    def _respond(self, entry):
+        delay = self._delay(entry)
+        if delay > 0:
+            time.sleep(delay)
+        return self._result(entry)
+
+    @staticmethod
+    def _result(entry):
+        if 'error' in entry:
+            name, message = entry['error']
+            error = getattr(ccxt, name, None)
+            if not (isinstance(error, type) and issubclass(error, Exception)):
+                error = Exception
+            raise error(message)
+        # Hand every caller its own copy, like a fresh HTTP response
+        return json.loads(json.dumps(entry['result']))
+
+
+class AsyncReplayExchange(ReplayExchange):
+    """ReplayExchange with coroutine request methods, for AsyncOANDAConnector."""
+
+    def __getattr__(self, name):
+        if not _is_request(name):
+            raise AttributeError(name)
+
+        async def replay(*args, **kwargs):
+            entry = self._next(name, args, kwargs)
+            delay = self._delay(entry)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            return self._result(entry)
+        return replay
+
+    async def close(self):
+        pass
+
+
+def record(connector, path):
+    """
+    Start recording a connector's broker traffic.
+
+    Args:
+        connector: OANDAConnector or AsyncOANDAConnector
+        path: Log file to append to ('.gz' for gzip)
+
+    Returns:
+        The RecordingExchange now installed on the connector
+    """
+    recorder = RecordingExchange(connector.exchange, path)
+    connector.exchange = recorder
+    return recorder
+
+
+def replay_connector(path_or_entries, speed=None, asynchronous=False, **kwargs):
+    """
+    Build a connector that replays a broker log instead of calling OANDA.
+
+    The candle store is disabled and requests are not throttled unless
+    overridden in kwargs, so replays are deterministic and run at full
+    speed.
+
+    Args:
+        path_or_entries: Log file path or list of log entries
+        speed: None for full speed, or wall-clock multiplier
+        asynchronous: Return an AsyncOANDAConnector
+        **kwargs: Extra OANDAConnector arguments
+
+    Returns:
+        OANDAConnector (or AsyncOANDAConnector) serving recorded responses
+    """
+    kwargs.setdefault('store', False)
+    if asynchronous:
+        kwargs.setdefault('limiter', AsyncRequestLimiter(rate=None))
+        exchange = AsyncReplayExchange(path_or_entries, speed)
+        return AsyncOANDAConnector('replay', 'replay', exchange=exchange, **kwargs)
+
+    kwargs.setdefault('limiter', RequestLimiter(rate=None))
+    exchange = ReplayExchange(path_or_entries, speed)
+    return OANDAConnector('replay', 'replay', exchange=exchange, **kwargs)
+
+
+def benchmark(bot, cycles=1000):
+    """
+    Time ForexTradingBot.process_trading_logic against its current broker.
+
+    Args:
+        bot: ForexTradingBot with broker, strategy and config set
+        cycles: Number of trading cycles to run
+
+    Returns:
+        dict with cycles, seconds and cycles_per_second
+    """
+    start = time.perf_counter()
+    for _ in range(cycles):
+        bot.process_trading_logic()
+    elapsed = time.perf_counter() - start
+    return {
+        'cycles': cycles,
+        'seconds': round(elapsed, 3),
+        'cycles_per_second': round(cycles / elapsed, 1) if elapsed > 0 else float('inf'),
+    }
@@ -0,0 +1,374 @@
+"""
+Candle Store Module
+Persistent on-disk OHLCV history, partitioned by symbol and timeframe.
+
+Each partition is a directory with one flat binary file per column
+(int64 millisecond timestamps, float64 prices/volume). New bars are
+appended to the end of the files and reads go through NumPy memory maps,
+so loading long histories does not parse or copy anything up front.
+"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+PRICE_COLUMNS = COLUMNS[1:]
+
+DEFAULT_STORE_DIR = 'candle_store'
+
+# Market holidays a stored history may skip at the start of a requested
+# period before load_yf_history downloads the whole period again
+HOLIDAY_SLACK_DAYS = 1
+
+TIMEFRAME_UNITS_MS = {
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+
+def timeframe_to_ms(timeframe):
+    """
+    Convert a timeframe string to milliseconds.
+
+    Args:
+        timeframe: Timeframe (e.g., '5m', '1h', '1d')
+
+    Returns:
+        Bar length in milliseconds
+    """
+    unit = timeframe[-1].lower()
+    if unit not in TIMEFRAME_UNITS_MS:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS_MS[unit]
+
+
+def to_ms(value):
+    """Convert a datetime, string or ms timestamp to ms since the epoch."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return int(ts.as_unit('ms').asm8.astype(np.int64))
+
+
+def frame_to_columns(df):
+    """
+    Convert a timestamp-indexed OHLCV DataFrame to column arrays.
+
+    Args:
+        df: DataFrame with open/high/low/close/volume and a DatetimeIndex
+
+    Returns:
+        dict of column name -> NumPy array
+    """
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+
+    columns = {'timestamp': index.as_unit('ms').asi8.astype(np.int64)}
+    for col in PRICE_COLUMNS:
+        columns[col] = df[col].to_numpy(dtype=np.float64)
+    return columns
+
+
+def columns_to_frame(columns):
+    """
+    Build a timestamp-indexed OHLCV DataFrame from column arrays.
+
+    Args:
+        columns: dict of column name -> NumPy array
+
+    Returns:
+        DataFrame with OHLCV data
+    """
+    index = pd.DatetimeIndex(
+        np.asarray(columns['timestamp'], dtype=np.int64).view('datetime64[ms]'),
+        name='timestamp'
+    )
+    return pd.DataFrame({col: columns[col] for col in PRICE_COLUMNS}, index=index)
+
+
+class CandleStore:
+    """
+    Local columnar candle store.
+
+    Layout: <root>/<SYMBOL>/<timeframe>/<column>.bin
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        """
+        Initialize candle store.
+
+        Args:
+            root: Directory holding all partitions
+        """
+        self.root = root
+
+    def partition_dir(self, symbol, timeframe):
+        """Get the directory for a (symbol, timeframe) partition."""
+        safe_symbol = symbol.replace('/', '_').replace(':', '_')
+        return os.path.join(self.root, safe_symbol, timeframe)
+
+    def _column_path(self, symbol, timeframe, col):
+        return os.path.join(self.partition_dir(symbol, timeframe), f'{col}.bin')
+
+    def partitions(self):
+        """List stored (symbol, timeframe) partitions."""
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for symbol_dir in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, symbol_dir)
+            if not os.path.isdir(path):
+                continue
+            for timeframe in sorted(os.listdir(path)):
+                result.append((symbol_dir.replace('_', '/'), timeframe))
+        return result
+
+    def read_columns(self, symbol, timeframe, start=None, end=None, limit=None):
+        """
+        Read a range of candles as memory-mapped column arrays.
+
+        Args:
+            symbol: Trading pair (e.g., 'EUR/USD')
+            timeframe: Timeframe (e.g., '1h')
+            start: First timestamp to include (ms, datetime or None)
+            end: Last timestamp to include (ms, datetime or None)
+            limit: Keep only the newest `limit` candles of the range
+
+        Returns:
+            dict of column name -> read-only NumPy array (views, not copies)
+        """
+        maps = {}
+        for col in COLUMNS:
+            path = self._column_path(symbol, timeframe, col)
+            dtype = np.int64 if col == 'timestamp' else np.float64
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                maps[col] = np.empty(0, dtype=dtype)
+            else:
+                maps[col] = np.memmap(path, dtype=dtype, mode='r')
+
+        # A crash between column writes can leave files uneven; trust the shortest
+        rows = min(len(arr) for arr in maps.values())
+
+        timestamps = maps['timestamp'][:rows]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, to_ms(start), side='left'))
+        hi = rows if end is None else int(np.searchsorted(timestamps, to_ms(end), side='right'))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+
+        return {col: arr[lo:hi] for col, arr in maps.items()}
+
+    def read(self, symbol, timeframe, start=None, end=None, limit=None):
+        """
+        Read a range of candles.
+
+        Args:
+            symbol: Trading pair (e.g., 'EUR/USD')
+            timeframe: Timeframe (e.g., '1h')
+            start: First timestamp to include (ms, datetime or None)
+            end: Last timestamp to include (ms, datetime or None)
+            limit: Keep only the newest `limit` candles of the range
+
+        Returns:
+            DataFrame with OHLCV data (empty if nothing is stored)
+        """
+        return columns_to_frame(self.read_columns(symbol, timeframe, start, end, limit))
+
+    def first_timestamp(self, symbol, timeframe):
+        """Get the oldest stored timestamp in ms, or None."""
+        timestamps = self.read_columns(symbol, timeframe)['timestamp']
+        return int(timestamps[0]) if len(timestamps) else None
+
+    def last_timestamp(self, symbol, timeframe):
+        """Get the newest stored timestamp in ms, or None."""
+        timestamps = self.read_columns(symbol, timeframe)['timestamp']
+        return int(timestamps[-1]) if len(timestamps) else None
+
+    def append(self, symbol, timeframe, df):
+        """
+        Store closed candles.
+
+        Candles newer than the stored history are appended in place. Candles
+        older than the stored history trigger a one-off rewrite of the
+        partition. Candles inside the stored range are assumed unchanged
+        and skipped.
+
+        Args:
+            symbol: Trading pair
+            timeframe: Timeframe
+            df: DataFrame with OHLCV data (timestamp as index)
+
+        Returns:
+            Number of candles written
+        """
+        if df is None or df.empty:
+            return 0
+
+        new = frame_to_columns(df)
+        order = np.argsort(new['timestamp'], kind='stable')
+        new = {col: arr[order] for col, arr in new.items()}
+
+        existing = self.read_columns(symbol, timeframe)
+        if len(existing['timestamp']) == 0:
+            return self._write(symbol, timeframe, _dedupe(new), mode='wb')
+
+        first = existing['timestamp'][0]
+        last = existing['timestamp'][-1]
+
+        older = new['timestamp'] < first
+        if older.any():
+            merged = {
+                col: np.concatenate([new[col][older], np.asarray(existing[col])])
+                for col in COLUMNS
+            }
+            newer = new['timestamp'] > last
+            merged = {col: np.concatenate([merged[col], new[col][newer]]) for col in COLUMNS}
+            del existing
+            return self._rewrite(symbol, timeframe, _dedupe(merged))
+
+        newer = new['timestamp'] > last
+        if not newer.any():
+            return 0
+        return self._write(symbol, timeframe, _dedupe({col: arr[newer] for col, arr in new.items()}), mode='ab')
+
+    def _write(self, symbol, timeframe, columns, mode, suffix=''):
+        os.makedirs(self.partition_dir(symbol, timeframe), exist_ok=True)
+        for col in COLUMNS:
+            dtype = np.int64 if col == 'timestamp' else np.float64
+            with open(self._column_path(symbol, timeframe, col) + suffix, mode) as f:
+                f.write(np.ascontiguousarray(columns[col], dtype=dtype).tobytes())
+        return len(columns['timestamp'])
+
+    def _rewrite(self, symbol, timeframe, columns):
+        # Write next to the live files, then swap each column in atomically
+        self._write(symbol, timeframe, columns, mode='wb', suffix='.tmp')
+        for col in COLUMNS:
+            path = self._column_path(symbol, timeframe, col)
+            os.replace(path + '.tmp', path)
+        return len(columns['timestamp'])
+
+    def delete(self, symbol, timeframe):
+        """Remove a stored partition."""
+        for col in COLUMNS:
+            path = self._column_path(symbol, timeframe, col)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _dedupe(columns):
+    timestamps = columns['timestamp']
+    if len(timestamps) < 2:
+        return columns
+    # Keep the last occurrence of each timestamp
+    keep = np.ones(len(timestamps), dtype=bool)
+    keep[:-1] = timestamps[1:] != timestamps[:-1]
+    return {col: arr[keep] for col, arr in columns.items()}
+
+
+def normalize_yf_columns(df):
+    """
+    Normalize a yfinance download to lowercase open/high/low/close/volume.
+
+    Args:
+        df: DataFrame returned by yf.download
+
+    Returns:
+        DataFrame with flat lowercase column names
+    """
+    new_cols = []
+    for c in df.columns:
+        if isinstance(c, tuple):
+            new_cols.append(str(c[0]).lower())
+        else:
+            new_cols.append(str(c).lower())
+    df.columns = new_cols
+    if 'adj close' in df.columns and 'close' not in df.columns:
+        df['close'] = df['adj close']
+    return df
+
+
+def _trading_day(value):
+    """Get the first weekday on or after the date of `value`."""
+    return pd.Timestamp(value).normalize() + pd.offsets.BDay(0)
+
+
+def _download_yf(yf, ticker, interval, **kwargs):
+    """Download adjusted yfinance bars with a UTC timestamp index."""
+    fresh = normalize_yf_columns(yf.download(ticker, interval=interval, auto_adjust=True, **kwargs).dropna())
+    if not fresh.empty:
+        fresh.index = pd.DatetimeIndex(fresh.index, name='timestamp')
+        if fresh.index.tz is not None:
+            fresh.index = fresh.index.tz_convert('UTC').tz_localize(None)
+    return fresh
+
+
+def _rebased(store, ticker, interval, fresh):
+    """Check whether adjusted closes of stored bars changed (a dividend or split)."""
+    if fresh.empty:
+        return False
+    stored = store.read(ticker, interval, start=fresh.index[0], end=fresh.index[-1])
+    common = stored.index.intersection(fresh.index)
+    if common.empty:
+        return False
+    return not np.allclose(stored.loc[common, 'close'], fresh.loc[common, 'close'], rtol=1e-6)
+
+
+def load_yf_history(ticker, days, interval='1d', store=None):
+    """
+    Load recent yfinance history, downloading only what the store lacks.
+
+    The newest downloaded bar may still be forming, so it is returned
+    but not persisted. A period starting on a weekend or market holiday
+    has no bars until the next trading day, so stored history starting
+    then already covers it.
+
+    Prices are split and dividend adjusted. Every download overlaps the
+    stored history; when the adjusted closes there no longer match, the
+    adjustment changed and the stored history is replaced by a fresh
+    download of the whole period.
+
+    Args:
+        ticker: Ticker symbol (e.g., 'SPY')
+        days: Calendar days of history to return
+        interval: yfinance interval (e.g., '1d', '1h')
+        store: CandleStore instance (default store if None)
+
+    Returns:
+        DataFrame with OHLCV data
+    """
+    import yfinance as yf
+
+    store = store if store is not None else CandleStore()
+    start = datetime.now() - timedelta(days=days)
+    first = store.first_timestamp(ticker, interval)
+    last = store.last_timestamp(ticker, interval)
+    # Stored bars from before this point cover the requested period
+    covered = to_ms(_trading_day(start) + pd.offsets.BDay(HOLIDAY_SLACK_DAYS + 1))
+
+    full = first is None or first >= covered
+    if full:
+        fresh = _download_yf(yf, ticker, interval, period=f'{days}d')
+    else:
+        since = pd.Timestamp(last, unit='ms')
+        fresh = _download_yf(yf, ticker, interval, start=since.strftime('%Y-%m-%d'))
+
+    if _rebased(store, ticker, interval, fresh):
+        print(f"{ticker} adjustment changed, downloading {days} days again")
+        store.delete(ticker, interval)
+        if not full:
+            fresh = _download_yf(yf, ticker, interval, period=f'{days}d')
+
+    if not fresh.empty:
+        store.append(ticker, interval, fresh.iloc[:-1])
+
+    df = store.read(ticker, interval, start=start)
+    if not fresh.empty and (df.empty or fresh.index[-1] > df.index[-1]):
+        df = pd.concat([df, fresh[list(PRICE_COLUMNS)].iloc[-1:]])
+    return df
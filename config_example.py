@@ -76,6 +76,12 @@ DEFAULT_LONG_MA = 200
 # Note: Higher timeframes need more data history
 DEFAULT_TIMEFRAME = "1h"  # 1-hour candles
 
+# Base timeframe (optional)
+# If set, only this timeframe is downloaded from OANDA and coarser
+# timeframes (e.g. 1h, 4h, 1d from "5m") are derived locally.
+# Set to None to download every timeframe separately.
+BASE_TIMEFRAME = None
+
 # =============================================================================
 # RISK MANAGEMENT
 # =============================================================================
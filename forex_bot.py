@@ -5,10 +5,22 @@ Orchestrates all components: broker, strategy, AI, Telegram, and GUI.
 import os
 import json
 import time
+import asyncio
 import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from broker_connector import OANDAConnector
+from broker_connector import OANDAConnector, AsyncOANDAConnector
 from forex_strategy import MovingAverageCrossoverStrategy
+from indicators import series_id, shared_cache
+from indicator_graph import IndicatorGraph, normalize_key
+from price_stream import PriceStream
+from bar_aggregator import BarAggregator
+from bar_buffer import BarRingBuffer
+from signal_engine import SignalEngine, exit_reason
+from scheduler import BarCloseScheduler
+from candle_store import timeframe_to_ms
+from broker_replay import record
 from ai_manager import AIPortfolioManager
 from telegram_notifier import TelegramNotifier
 
@@ -21,6 +33,7 @@ try:
     OPENAI_API_KEY = config.OPENAI_API_KEY
     TELEGRAM_BOT_TOKEN = config.TELEGRAM_BOT_TOKEN
     TELEGRAM_CHAT_ID = config.TELEGRAM_CHAT_ID
+    BASE_TIMEFRAME = getattr(config, 'BASE_TIMEFRAME', None)
 except ImportError:
     print("Warning: config.py not found. Using environment variables or defaults.")
     OANDA_API_KEY = os.getenv('OANDA_API_KEY', '')
@@ -29,6 +42,7 @@ except ImportError:
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
     TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', '')
+    BASE_TIMEFRAME = os.getenv('BASE_TIMEFRAME') or None
 
 
 class ForexTradingBot:
@@ -58,6 +72,34 @@ class ForexTradingBot:
         # Thread for market updates
         self.update_thread = None
         
+        # Wakes the trading loop when bars close
+        self.scheduler = None
+        
+        # Worker pool for concurrent market data requests
+        self.fetch_pool = None
+        
+        # Fixed-size bar history per (pair, timeframe), topped up with new bars only
+        self.bar_buffers = {}
+        
+        # Indicators of the active strategy, evaluated once per bar close;
+        # its requirements are registered when it is first evaluated
+        self.indicator_graph = IndicatorGraph()
+        self.indicator_values = {}
+        
+        # Streaming prices for tick-level exit checks
+        self.price_stream = None
+        self.bar_aggregator = None
+        # Closes streamed bars at timeframe boundaries when no tick arrives
+        self.bar_flusher = None
+        # Evaluates closed bars off the stream thread, one at a time and in order
+        self.bar_pool = None
+        self.order_lock = threading.RLock()
+        # Newest closed bar (ms) that opened a position, per pair; bar closes
+        # and the polling scan may both signal on the same bar
+        self.entry_bars = {}
+        # RecordingExchange logging broker traffic when 'record_broker' is set
+        self.recorder = None
+        
     def initialize_components(self):
         """Initialize all bot components."""
         try:
@@ -66,7 +108,8 @@ class ForexTradingBot:
                 self.broker = OANDAConnector(
                     OANDA_API_KEY,
                     OANDA_ACCOUNT_ID,
-                    OANDA_PRACTICE
+                    OANDA_PRACTICE,
+                    base_timeframe=BASE_TIMEFRAME
                 )
                 print("✓ Broker connected")
             else:
@@ -117,12 +160,15 @@ class ForexTradingBot:
                 print("Failed to initialize bot components")
                 return
         
-        # Update strategy parameters
-        self.strategy.short_ma = self.config.get('short_ma', 50)
-        self.strategy.long_ma = self.config.get('long_ma', 200)
-        self.strategy.risk_per_trade = self.config.get('risk_per_trade', 0.01)
-        self.strategy.stop_loss_pct = self.config.get('stop_loss_pct', 0.01)
-        self.strategy.take_profit_pct = self.config.get('take_profit_pct', 0.02)
+        self.apply_strategy_config()
+        
+        # Resume indicator state so restarts skip the warm-up history fetch
+        self.strategy.load_stream_state(self.state.get('strategy_streams'))
+        
+        if self.config.get('record_broker') and self.broker:
+            # Log every broker response so this session can be replayed offline
+            self.recorder = record(self.broker, self.config['record_broker'])
+            print(f"✓ Recording broker traffic to {self.config['record_broker']}")
         
         print(f"Trading Pairs: {', '.join(self.config.get('pairs', []))}")
         print(f"Timeframe: {self.config.get('timeframe', '1h')}")
@@ -138,201 +184,819 @@ class ForexTradingBot:
         self.update_thread = threading.Thread(target=self.trading_loop, daemon=True)
         self.update_thread.start()
         
+        if self.config.get('price_stream') and self.broker:
+            self.start_price_stream()
+        
         print("Bot is now running...")
     
+    def apply_strategy_config(self):
+        """Update strategy parameters from the current configuration."""
+        self.strategy.short_ma = self.config.get('short_ma', 50)
+        self.strategy.long_ma = self.config.get('long_ma', 200)
+        self.strategy.risk_per_trade = self.config.get('risk_per_trade', 0.01)
+        self.strategy.stop_loss_pct = self.config.get('stop_loss_pct', 0.01)
+        self.strategy.take_profit_pct = self.config.get('take_profit_pct', 0.02)
+    
+    async def run_async(self, config=None, broker=None):
+        """
+        Run the trading loop on the current asyncio event loop until stopped.
+        
+        Args:
+            config: Trading configuration dict
+            broker: AsyncOANDAConnector to use (one is created from the
+                configured credentials and closed on exit if None)
+        """
+        self.config = config or self.get_default_config()
+        
+        if not self.strategy:
+            self.strategy = MovingAverageCrossoverStrategy()
+        self.apply_strategy_config()
+        
+        owns_broker = broker is None
+        if owns_broker:
+            broker = AsyncOANDAConnector(
+                OANDA_API_KEY, OANDA_ACCOUNT_ID, OANDA_PRACTICE, base_timeframe=BASE_TIMEFRAME
+            )
+        
+        self.running = True
+        print("Bot is now running (asyncio)...")
+        try:
+            await self.async_trading_loop(broker)
+        finally:
+            if owns_broker:
+                await broker.close()
+    
     def stop(self):
         """Stop the trading bot."""
         print("\nStopping Forex Trading Bot...")
         self.running = False
         
+        if self.scheduler:
+            self.scheduler.cancel()
+        
         if self.telegram:
             self.telegram.send_alert('info', 'Forex Trading Bot stopped')
         
+        if self.bar_flusher:
+            self.bar_flusher.cancel()
+            self.bar_flusher = None
+        
+        if self.price_stream:
+            self.price_stream.stop()
+            self.price_stream = None
+            self.bar_aggregator = None
+        
+        if self.bar_pool:
+            self.bar_pool.shutdown(wait=False)
+            self.bar_pool = None
+        
+        if self.fetch_pool:
+            self.fetch_pool.shutdown(wait=False)
+            self.fetch_pool = None
+        
+        if self.recorder:
+            # Flush the gzip trailer so the broker log is readable
+            self.recorder.close_log()
+            print(f"✓ Broker log closed ({self.recorder.count} responses)")
+            self.recorder = None
+        
         self.save_state()
         print("Bot stopped.")
     
     def trading_loop(self):
         """Main trading loop (runs in separate thread)."""
+        self.scheduler = self.build_scheduler()
         while self.running:
             try:
-                self.process_trading_logic()
+                # Sleep until bars close (or an open position needs an exit check)
+                due = self.scheduler.wait(timeout=self.exit_check_interval())
+                if not self.running:
+                    break
                 
-                # Sleep based on timeframe
-                sleep_time = self.get_sleep_time()
-                time.sleep(sleep_time)
+                pairs = self.pairs_to_process(due)
+                if pairs:
+                    self.process_trading_logic(pairs)
+                    self.retry_unpublished(due)
                 
             except Exception as e:
                 print(f"Error in trading loop: {e}")
                 time.sleep(60)  # Wait 1 minute on error
     
-    def process_trading_logic(self):
-        """Process trading logic for all pairs."""
-        if not self.broker:
-            return
-        
-        pairs = self.config.get('pairs', ['EUR/USD'])
-        timeframe = self.config.get('timeframe', '1h')
+    async def async_trading_loop(self, broker):
+        """
+        Main trading loop as a coroutine (asyncio version of trading_loop).
         
-        for pair in pairs:
+        Args:
+            broker: AsyncOANDAConnector instance
+        """
+        self.scheduler = self.build_scheduler()
+        while self.running:
             try:
-                # Fetch current data
-                df = self.broker.get_ohlcv(pair, timeframe, limit=250)
-                
-                if df.empty or len(df) < self.strategy.long_ma:
-                    continue
-                
-                # Calculate indicators and signals
-                df = self.strategy.calculate_indicators(df)
-                signal = self.strategy.get_current_signal(df)
-                
-                current_price = df['close'].iloc[-1]
+                due = await self.scheduler.wait_async(timeout=self.exit_check_interval())
+                if not self.running:
+                    break
                 
-                # Check if we have a position
-                positions = self.broker.get_positions()
-                has_position = pair in positions
+                pairs = self.pairs_to_process(due)
+                if pairs:
+                    await self.process_trading_logic_async(broker, pairs)
+                    self.retry_unpublished(due)
                 
-                if has_position:
-                    # Manage existing position
-                    position = positions[pair]
-                    entry_price = position.get('entryPrice', 0)
-                    side = position.get('side', 'long')
-                    
-                    # Check exit conditions
-                    should_exit, reason = self.strategy.check_exit_conditions(
-                        df, entry_price, side
-                    )
-                    
-                    if should_exit:
-                        print(f"Exiting {pair}: {reason}")
-                        self.close_position(pair, reason)
-                
-                else:
-                    # Look for entry signal
-                    if signal == 1:  # Buy signal
-                        print(f"Buy signal for {pair} at {current_price:.5f}")
-                        self.open_position(pair, 'buy', current_price, df)
-                    
-                    elif signal == -1:  # Sell signal
-                        print(f"Sell signal for {pair} at {current_price:.5f}")
-                        self.open_position(pair, 'sell', current_price, df)
+            except Exception as e:
+                print(f"Error in trading loop: {e}")
+                await asyncio.sleep(60)  # Wait 1 minute on error
+    
+    def build_scheduler(self):
+        """Create a bar-close scheduler for the configured pairs and timeframe."""
+        scheduler = BarCloseScheduler(
+            lag=self.config.get('schedule_lag', 2.0),
+            jitter=self.config.get('schedule_jitter', 0.5)
+        )
+        timeframe = self.config.get('timeframe', '1h')
+        for pair in self.config.get('pairs', ['EUR/USD']):
+            scheduler.add(pair, timeframe)
+        return scheduler
+    
+    def exit_check_interval(self):
+        """
+        Get the seconds between exit checks while no bar closes.
+        
+        Returns:
+            None when there are no open positions or ticks already check
+            exits, otherwise the configured 'exit_check_interval'
+        """
+        if not self.positions or self.price_stream:
+            return None
+        return self.config.get('exit_check_interval', 300)
+    
+    def pairs_to_process(self, due):
+        """
+        Get the pairs to run through the trading logic after a wakeup.
+        
+        Args:
+            due: (pair, timeframe) jobs whose bars closed; empty when woken
+                for an exit check
+            
+        Returns:
+            List of pairs
+        """
+        if due:
+            return sorted({pair for pair, _ in due})
+        return [pair for pair in self.config.get('pairs', ['EUR/USD']) if pair in self.positions]
+    
+    def retry_unpublished(self, due):
+        """Reschedule jobs whose closed candle the broker had not published yet."""
+        for pair, timeframe in due:
+            buffer = self.bar_buffers.get((pair, timeframe))
+            closed_at = self.scheduler.last_close(timeframe)
+            if buffer is None or closed_at is None:
+                continue
+            # Broker lag: the bar that just closed is still reported as forming.
+            # Older data means no trading (e.g. weekend), so there is nothing to wait for.
+            if buffer.last_timestamp() == closed_at - timeframe_to_ms(timeframe):
+                if not self.scheduler.retry(pair, timeframe):
+                    print(f"No new {timeframe} candle for {pair} after {self.scheduler.max_retries} retries")
+    
+    async def process_trading_logic_async(self, broker, pairs=None):
+        """
+        Process trading logic with an async broker.
+        
+        Args:
+            broker: AsyncOANDAConnector instance
+            pairs: Pairs to process (default: all configured pairs)
+        """
+        pairs = pairs or self.config.get('pairs', ['EUR/USD'])
+        timeframe = self.config.get('timeframe', '1h')
+        
+        # Fetch stage: all requests in flight at once on the event loop
+        positions, *frames = await asyncio.gather(
+            broker.get_positions(),
+            *(broker.get_ohlcv(pair, timeframe, 250) for pair in pairs)
+        )
+        self.positions = positions
+        
+        market_data = {}
+        for pair, df in zip(pairs, frames):
+            if df is not None and not df.empty:
+                market_data[pair] = self.buffer_for(pair, timeframe)
+                market_data[pair].update(df)
+        
+        table = self.scan_pairs(pairs, market_data, positions)
+        
+        for pair, action, detail in self.table_actions(table):
+            try:
+                if action == 'close':
+                    await self.close_position_async(broker, pair, detail)
+                elif action == 'open':
+                    await self.open_position_async(broker, pair, detail, float(market_data[pair]['close'][-1]))
                 
             except Exception as e:
                 print(f"Error processing {pair}: {e}")
                 continue
         
-        # Periodic AI analysis
-        if self.should_run_ai_analysis():
-            self.run_ai_analysis()
+        self.checkpoint_strategy()
+        
+        # Periodic AI analysis, off the event loop since the OpenAI client blocks
+        if self.ai_manager and self.should_run_ai_analysis():
+            account_info = await broker.get_account_info()
+            await asyncio.to_thread(
+                self.report_ai_analysis, account_info, account_info.get('positions', {})
+            )
     
-    def open_position(self, pair, side, entry_price, df):
+    async def open_position_async(self, broker, pair, side, entry_price):
         """
-        Open a new position.
+        Open a new position through an async broker.
         
         Args:
+            broker: AsyncOANDAConnector instance
             pair: Trading pair
             side: 'buy' or 'sell'
             entry_price: Entry price
-            df: DataFrame with current data
         """
-        if not self.broker:
-            return
-        
         try:
-            # Get account balance
-            balance_info = self.broker.get_balance()
+            balance_info = await broker.get_balance()
             balance = balance_info.get('free', 0)
             
-            # Calculate position size
-            stop_loss = self.strategy.calculate_stop_loss(entry_price, 'long' if side == 'buy' else 'short')
-            position_size = self.strategy.calculate_position_size(balance, entry_price, stop_loss)
+            position_size, stop_loss, take_profit = self.plan_entry(side, entry_price, balance)
             
             if position_size <= 0:
                 print(f"Position size too small for {pair}")
                 return
             
-            # Calculate take profit
-            take_profit = self.strategy.calculate_take_profit(entry_price, 'long' if side == 'buy' else 'short')
-            
-            # Execute order
-            order = self.broker.create_market_order(pair, side, position_size)
+            order = await broker.create_market_order(pair, side, position_size)
             
             if order:
-                # Send notifications
-                if self.telegram:
-                    self.telegram.send_trade_entry(
-                        pair, side, position_size, entry_price, stop_loss, take_profit
-                    )
-                
-                # Log trade
-                self.log_trade({
-                    'timestamp': datetime.now().isoformat(),
-                    'symbol': pair,
-                    'side': side,
-                    'size': position_size,
-                    'entry_price': entry_price,
-                    'stop_loss': stop_loss,
-                    'take_profit': take_profit,
-                    'status': 'open'
-                })
-                
-                print(f"Position opened: {side} {position_size} {pair} @ {entry_price:.5f}")
+                self.record_entry(pair, side, position_size, entry_price, stop_loss, take_profit)
                 
         except Exception as e:
             print(f"Error opening position for {pair}: {e}")
     
-    def close_position(self, pair, reason=""):
+    async def close_position_async(self, broker, pair, reason=""):
         """
-        Close an existing position.
+        Close an existing position through an async broker.
         
         Args:
+            broker: AsyncOANDAConnector instance
             pair: Trading pair
             reason: Reason for closing
         """
-        if not self.broker:
-            return
-        
         try:
-            # Get position details
-            positions = self.broker.get_positions()
+            positions = await broker.get_positions(refresh=True)
             if pair not in positions:
                 return
             
             position = positions[pair]
             
-            # Close position
-            result = self.broker.close_position(pair)
+            result = await broker.close_position(pair)
             
             if result:
-                # Calculate P&L (simplified)
-                entry_price = position.get('entryPrice', 0)
-                current_price = self.broker.get_ticker(pair)['last'] if self.broker.get_ticker(pair) else 0
-                size = position.get('contracts', 0)
+                ticker = await broker.get_ticker(pair)
+                current_price = ticker['last'] if ticker else 0
+                self.record_exit(pair, position, current_price, reason)
+                
+        except Exception as e:
+            print(f"Error closing position for {pair}: {e}")
+    
+    def start_price_stream(self, stream=None):
+        """
+        Start streaming prices and check exits on every tick.
+        
+        Args:
+            stream: PriceStream to use (defaults to the OANDA stream, or
+                config['price_stream_url'] for a local replay server)
+        """
+        if stream is None:
+            pairs = self.config.get('pairs', ['EUR/USD'])
+            url = self.config.get('price_stream_url')
+            if url:
+                stream = PriceStream(url, pairs)
+            else:
+                stream = PriceStream.for_oanda(OANDA_API_KEY, OANDA_ACCOUNT_ID, pairs, OANDA_PRACTICE)
+        
+        # Build bars from ticks so entries can react to a bar close at once
+        sink = getattr(self.broker, 'ingest_bars', None)
+        self.bar_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bar-close')
+        self.bar_aggregator = BarAggregator(
+            [self.config.get('timeframe', '1h')],
+            on_bar_close=self.queue_bar_close,
+            sink=sink
+        )
+        
+        self.price_stream = stream
+        stream.start(self.on_tick)
+        self.start_bar_flusher()
+        print("✓ Price stream started")
+    
+    def start_bar_flusher(self, scheduler=None):
+        """
+        Close streamed bars at each timeframe boundary.
+        
+        The aggregator only closes a bar on the next tick, which may come
+        much later in a quiet market. A scheduler thread flushes it just
+        after every boundary instead.
+        
+        Args:
+            scheduler: BarCloseScheduler to use (defaults to one firing
+                config['bar_flush_lag'] seconds after each boundary)
+        """
+        if scheduler is None:
+            scheduler = BarCloseScheduler(lag=self.config.get('bar_flush_lag', 1.0), jitter=0)
+            timeframe = self.config.get('timeframe', '1h')
+            for pair in self.config.get('pairs', ['EUR/USD']):
+                scheduler.add(pair, timeframe)
+        
+        self.bar_flusher = scheduler
+        aggregator = self.bar_aggregator
+        
+        def flush_loop():
+            # wait() returns no jobs only once cancelled
+            while scheduler.wait():
+                try:
+                    aggregator.flush(int(scheduler.clock() * 1000))
+                except Exception as e:
+                    print(f"Error flushing bars: {e}")
+        
+        threading.Thread(target=flush_loop, name='bar-flush', daemon=True).start()
+    
+    def on_tick(self, tick):
+        """
+        Check stop-loss and take-profit for an open position on a price tick.
+        
+        Args:
+            tick: price_stream.Tick
+        """
+        if not self.broker or not self.strategy:
+            return
+        
+        if self.bar_aggregator:
+            self.bar_aggregator.on_tick(tick)
+        
+        try:
+            position = self.broker.get_positions().get(tick.symbol)
+            if not position:
+                return
+            
+            side = position.get('side', 'long')
+            exit_price = tick.bid if side == 'long' else tick.ask
+            should_exit, reason = self.strategy.check_price_exit(
+                exit_price, position.get('entryPrice', 0), side
+            )
+            
+            if should_exit:
+                print(f"Exiting {tick.symbol} on tick: {reason}")
+                self.close_position(tick.symbol, reason)
+                
+        except Exception as e:
+            print(f"Error handling tick for {tick.symbol}: {e}")
+    
+    def queue_bar_close(self, symbol, timeframe, bar):
+        """
+        Hand a closed bar to the bar-close worker.
+        
+        Evaluating a bar calls the broker and may place orders, which must
+        not hold up the stream thread and the tick-level exit checks.
+        """
+        pool = self.bar_pool
+        if pool is None:
+            self.on_bar_close(symbol, timeframe, bar)
+            return
+        try:
+            pool.submit(self.on_bar_close, symbol, timeframe, bar)
+        except RuntimeError:
+            pass  # Stopping
+    
+    def on_bar_close(self, symbol, timeframe, bar):
+        """
+        Evaluate a pair as soon as the aggregator closes one of its bars.
+        
+        Args:
+            symbol: Trading pair
+            timeframe: Timeframe of the closed bar
+            bar: [timestamp, open, high, low, close, volume]
+        """
+        if timeframe != self.config.get('timeframe', '1h'):
+            return
+        if symbol not in self.config.get('pairs', []) or not hasattr(self.broker, 'get_cached_ohlcv'):
+            return
+        
+        try:
+            df = self.broker.get_cached_ohlcv(symbol, timeframe, limit=250)
+            action, detail = self.evaluate_pair(symbol, df, self.broker.get_positions())
+            self.execute_action(symbol, action, detail, df, bar_time=int(bar[0]))
+        except Exception as e:
+            print(f"Error processing bar close for {symbol}: {e}")
+    
+    def fetch_market_data(self, pairs, timeframe, limit=250):
+        """
+        Fetch candles for all pairs and open positions concurrently.
+        
+        Args:
+            pairs: List of trading pairs
+            timeframe: Candle timeframe
+            limit: Number of candles per pair
+            
+        Returns:
+            tuple: (dict of pair -> BarRingBuffer, dict of open positions)
+        """
+        if self.fetch_pool is None:
+            workers = self.config.get('fetch_workers', 16)
+            self.fetch_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fetch')
+        
+        positions_future = self.fetch_pool.submit(self.broker.get_positions)
+        candle_futures = {
+            pair: self.fetch_pool.submit(self.fetch_bars, pair, timeframe, limit)
+            for pair in pairs
+        }
+        
+        market_data = {}
+        for pair, future in candle_futures.items():
+            try:
+                market_data[pair] = future.result()
+            except Exception as e:
+                print(f"Error fetching data for {pair}: {e}")
+        
+        return market_data, positions_future.result()
+    
+    def fetch_bars(self, pair, timeframe, limit=250):
+        """
+        Top up a pair's bar buffer with the bars it does not have yet.
+        
+        Args:
+            pair: Trading pair
+            timeframe: Candle timeframe
+            limit: Bars of history to keep
+            
+        Returns:
+            BarRingBuffer, or None if no data could be fetched
+        """
+        buffer = self.buffer_for(pair, timeframe, limit)
+        
+        since = buffer.last_timestamp()
+        if since is None and self.strategy:
+            # A checkpointed strategy state only needs the bars it has not seen
+            since = self.strategy.stream_timestamp(self.stream_key(pair, timeframe))
+        if since is not None and hasattr(self.broker, 'get_ohlcv_since'):
+            df = self.broker.get_ohlcv_since(pair, timeframe, since, limit)
+        else:
+            df = self.broker.get_ohlcv(pair, timeframe, limit)
+        
+        if df is None or df.empty:
+            return None
+        buffer.update(df)
+        return buffer
+    
+    def buffer_for(self, pair, timeframe, limit=250):
+        """Get the bar buffer of a pair and timeframe, creating it if needed."""
+        key = (pair, timeframe)
+        buffer = self.bar_buffers.get(key)
+        if buffer is None or buffer.capacity != limit:
+            buffer = self.bar_buffers[key] = BarRingBuffer(limit)
+        return buffer
+    
+    def stream_key(self, pair, timeframe=None):
+        """Key of a pair's streaming strategy state."""
+        return f"{pair} {timeframe or self.config.get('timeframe', '1h')}"
+    
+    def checkpoint_strategy(self):
+        """Save the streaming strategy state once a new bar has been processed."""
+        marks = {key: state.timestamp for key, state in self.strategy.streams.items()}
+        if marks != self.state.get('strategy_marks'):
+            self.state['strategy_streams'] = self.strategy.get_stream_state()
+            self.state['strategy_marks'] = marks
+            self.save_state()
+    
+    def process_trading_logic(self, pairs=None):
+        """
+        Process trading logic.
+        
+        Args:
+            pairs: Pairs to process (default: all configured pairs)
+        """
+        if not self.broker:
+            return
+        
+        pairs = pairs or self.config.get('pairs', ['EUR/USD'])
+        timeframe = self.config.get('timeframe', '1h')
+        
+        # Fetch stage: one concurrent round of broker requests
+        market_data, positions = self.fetch_market_data(pairs, timeframe, limit=250)
+        self.positions = positions
+        
+        # Signal stage: one vectorized evaluation for all pairs
+        table = self.scan_pairs(pairs, market_data, positions)
+        
+        for pair, action, detail in self.table_actions(table):
+            try:
+                bars = market_data[pair]
+                # The newest bar is still forming; signals come from the one before it
+                bar_time = int(bars['timestamp'][-2]) if len(bars) > 1 else None
+                self.execute_action(pair, action, detail, bars, bar_time)
+                
+            except Exception as e:
+                print(f"Error processing {pair}: {e}")
+                continue
+        
+        self.checkpoint_strategy()
+        
+        # Periodic AI analysis
+        if self.should_run_ai_analysis():
+            self.run_ai_analysis()
+    
+    def scan_pairs(self, pairs, market_data, positions):
+        """
+        Evaluate all pairs into one signal table.
+        
+        The newest bar of each buffer is still forming. Entry signals are
+        evaluated only when a pair has a new closed bar (its timestamp is
+        past the streaming state's), so each crossover fires once and
+        unchanged pairs skip the indicator update. Stop-loss and
+        take-profit are checked against the latest price every cycle.
+        
+        Args:
+            pairs: List of trading pairs
+            market_data: Dict of pair -> BarRingBuffer (or None)
+            positions: Dict of open positions keyed by symbol
+            
+        Returns:
+            Signal table (see signal_engine.SIGNAL_DTYPE), one row per pair
+        """
+        nan = (np.nan,) * 5
+        rows = []
+        for pair in pairs:
+            row = nan
+            bars = market_data.get(pair)
+            try:
+                if bars is not None and len(bars):
+                    key = self.stream_key(pair)
+                    closes = bars['close']
+                    row = (closes[-1],) + nan[1:]
+                    
+                    closed = len(bars) - 1
+                    marker = self.strategy.stream_timestamp(key)
+                    new_bar = closed > 0 and (marker is None or bars['timestamp'][closed - 1] > marker)
+                    if new_bar:
+                        self.strategy.update_stream(key, bars['timestamp'][:closed], closes[:closed])
+                    
+                    state = self.strategy.streams.get(key)
+                    if state is not None and state.is_warm():
+                        # Without a new closed bar there is no crossover to act on
+                        prev = (state.prev_short, state.prev_long) if new_bar else (None, None)
+                        row = (closes[-1], state.sma_short(), state.sma_long()) + prev
+            except Exception as e:
+                print(f"Error processing {pair}: {e}")
+            rows.append(row)
+        
+        # A None SMA (not enough history yet) becomes NaN: no signal
+        values = np.array(rows, dtype=np.float64).reshape(len(pairs), 5).T
+        engine = SignalEngine.from_strategy(self.strategy)
+        return engine.evaluate(pairs, *values, positions=positions)
+    
+    def table_actions(self, table):
+        """
+        Turn a signal table into orders to send.
+        
+        Returns:
+            List of (pair, action, detail) - ('close', reason) or ('open', side)
+        """
+        actions = []
+        for row in SignalEngine.actionable(table):
+            pair = str(row['symbol'])
+            if row['position'] != 0:
+                reason = exit_reason(row)
+                print(f"Exiting {pair}: {reason}")
+                actions.append((pair, 'close', reason))
+            else:
+                side = 'buy' if row['signal'] == 1 else 'sell'
+                print(f"{side.capitalize()} signal for {pair} at {row['close']:.5f}")
+                actions.append((pair, 'open', side))
+        return actions
+    
+    def evaluate_pair(self, pair, bars, positions):
+        """
+        Decide what to do for one pair based on its candles and positions.
+        
+        Used when a bar closes (on_bar_close); polling cycles go through
+        scan_pairs, which keeps the streaming state on closed bars.
+        
+        Args:
+            pair: Trading pair
+            bars: DataFrame with OHLCV data
+            positions: Dict of open positions keyed by symbol
+            
+        Returns:
+            tuple: (action, detail) - ('close', reason), ('open', side)
+            or (None, None)
+        """
+        if bars is None or len(bars) == 0:
+            return None, None
+        
+        if len(bars) < self.strategy.long_ma:
+            return None, None
+        
+        closes = np.asarray(bars['close'])
+        signal = self.strategy.signal_from_indicators(self.evaluate_indicators(pair, bars)['ma'])
+        
+        current_price = closes[-1]
+        
+        if pair in positions:
+            # Manage existing position
+            position = positions[pair]
+            entry_price = position.get('entryPrice', 0)
+            side = position.get('side', 'long')
+            
+            # Check exit conditions
+            should_exit, reason = self.strategy.check_exit(
+                current_price, signal, entry_price, side
+            )
+            
+            if should_exit:
+                print(f"Exiting {pair}: {reason}")
+                return 'close', reason
+        
+        # Look for entry signal
+        elif signal == 1:  # Buy signal
+            print(f"Buy signal for {pair} at {current_price:.5f}")
+            return 'open', 'buy'
+        
+        elif signal == -1:  # Sell signal
+            print(f"Sell signal for {pair} at {current_price:.5f}")
+            return 'open', 'sell'
+        
+        return None, None
+    
+    def evaluate_indicators(self, pair, bars):
+        """
+        Evaluate the active strategy's indicators on a pair's candles.
+        
+        The indicator graph computes each distinct indicator once, through
+        indicators.shared_cache keyed by the candle values. The newest
+        values are kept in indicator_values for the dashboard and the AI.
+        
+        Args:
+            pair: Trading pair
+            bars: DataFrame with OHLCV data
+            
+        Returns:
+            dict of strategy -> {alias: float64 array}
+        """
+        ma = {alias: normalize_key(key) for alias, key in self.strategy.indicator_requirements().items()}
+        if self.indicator_graph.requirements.get('ma') != ma:
+            self.indicator_graph.require('ma', ma)
+        
+        columns = [np.asarray(bars[field], dtype=np.float64) for field in ('high', 'low', 'close')]
+        series = series_id(pair, self.config.get('timeframe', '1h'), bars.index, *columns)
+        results = self.indicator_graph.evaluate(bars, cache=shared_cache, series=series)
+        self.indicator_values[pair] = {
+            strategy: {alias: float(values[-1]) for alias, values in indicators.items()}
+            for strategy, indicators in results.items()
+        }
+        return results
+    
+    def execute_action(self, pair, action, detail, bars, bar_time=None):
+        """Carry out an action returned by evaluate_pair or table_actions."""
+        if action == 'close':
+            self.close_position(pair, detail)
+        elif action == 'open':
+            self.open_position(pair, detail, float(np.asarray(bars['close'])[-1]), bars, bar_time)
+    
+    def open_position(self, pair, side, entry_price, df, bar_time=None):
+        """
+        Open a new position.
+        
+        Args:
+            pair: Trading pair
+            side: 'buy' or 'sell'
+            entry_price: Entry price
+            df: BarRingBuffer or DataFrame with current data
+            bar_time: Timestamp (ms) of the closed bar behind the signal;
+                a bar that already opened a position is not acted on again
+        """
+        if not self.broker:
+            return
+        
+        try:
+            # Bar closes and the trading loop may both try to open
+            with self.order_lock:
+                if bar_time is not None and bar_time <= self.entry_bars.get(pair, -1):
+                    return
+                if pair in self.broker.get_positions(refresh=True):
+                    return
                 
-                pnl = (current_price - entry_price) * size
+                # Get account balance
+                balance_info = self.broker.get_balance()
+                balance = balance_info.get('free', 0)
                 
-                # Send notifications
-                if self.telegram:
-                    self.telegram.send_trade_exit(
-                        pair, position.get('side', 'long'), size, current_price, pnl
-                    )
+                position_size, stop_loss, take_profit = self.plan_entry(side, entry_price, balance)
                 
-                # Log trade
-                self.log_trade({
-                    'timestamp': datetime.now().isoformat(),
-                    'symbol': pair,
-                    'exit_price': current_price,
-                    'pnl': pnl,
-                    'reason': reason,
-                    'status': 'closed'
-                })
+                if position_size <= 0:
+                    print(f"Position size too small for {pair}")
+                    return
+                
+                # Execute order
+                order = self.broker.create_market_order(pair, side, position_size)
+                if order and bar_time is not None:
+                    self.entry_bars[pair] = bar_time
+            
+            if order:
+                self.record_entry(pair, side, position_size, entry_price, stop_loss, take_profit)
+                
+        except Exception as e:
+            print(f"Error opening position for {pair}: {e}")
+    
+    def plan_entry(self, side, entry_price, balance):
+        """
+        Calculate size, stop-loss and take-profit for a new position.
+        
+        Returns:
+            tuple: (position_size, stop_loss, take_profit)
+        """
+        position_side = 'long' if side == 'buy' else 'short'
+        stop_loss = self.strategy.calculate_stop_loss(entry_price, position_side)
+        position_size = self.strategy.calculate_position_size(balance, entry_price, stop_loss)
+        take_profit = self.strategy.calculate_take_profit(entry_price, position_side)
+        return position_size, stop_loss, take_profit
+    
+    def record_entry(self, pair, side, position_size, entry_price, stop_loss, take_profit):
+        """Notify and log an opened position."""
+        # Send notifications
+        if self.telegram:
+            self.telegram.send_trade_entry(
+                pair, side, position_size, entry_price, stop_loss, take_profit
+            )
+        
+        # Log trade
+        self.log_trade({
+            'timestamp': datetime.now().isoformat(),
+            'symbol': pair,
+            'side': side,
+            'size': position_size,
+            'entry_price': entry_price,
+            'stop_loss': stop_loss,
+            'take_profit': take_profit,
+            'status': 'open'
+        })
+        
+        print(f"Position opened: {side} {position_size} {pair} @ {entry_price:.5f}")
+    
+    def close_position(self, pair, reason=""):
+        """
+        Close an existing position.
+        
+        Args:
+            pair: Trading pair
+            reason: Reason for closing
+        """
+        if not self.broker:
+            return
+        
+        try:
+            # The trading loop and the price stream may both try to close
+            with self.order_lock:
+                # Get position details; the snapshot may predate a broker-side exit
+                positions = self.broker.get_positions(refresh=True)
+                if pair not in positions:
+                    return
                 
-                self.daily_pnl += pnl
+                position = positions[pair]
                 
-                print(f"Position closed: {pair}, P&L: ${pnl:.2f}, Reason: {reason}")
+                # Close position
+                result = self.broker.close_position(pair)
+            
+            if result:
+                ticker = self.broker.get_ticker(pair)
+                current_price = ticker['last'] if ticker else 0
+                self.record_exit(pair, position, current_price, reason)
                 
         except Exception as e:
             print(f"Error closing position for {pair}: {e}")
     
+    def record_exit(self, pair, position, current_price, reason):
+        """Notify and log a closed position."""
+        # Calculate P&L (simplified)
+        entry_price = position.get('entryPrice', 0)
+        size = position.get('contracts', 0)
+        
+        pnl = (current_price - entry_price) * size
+        
+        # Send notifications
+        if self.telegram:
+            self.telegram.send_trade_exit(
+                pair, position.get('side', 'long'), size, current_price, pnl
+            )
+        
+        # Log trade
+        self.log_trade({
+            'timestamp': datetime.now().isoformat(),
+            'symbol': pair,
+            'exit_price': current_price,
+            'pnl': pnl,
+            'reason': reason,
+            'status': 'closed'
+        })
+        
+        self.daily_pnl += pnl
+        
+        print(f"Position closed: {pair}, P&L: ${pnl:.2f}, Reason: {reason}")
+    
     def should_run_ai_analysis(self):
         """Check if it's time to run AI analysis."""
         last_analysis = self.state.get('last_ai_analysis', 0)
@@ -350,6 +1014,14 @@ class ForexTradingBot:
             account_info = self.broker.get_account_info()
             positions = self.broker.get_positions()
             
+            self.report_ai_analysis(account_info, positions)
+            
+        except Exception as e:
+            print(f"Error running AI analysis: {e}")
+    
+    def report_ai_analysis(self, account_info, positions):
+        """Run AI portfolio analysis on given account data and publish it."""
+        try:
             analysis = self.ai_manager.analyze_portfolio(
                 account_info, positions, self.trades[-10:]
             )
@@ -386,27 +1058,14 @@ class ForexTradingBot:
             if self.broker:
                 context['account'] = self.broker.get_account_info()
                 context['positions'] = self.broker.get_positions()
+            if self.indicator_values:
+                context['indicators'] = self.indicator_values
             
             response = self.ai_manager.chat_query(message, context)
             return response
         except Exception as e:
             return f"Error querying AI: {str(e)}"
     
-    def get_sleep_time(self):
-        """Get sleep time based on timeframe."""
-        timeframe = self.config.get('timeframe', '1h')
-        
-        timeframe_map = {
-            '5m': 30,    # Check every 30 seconds
-            '15m': 60,   # Check every minute
-            '30m': 120,  # Check every 2 minutes
-            '1h': 300,   # Check every 5 minutes
-            '4h': 600,   # Check every 10 minutes
-            '1d': 1800   # Check every 30 minutes
-        }
-        
-        return timeframe_map.get(timeframe, 300)
-    
     def get_default_config(self):
         """Get default configuration."""
         return {
@@ -417,7 +1076,14 @@ class ForexTradingBot:
             'risk_per_trade': 0.01,
             'stop_loss_pct': 0.01,
             'take_profit_pct': 0.02,
-            'max_drawdown': 0.10
+            'max_drawdown': 0.10,
+            'fetch_workers': 16,
+            'price_stream': False,
+            'record_broker': None,
+            'schedule_lag': 2.0,
+            'schedule_jitter': 0.5,
+            'bar_flush_lag': 1.0,
+            'exit_check_interval': 300
         }
     
     def save_configuration(self, config):
@@ -462,7 +1128,8 @@ class ForexTradingBot:
             'positions_count': 0,
             'daily_pnl': self.daily_pnl,
             'positions': [],
-            'recent_trades': []
+            'recent_trades': [],
+            'indicators': dict(self.indicator_values)
         }
         
         if self.broker:
@@ -482,6 +1149,9 @@ class ForexTradingBot:
                     pos.get('currentPrice', 0),
                     pos.get('unrealizedPL', 0)
                 ))
+            
+            if hasattr(self.broker, 'request_stats'):
+                data['api_requests'] = self.broker.request_stats()
         
         # Format recent trades
         for trade in self.trades[-10:]:
@@ -2,9 +2,148 @@
 Forex Strategy Module
 Implements Moving Average Crossover Strategy for forex trading.
 """
+import math
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from indicators import sma, shared_cache
+
+
+class CrossoverState:
+    """
+    Streaming SMA crossover state for one pair.
+    
+    Keeps the last `long_ma` closes in a ring with running sums, so a new
+    bar or an update of the forming bar costs O(1). The SMAs of the
+    previous bar are frozen when a new bar starts, which gives the same
+    crossover rule as calculate_indicators.
+    """
+    
+    # Re-add the sums exactly every this many bars to stop float drift
+    RESYNC_BARS = 1000
+    
+    def __init__(self, short_ma, long_ma):
+        """
+        Initialize state.
+        
+        Args:
+            short_ma: Short moving average period
+            long_ma: Long moving average period
+        """
+        self.short_ma = short_ma
+        self.long_ma = long_ma
+        self.ring = [0.0] * long_ma
+        self.head = 0
+        self.count = 0
+        self.timestamp = None
+        self.short_sum = 0.0
+        self.long_sum = 0.0
+        self.prev_short = None
+        self.prev_long = None
+        self._since_resync = 0
+    
+    def _close(self, back):
+        """Close `back` bars before the newest one (0 = newest)."""
+        return self.ring[(self.head - 1 - back) % self.long_ma]
+    
+    def sma_short(self):
+        return self.short_sum / self.short_ma if self.count >= self.short_ma else None
+    
+    def sma_long(self):
+        return self.long_sum / self.long_ma if self.count >= self.long_ma else None
+    
+    def update(self, timestamp, close):
+        """
+        Add a bar, or update the newest bar if `timestamp` matches it.
+        
+        Args:
+            timestamp: Bar start (ms)
+            close: Close price
+        """
+        close = float(close)
+        if self.timestamp is not None and timestamp < self.timestamp:
+            return
+        
+        if timestamp == self.timestamp:
+            # Forming bar changed: it is in both windows
+            delta = close - self._close(0)
+            self.ring[(self.head - 1) % self.long_ma] = close
+            self.short_sum += delta
+            self.long_sum += delta
+            return
+        
+        self.prev_short, self.prev_long = self.sma_short(), self.sma_long()
+        
+        if self.count >= self.short_ma:
+            self.short_sum -= self._close(self.short_ma - 1)
+        if self.count >= self.long_ma:
+            self.long_sum -= self._close(self.long_ma - 1)
+        
+        self.ring[self.head] = close
+        self.head = (self.head + 1) % self.long_ma
+        self.count = min(self.count + 1, self.long_ma + 1)
+        self.short_sum += close
+        self.long_sum += close
+        self.timestamp = timestamp
+        
+        self._since_resync += 1
+        if self._since_resync >= self.RESYNC_BARS:
+            self._resync()
+    
+    def _resync(self):
+        closes = self.closes()
+        self.short_sum = math.fsum(closes[-self.short_ma:])
+        self.long_sum = math.fsum(closes)
+        self._since_resync = 0
+    
+    def closes(self):
+        """Get the stored closes, oldest first."""
+        n = min(self.count, self.long_ma)
+        return [self._close(back) for back in range(n - 1, -1, -1)]
+    
+    def is_warm(self):
+        """Check whether enough bars were seen to evaluate the pair."""
+        return self.count >= self.long_ma
+    
+    def signal(self):
+        """
+        Get the crossover signal on the newest bar.
+        
+        Returns:
+            Signal: 1 (buy), -1 (sell), 0 (hold)
+        """
+        if self.prev_long is None or self.prev_short is None:
+            return 0
+        short_now, long_now = self.sma_short(), self.sma_long()
+        if short_now > long_now and self.prev_short <= self.prev_long:
+            return 1
+        if short_now < long_now and self.prev_short >= self.prev_long:
+            return -1
+        return 0
+    
+    def to_dict(self):
+        """Serialize the state for a checkpoint."""
+        return {
+            'short_ma': self.short_ma,
+            'long_ma': self.long_ma,
+            'timestamp': self.timestamp,
+            'count': self.count,
+            'closes': self.closes(),
+            'prev': [self.prev_short, self.prev_long],
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Restore a state saved with to_dict."""
+        state = cls(data['short_ma'], data['long_ma'])
+        for close in data['closes']:
+            state.ring[state.head] = float(close)
+            state.head = (state.head + 1) % state.long_ma
+        state.count = data['count']
+        state.timestamp = data['timestamp']
+        state.prev_short, state.prev_long = data['prev']
+        state._resync()
+        return state
 
 
 class MovingAverageCrossoverStrategy:
@@ -40,12 +179,17 @@ class MovingAverageCrossoverStrategy:
         self.signals = {}
         self.positions = {}
         
-    def calculate_indicators(self, df):
+        # Streaming crossover state per key (e.g., pair and timeframe)
+        self.streams = {}
+        
+    def calculate_indicators(self, df, series=None):
         """
         Calculate moving averages and generate signals.
         
         Args:
             df: DataFrame with OHLCV data
+            series: Optional series id (see indicators.series_id); the SMAs
+                are then shared through indicators.shared_cache
             
         Returns:
             DataFrame with indicators and signals
@@ -54,8 +198,13 @@ class MovingAverageCrossoverStrategy:
             return df
         
         # Calculate Simple Moving Averages
-        df['sma_short'] = df['close'].rolling(window=self.short_ma).mean()
-        df['sma_long'] = df['close'].rolling(window=self.long_ma).mean()
+        if series is not None:
+            df['sma_short'] = shared_cache.get(series, 'sma', df, period=self.short_ma)
+            df['sma_long'] = shared_cache.get(series, 'sma', df, period=self.long_ma)
+        else:
+            closes = df['close'].to_numpy()
+            df['sma_short'] = sma(closes, self.short_ma)
+            df['sma_long'] = sma(closes, self.long_ma)
         
         # Generate signals: 1 for buy, -1 for sell, 0 for hold
         df['signal'] = 0
@@ -70,6 +219,18 @@ class MovingAverageCrossoverStrategy:
         
         return df
     
+    def indicator_requirements(self):
+        """
+        Get the indicators this strategy needs, for an IndicatorGraph.
+        
+        Returns:
+            dict of alias -> indicator key
+        """
+        return {
+            'sma_short': ('sma', self.short_ma),
+            'sma_long': ('sma', self.long_ma),
+        }
+    
     def get_current_signal(self, df):
         """
         Get the most recent trading signal.
@@ -85,6 +246,110 @@ class MovingAverageCrossoverStrategy:
         
         return df['signal'].iloc[-1]
     
+    def get_signal(self, closes):
+        """
+        Get the crossover signal on the newest bar from close prices alone.
+        
+        Same rule as calculate_indicators, but reads a NumPy array (e.g., a
+        BarRingBuffer window) without building indicator columns.
+        
+        Args:
+            closes: Close prices, oldest first
+            
+        Returns:
+            Signal: 1 (buy), -1 (sell), 0 (hold)
+        """
+        if closes is None or len(closes) < self.long_ma + 1:
+            return 0
+        
+        short_now = closes[-self.short_ma:].mean()
+        short_prev = closes[-self.short_ma - 1:-1].mean()
+        long_now = closes[-self.long_ma:].mean()
+        long_prev = closes[-self.long_ma - 1:-1].mean()
+        return self._cross_signal(short_now, short_prev, long_now, long_prev)
+    
+    def signal_from_indicators(self, values):
+        """
+        Get the crossover signal on the newest bar from precomputed SMAs.
+        
+        Same rule as get_signal, for SMAs computed elsewhere (e.g., by an
+        IndicatorGraph from indicator_requirements()).
+        
+        Args:
+            values: dict with 'sma_short' and 'sma_long' arrays, oldest first
+            
+        Returns:
+            Signal: 1 (buy), -1 (sell), 0 (hold)
+        """
+        short, long = values['sma_short'], values['sma_long']
+        if len(short) < 2:
+            return 0
+        # NaN (still warming up) compares False: no signal
+        return self._cross_signal(short[-1], short[-2], long[-1], long[-2])
+    
+    def _cross_signal(self, short_now, short_prev, long_now, long_prev):
+        """Crossover rule on the newest two SMA values."""
+        if short_now > long_now and short_prev <= long_prev:
+            return 1
+        if short_now < long_now and short_prev >= long_prev:
+            return -1
+        return 0
+    
+    def update_stream(self, key, timestamps, closes):
+        """
+        Feed bars into the streaming state for `key` and get its signal.
+        
+        Only bars at or after the state's newest bar are processed, so a
+        cycle with one new or updated bar costs O(1) regardless of window
+        length. Windows should include the newest bar already seen; the
+        state restarts from the given bars if they do not reach back to it
+        (a gap) or the MA periods changed.
+        
+        Args:
+            key: Stream identifier (e.g., 'EUR/USD 1h')
+            timestamps: Bar timestamps in ms, oldest first
+            closes: Close prices, oldest first
+            
+        Returns:
+            Signal: 1 (buy), -1 (sell), 0 (hold), or None until warmed up
+        """
+        state = self.streams.get(key)
+        if state is None or (state.short_ma, state.long_ma) != (self.short_ma, self.long_ma):
+            state = None
+        elif state.timestamp is not None and len(timestamps) and timestamps[0] > state.timestamp:
+            # Bars between the state and this window are unknown
+            state = None
+        
+        if state is None:
+            state = self.streams[key] = CrossoverState(self.short_ma, self.long_ma)
+            start = max(0, len(closes) - self.long_ma - 1)
+        else:
+            start = int(np.searchsorted(timestamps, state.timestamp, side='left'))
+        
+        for i in range(start, len(closes)):
+            state.update(int(timestamps[i]), closes[i])
+        
+        return state.signal() if state.is_warm() else None
+    
+    def stream_timestamp(self, key):
+        """Get the newest bar timestamp (ms) seen by a stream, or None."""
+        state = self.streams.get(key)
+        if state is None or (state.short_ma, state.long_ma) != (self.short_ma, self.long_ma):
+            return None
+        return state.timestamp
+    
+    def get_stream_state(self):
+        """Get a JSON-serializable checkpoint of all streaming states."""
+        return {key: state.to_dict() for key, state in self.streams.items()}
+    
+    def load_stream_state(self, data):
+        """Restore streaming states saved with get_stream_state."""
+        for key, state in (data or {}).items():
+            try:
+                self.streams[key] = CrossoverState.from_dict(state)
+            except Exception as e:
+                print(f"Error restoring strategy state for {key}: {e}")
+    
     def calculate_position_size(self, balance, entry_price, stop_loss_price):
         """
         Calculate position size based on risk management.
@@ -156,7 +421,49 @@ class MovingAverageCrossoverStrategy:
         if df is None or len(df) == 0:
             return False, ""
         
-        current_price = df['close'].iloc[-1]
+        return self.check_exit(
+            df['close'].iloc[-1], self.get_current_signal(df), position_entry_price, position_side
+        )
+    
+    def check_exit(self, current_price, current_signal, position_entry_price, position_side):
+        """
+        Check exit conditions from the latest price and signal.
+        
+        Args:
+            current_price: Latest close price
+            current_signal: Signal on the latest bar
+            position_entry_price: Entry price of position
+            position_side: 'long' or 'short'
+            
+        Returns:
+            tuple: (should_exit, reason)
+        """
+        should_exit, reason = self.check_price_exit(current_price, position_entry_price, position_side)
+        if should_exit:
+            return should_exit, reason
+        
+        # Check reverse signal
+        if position_side == 'long' and current_signal == -1:
+            return True, "Reverse signal (sell)"
+        elif position_side == 'short' and current_signal == 1:
+            return True, "Reverse signal (buy)"
+        
+        return False, ""
+    
+    def check_price_exit(self, current_price, position_entry_price, position_side):
+        """
+        Check stop-loss and take-profit against a single price.
+        
+        Cheap enough to run on every tick of a price stream.
+        
+        Args:
+            current_price: Latest price for the position's exit side
+            position_entry_price: Entry price of position
+            position_side: 'long' or 'short'
+            
+        Returns:
+            tuple: (should_exit, reason)
+        """
         stop_loss = self.calculate_stop_loss(position_entry_price, position_side)
         take_profit = self.calculate_take_profit(position_entry_price, position_side)
         
@@ -172,13 +479,6 @@ class MovingAverageCrossoverStrategy:
         elif position_side == 'short' and current_price <= take_profit:
             return True, "Take-profit hit"
         
-        # Check reverse signal
-        current_signal = self.get_current_signal(df)
-        if position_side == 'long' and current_signal == -1:
-            return True, "Reverse signal (sell)"
-        elif position_side == 'short' and current_signal == 1:
-            return True, "Reverse signal (buy)"
-        
         return False, ""
     
     def get_strategy_summary(self):
@@ -0,0 +1,225 @@
+"""
+Indicator Graph Module
+Declarative indicator dependency graph shared by several strategies.
+
+Strategies declare the indicators they need as keys such as
+('ema', 20), ('adx', 14) or ('crossover', ('ema', 20), ('ema', 50)).
+Composite indicators are split into their parts - ADX(14) needs
+directional movement, DX and ATR(14) - and the graph keeps one node per
+distinct key, so an ATR(14) asked for directly and the one inside
+ADX(14) are computed once. A pair's bars are evaluated in dependency
+order, through the shared indicator cache, and the results are fanned
+out to every strategy. CPU per bar grows with the number of distinct
+indicators, not with the number of strategies.
+"""
+import numpy as np
+
+import indicators as ind
+
+
+def _first_valid(values):
+    valid = np.flatnonzero(~np.isnan(values))
+    return int(valid[0]) if len(valid) else len(values)
+
+
+def _smma(values, period):
+    return ind.smma(values, period, start=_first_valid(values))
+
+
+class _Node:
+    """One indicator in the graph: its dependencies and how to compute it."""
+
+    def __init__(self, key, deps, vector):
+        self.key = key
+        self.deps = deps
+        self.vector = vector
+
+
+def _smoothed_node(key, source, period):
+    return _Node(key, (source,), lambda bars, values: _smma(values, period))
+
+
+def _di_node(key, dm_key, period):
+    def vector(bars, dm, average_range):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100.0 * _smma(dm, period) / average_range
+    return _Node(key, (dm_key, ('atr', period)), vector)
+
+
+def _dx_node(key, period):
+    def vector(bars, plus_di, minus_di):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100.0 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return _Node(key, (('plus_di', period), ('minus_di', period)), vector)
+
+
+def _dm_vector(bars, plus):
+    high, low = np.asarray(bars['high'], dtype=np.float64), np.asarray(bars['low'], dtype=np.float64)
+    out = np.full(len(high), np.nan)
+    if len(high) > 1:
+        up, down = high[1:] - high[:-1], low[:-1] - low[1:]
+        if plus:
+            out[1:] = np.where((up > down) & (up > 0), up, 0.0)
+        else:
+            out[1:] = np.where((down > up) & (down > 0), down, 0.0)
+    return out
+
+
+def make_node(key):
+    """
+    Build the node for an indicator key.
+
+    Args:
+        key: Tuple of indicator name and parameters, e.g. ('ema', 20)
+
+    Returns:
+        _Node
+    """
+    kind, params = key[0], key[1:]
+    if kind == 'sma':
+        period = params[0]
+        return _Node(key, (), lambda bars: ind.sma(bars['close'], period))
+    if kind == 'ema':
+        period = params[0]
+        return _Node(key, (), lambda bars: ind.ema(bars['close'], period))
+    if kind == 'true_range':
+        return _Node(key, (), lambda bars: ind.true_range(bars['high'], bars['low'], bars['close']))
+    if kind == 'plus_dm':
+        return _Node(key, (), lambda bars: _dm_vector(bars, True))
+    if kind == 'minus_dm':
+        return _Node(key, (), lambda bars: _dm_vector(bars, False))
+    if kind == 'atr':
+        return _smoothed_node(key, ('true_range',), params[0])
+    if kind == 'plus_di':
+        return _di_node(key, ('plus_dm',), params[0])
+    if kind == 'minus_di':
+        return _di_node(key, ('minus_dm',), params[0])
+    if kind == 'dx':
+        return _dx_node(key, params[0])
+    if kind == 'adx':
+        return _smoothed_node(key, ('dx', params[0]), params[0])
+    if kind == 'crossover':
+        return _Node(key, (normalize_key(params[0]), normalize_key(params[1])),
+                     lambda bars, fast, slow: ind.crossover(fast, slow))
+    raise ValueError(f"Unknown indicator: {kind}")
+
+
+def normalize_key(key):
+    """Turn 'true_range' or ['ema', 20] into a hashable tuple key."""
+    if isinstance(key, str):
+        return (key,)
+    return tuple(normalize_key(part) if isinstance(part, (list, tuple)) else part for part in key)
+
+
+def ema_adx_requirements(ema1=20, ema2=50, adx_period=14, atr_period=14):
+    """
+    Indicators used by trendbot.TrendStrat and asymmetricbot.AsymmetricStrat.
+
+    Returns:
+        dict of alias -> indicator key
+    """
+    fast, slow = ('ema', ema1), ('ema', ema2)
+    return {
+        'ema_fast': fast,
+        'ema_slow': slow,
+        'cross': ('crossover', fast, slow),
+        'adx': ('adx', adx_period),
+        'atr': ('atr', atr_period),
+    }
+
+
+class IndicatorGraph:
+    """
+    Deduplicated indicator plan for several strategies.
+
+    Usage:
+        graph.require('trend', ema_adx_requirements())
+        graph.require('ma', strategy.indicator_requirements())
+        results = graph.evaluate(bars, cache=shared_cache, series=sid)
+        results['trend']['adx'][-1]
+    """
+
+    def __init__(self):
+        self.requirements = {}
+        self.nodes = {}
+        self._plan = None
+
+    def require(self, strategy, indicators):
+        """
+        Declare the indicators a strategy needs.
+
+        Args:
+            strategy: Strategy name (replaces an earlier declaration)
+            indicators: dict of alias -> indicator key
+        """
+        self.requirements[strategy] = {alias: normalize_key(key) for alias, key in indicators.items()}
+        self._plan = None
+
+    def plan(self):
+        """
+        Get the distinct indicators in dependency order.
+
+        Returns:
+            List of indicator keys; each appears once, after its dependencies
+        """
+        if self._plan is not None:
+            return self._plan
+
+        order = []
+        done = set()
+        visiting = set()
+
+        def visit(key):
+            if key in done:
+                return
+            if key in visiting:
+                raise ValueError(f"Indicator dependency cycle at {key}")
+            visiting.add(key)
+            node = self.nodes.get(key) or make_node(key)
+            self.nodes[key] = node
+            for dep in node.deps:
+                visit(dep)
+            visiting.discard(key)
+            done.add(key)
+            order.append(key)
+
+        for indicators in self.requirements.values():
+            for key in indicators.values():
+                visit(key)
+        self._plan = order
+        return order
+
+    def fan_out(self, values):
+        """Map indicator values back to each strategy's aliases."""
+        return {
+            strategy: {alias: values[key] for alias, key in indicators.items()}
+            for strategy, indicators in self.requirements.items()
+        }
+
+    def evaluate(self, bars, cache=None, series=None):
+        """
+        Compute every indicator over a full bar series.
+
+        Args:
+            bars: DataFrame, BarRingBuffer or dict with high/low/close
+            cache: Optional indicators.IndicatorCache to share results
+            series: Series id for the cache (see indicators.series_id)
+
+        Returns:
+            dict of strategy -> {alias: float64 array}
+        """
+        columns = {field: np.asarray(bars[field], dtype=np.float64) for field in ('high', 'low', 'close')}
+        values = {}
+        for key in self.plan():
+            node = self.nodes[key]
+
+            def compute(node=node):
+                result = node.vector(columns, *[values[dep] for dep in node.deps])
+                result.flags.writeable = False
+                return result
+
+            if cache is not None and series is not None:
+                values[key] = cache.memo((series, key), compute)
+            else:
+                values[key] = compute()
+        return self.fan_out(values)
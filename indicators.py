@@ -0,0 +1,305 @@
+"""
+Indicators Module
+NumPy implementations of the indicators used by the strategies.
+
+Vectorized functions compute a whole series at once. They follow
+Backtrader's definitions - SMA-seeded EMA, Wilder smoothing for ATR and
+ADX, CrossOver on the last non-zero difference - so results match the
+Backtrader strategies in backtester.py, trendbot.py and asymmetricbot.py.
+The live loop's O(1)-per-bar SMA crossover is
+forex_strategy.CrossoverState.
+
+IndicatorCache memoizes results per (series id, indicator, params), so
+strategies asking for the same indicator on the same data share one
+computation.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def _as_float(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def sma(values, period):
+    """
+    Simple moving average.
+
+    Args:
+        values: Input series, oldest first
+        period: Window length
+
+    Returns:
+        float64 array, NaN for the first period - 1 values
+    """
+    values = _as_float(values)
+    out = np.full(len(values), np.nan)
+    if len(values) < period:
+        return out
+    sums = np.cumsum(values)
+    out[period - 1] = sums[period - 1]
+    out[period:] = sums[period:] - sums[:-period]
+    out[period - 1:] /= period
+    return out
+
+
+def _smooth(values, alpha, period, start=0):
+    """Exponential smoothing seeded with the SMA of the first `period` values from `start`."""
+    out = np.full(len(values), np.nan)
+    seed = start + period - 1
+    if len(values) <= seed:
+        return out
+    tail = values[seed:].copy()
+    tail[0] = values[start:seed + 1].mean()
+
+    # A NaN input poisons every later value, as in the recursive definition
+    invalid = np.flatnonzero(np.isnan(tail))
+    end = invalid[0] if len(invalid) else len(tail)
+    if end:
+        # pandas runs the y = (1 - alpha) * y + alpha * x recursion in compiled code
+        out[seed:seed + end] = pd.Series(tail[:end]).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out
+
+
+def ema(values, period):
+    """
+    Exponential moving average (alpha = 2 / (period + 1)), seeded with an SMA.
+
+    Returns:
+        float64 array, NaN for the first period - 1 values
+    """
+    return _smooth(_as_float(values), 2.0 / (period + 1), period)
+
+
+def smma(values, period, start=0):
+    """
+    Wilder's smoothed moving average (alpha = 1 / period), seeded with an SMA.
+
+    Args:
+        values: Input series
+        period: Smoothing period
+        start: Index of the first valid input value
+
+    Returns:
+        float64 array, NaN before start + period - 1
+    """
+    return _smooth(_as_float(values), 1.0 / period, period, start)
+
+
+def true_range(high, low, close):
+    """
+    True range: high/low extended to the previous close.
+
+    Returns:
+        float64 array, NaN for the first bar (no previous close)
+    """
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    out = np.full(len(close), np.nan)
+    if len(close) > 1:
+        prev = close[:-1]
+        out[1:] = np.maximum(high[1:], prev) - np.minimum(low[1:], prev)
+    return out
+
+
+def atr(high, low, close, period=14):
+    """
+    Average true range (Wilder smoothing).
+
+    Returns:
+        float64 array, NaN for the first `period` values
+    """
+    return smma(true_range(high, low, close), period, start=1)
+
+
+def directional_movement(high, low, close, period=14):
+    """
+    Wilder's directional movement system.
+
+    Returns:
+        tuple of float64 arrays: (+DI, -DI, ADX)
+    """
+    high, low = _as_float(high), _as_float(low)
+    n = len(high)
+    plus_dm = np.full(n, np.nan)
+    minus_dm = np.full(n, np.nan)
+    if n > 1:
+        up = high[1:] - high[:-1]
+        down = low[:-1] - low[1:]
+        plus_dm[1:] = np.where((up > down) & (up > 0), up, 0.0)
+        minus_dm[1:] = np.where((down > up) & (down > 0), down, 0.0)
+
+    average_range = atr(high, low, close, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100.0 * smma(plus_dm, period, start=1) / average_range
+        minus_di = 100.0 * smma(minus_dm, period, start=1) / average_range
+        dx = 100.0 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return plus_di, minus_di, smma(dx, period, start=period)
+
+
+def adx(high, low, close, period=14):
+    """
+    Average directional index.
+
+    Returns:
+        float64 array, NaN for the first 2 * period - 1 values
+    """
+    return directional_movement(high, low, close, period)[2]
+
+
+def crossover(fast, slow):
+    """
+    Crossover of two series.
+
+    A cross is measured against the last non-zero difference, so touching
+    and moving apart again is not a cross.
+
+    Returns:
+        float64 array: 1.0 (fast crosses above), -1.0 (below), 0.0 otherwise
+    """
+    diff = _as_float(fast) - _as_float(slow)
+    out = np.zeros(len(diff))
+    if len(diff) < 2:
+        return out
+
+    # Carry the last non-zero, non-NaN difference forward
+    valid = ~np.isnan(diff) & (diff != 0)
+    last = np.where(valid, np.arange(len(diff)), -1)
+    np.maximum.accumulate(last, out=last)
+    carried = np.where(last >= 0, diff[np.maximum(last, 0)], np.nan)
+
+    prev = carried[:-1]
+    with np.errstate(invalid='ignore'):
+        out[1:] = np.where((prev < 0) & (diff[1:] > 0), 1.0, np.where((prev > 0) & (diff[1:] < 0), -1.0, 0.0))
+    return out
+
+
+# Indicator name -> (function, input columns)
+INDICATORS = {
+    'sma': (sma, ('close',)),
+    'ema': (ema, ('close',)),
+    'true_range': (true_range, ('high', 'low', 'close')),
+    'atr': (atr, ('high', 'low', 'close')),
+    'adx': (adx, ('high', 'low', 'close')),
+}
+
+
+def series_id(symbol, timeframe, timestamps, *values):
+    """
+    Identify a bar series for caching.
+
+    Two calls return the same id only for the same symbol, timeframe, bar
+    range and values, so a new bar or a forming bar whose price moved
+    never hits a stale result.
+
+    Args:
+        symbol: Trading pair
+        timeframe: Candle timeframe
+        timestamps: Bar timestamps (ms or datetime64), oldest first
+        *values: Price arrays the indicators read (e.g., close, or high,
+            low and close). Without them the id only covers the bar
+            range, which is safe only if every bar has closed.
+
+    Returns:
+        Hashable tuple
+    """
+    timestamps = np.asarray(timestamps)
+    digest = hashlib.blake2b(digest_size=16)
+    for column in values:
+        digest.update(np.ascontiguousarray(column, dtype=np.float64).tobytes())
+    if len(timestamps) == 0:
+        return (symbol, timeframe, 0, None, None, digest.hexdigest())
+    return (symbol, timeframe, len(timestamps), timestamps[0].item(), timestamps[-1].item(), digest.hexdigest())
+
+
+class IndicatorCache:
+    """
+    Thread-safe LRU cache of indicator results.
+
+    Results are read-only arrays shared by every caller. The series id
+    must change whenever the data does (see series_id); the cache never
+    looks at the data to detect changes.
+    """
+
+    def __init__(self, maxsize=512):
+        """
+        Initialize cache.
+
+        Args:
+            maxsize: Maximum number of results kept
+        """
+        self.maxsize = maxsize
+        self.lock = threading.Lock()
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sid, name, data, **params):
+        """
+        Get an indicator, computing it only on the first request.
+
+        Args:
+            sid: Series id (see series_id)
+            name: Indicator name from INDICATORS
+            data: Bars with the indicator's input columns (DataFrame,
+                BarRingBuffer or dict of arrays)
+            **params: Indicator parameters (e.g., period=20)
+
+        Returns:
+            Read-only float64 array aligned with the bars
+        """
+        function, inputs = INDICATORS[name]
+
+        def compute():
+            return function(*[np.asarray(data[column]) for column in inputs], **params)
+
+        return self.memo((sid, name, tuple(sorted(params.items()))), compute)
+
+    def memo(self, key, compute):
+        """
+        Get a cached result, calling `compute()` only on a miss.
+
+        Args:
+            key: Hashable key whose first item is the series id
+            compute: Callable returning a NumPy array
+
+        Returns:
+            Read-only array
+        """
+        with self.lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+
+        result = compute()
+        result.flags.writeable = False
+
+        with self.lock:
+            self._results[key] = result
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return result
+
+    def invalidate(self, sid=None):
+        """Drop the results for one series id, or everything."""
+        with self.lock:
+            if sid is None:
+                self._results.clear()
+            else:
+                for key in [key for key in self._results if key[0] == sid]:
+                    del self._results[key]
+
+    def stats(self):
+        """Get hit/miss counters and the number of cached results."""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._results)}
+
+
+# Process-wide cache shared by all strategies
+shared_cache = IndicatorCache()
@@ -0,0 +1,196 @@
+"""
+MA Grid Module
+Exhaustive (short, long) moving average crossover search.
+
+MAGrid takes one cumulative sum of the close prices and derives the SMA
+for any window from it in O(1) per bar. Each window's SMA is computed
+once, cached (see indicators.IndicatorCache) and reused by every
+combination it appears in. Combinations sharing a short window are then
+compared together as one (long windows x bars) array; only the sparse
+crossing bars are processed further, and trade returns come from one
+prefix sum of log returns. A full 1..300 x 1..300 surface takes seconds.
+
+The surface ranks windows with the crossover rule alone: long from the
+close of the bar where the short SMA crosses above the long SMA until
+the close of the bar where it crosses below, compounding the whole
+balance, with commission on each fill. Stops, targets and risk sizing
+are left out; confirm promising windows with ForexBacktester.run_backtest
+or sweep().
+"""
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorCache
+
+
+# Surface metrics, all per (short, long) combination
+METRICS = ('return_pct', 'total_trades', 'win_rate', 'exposure_pct')
+
+
+class MAGridResult:
+    """
+    Metric surfaces of a grid search.
+
+    Each surface is a (short windows x long windows) float array with NaN
+    where short >= long.
+    """
+
+    def __init__(self, short_windows, long_windows, surfaces):
+        self.short_windows = np.asarray(short_windows)
+        self.long_windows = np.asarray(long_windows)
+        self.surfaces = surfaces
+
+    def heatmap(self, metric='return_pct'):
+        """
+        Get one metric as a heatmap-ready DataFrame.
+
+        Returns:
+            DataFrame indexed by short window, one column per long window
+        """
+        return pd.DataFrame(
+            self.surfaces[metric],
+            index=pd.Index(self.short_windows, name='short_ma'),
+            columns=pd.Index(self.long_windows, name='long_ma'),
+        )
+
+    def to_frame(self):
+        """
+        Get all valid combinations as rows.
+
+        Returns:
+            DataFrame with short_ma, long_ma and one column per metric
+        """
+        shorts, longs = np.meshgrid(self.short_windows, self.long_windows, indexing='ij')
+        valid = shorts < longs
+        table = pd.DataFrame({'short_ma': shorts[valid], 'long_ma': longs[valid]})
+        for metric in METRICS:
+            table[metric] = self.surfaces[metric][valid]
+        return table
+
+    def best(self, metric='return_pct', n=10, ascending=False):
+        """Get the top `n` combinations by a metric."""
+        table = self.to_frame().sort_values(metric, ascending=ascending, na_position='last', kind='stable')
+        return table.head(n).reset_index(drop=True)
+
+
+class MAGrid:
+    """
+    SMA crossover grid evaluator over one close-price series.
+    """
+
+    def __init__(self, close, series=None, cache=None, commission=0.0001):
+        """
+        Initialize grid.
+
+        Args:
+            close: Close prices, oldest first (array or Series)
+            series: Series id when sharing a cache (see indicators.series_id)
+            cache: indicators.IndicatorCache for the SMA arrays (default:
+                a private cache)
+            commission: Commission per fill as a fraction of the balance
+        """
+        self.close = np.asarray(close, dtype=np.float64)
+        self.series = series if series is not None else ('ma_grid', id(self))
+        self.cache = cache if cache is not None else IndicatorCache(maxsize=1024)
+        self.commission = commission
+
+        # One prefix sum for every window
+        self.sums = np.concatenate(([0.0], np.cumsum(self.close)))
+
+        # Log return from the first bar to each bar; a trade's return is a difference
+        self.cumulative_returns = np.log(self.close / self.close[0]) if len(self.close) else self.close
+
+    def sma(self, window):
+        """
+        SMA for one window from the prefix sums (cached).
+
+        Returns:
+            Read-only float64 array, NaN for the first window - 1 bars
+        """
+        def compute():
+            out = np.full(len(self.close), np.nan)
+            if window <= len(self.close):
+                out[window - 1:] = (self.sums[window:] - self.sums[:-window]) / window
+            return out
+
+        return self.cache.memo((self.series, 'sma', window), compute)
+
+    def evaluate(self, short_windows=range(1, 301), long_windows=range(1, 301)):
+        """
+        Evaluate every short < long combination.
+
+        Args:
+            short_windows: Short SMA windows
+            long_windows: Long SMA windows
+
+        Returns:
+            MAGridResult
+        """
+        short_windows = np.asarray(list(short_windows), dtype=np.int64)
+        long_windows = np.asarray(list(long_windows), dtype=np.int64)
+        shape = (len(short_windows), len(long_windows))
+        surfaces = {metric: np.full(shape, np.nan) for metric in METRICS}
+
+        longs = np.vstack([self.sma(window) for window in long_windows]) if len(long_windows) else None
+        for row, short in enumerate(short_windows):
+            columns = np.flatnonzero(long_windows > short)
+            if not len(columns):
+                continue
+            metrics = self._evaluate_short(self.sma(short), longs[columns])
+            for metric in METRICS:
+                surfaces[metric][row, columns] = metrics[metric]
+        return MAGridResult(short_windows, long_windows, surfaces)
+
+    def _evaluate_short(self, short, longs):
+        """Metrics for one short SMA against a (windows x bars) block of long SMAs."""
+        rows, bars = longs.shape
+
+        # Side of the long SMA per bar: 1 above, -1 below, 0 equal or warming up
+        with np.errstate(invalid='ignore'):
+            side = (short > longs).view(np.int8) - (short < longs).view(np.int8)
+
+        # Only the (sparse) bars where the side changes matter from here on
+        changes = np.flatnonzero(side[:, 1:] != side[:, :-1])
+        event_rows, event_bars = np.divmod(changes, bars - 1)
+        event_bars += 1
+        values = side[event_rows, event_bars]
+
+        # Carry the last non-zero side forward, as indicators.crossover does:
+        # touching the long SMA and moving back is not an event
+        keep = values != 0
+        event_rows, event_bars, values = event_rows[keep], event_bars[keep], values[keep]
+        first = np.r_[True, event_rows[1:] != event_rows[:-1]]
+        keep = first | np.r_[True, values[1:] != values[:-1]]
+        event_rows, event_bars, values = event_rows[keep], event_bars[keep], values[keep]
+
+        # A row's first side is not a cross; a first cross below has no entry to exit
+        first = np.r_[True, event_rows[1:] != event_rows[:-1]]
+        keep = ~first
+        keep[1:] &= ~(first[:-1] & (values[1:] == -1))
+        event_rows, event_bars, values = event_rows[keep], event_bars[keep], values[keep]
+
+        # What is left alternates entry, exit, entry, ... within each row
+        entries = np.flatnonzero(values == 1)
+        exits = entries + 1
+        closed = exits < len(values)
+        closed[closed] = event_rows[exits[closed]] == event_rows[entries[closed]]
+        entry_bars = event_bars[entries]
+        exit_bars = np.where(closed, event_bars[np.minimum(exits, len(values) - 1)], bars - 1)
+        trade_rows = event_rows[entries]
+
+        # Log return of each trade from the one prefix sum of bar returns
+        fee = np.log1p(-self.commission)
+        pnl = self.cumulative_returns[exit_bars] - self.cumulative_returns[entry_bars] + fee * (1 + closed)
+        won = closed & (pnl >= 0)
+
+        total = np.bincount(trade_rows, minlength=rows).astype(np.float64)
+        wins = np.bincount(trade_rows, weights=won, minlength=rows)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            win_rate = np.where(total > 0, wins / total * 100, 0.0)
+
+        return {
+            'return_pct': np.expm1(np.bincount(trade_rows, weights=pnl, minlength=rows)) * 100,
+            'total_trades': total,
+            'win_rate': win_rate,
+            'exposure_pct': np.bincount(trade_rows, weights=exit_bars - entry_bars, minlength=rows) / bars * 100,
+        }
@@ -0,0 +1,311 @@
+"""
+Price Stream Module
+Consumes OANDA's streaming pricing endpoint and normalizes it into ticks.
+
+Also provides a local HTTP-chunked replay server speaking the same wire
+format, so the streaming path can be exercised offline from recorded ticks.
+"""
+import json
+import time
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+
+OANDA_STREAM_URLS = {
+    True: 'https://stream-fxpractice.oanda.com',
+    False: 'https://stream-fxtrade.oanda.com',
+}
+
+
+class Tick(namedtuple('Tick', ['symbol', 'timestamp', 'bid', 'ask'])):
+    """A top-of-book quote. `timestamp` is in milliseconds since the epoch."""
+
+    __slots__ = ()
+
+    @property
+    def mid(self):
+        return (self.bid + self.ask) / 2
+
+
+def to_oanda_instrument(symbol):
+    """Convert 'EUR/USD' to OANDA's 'EUR_USD'."""
+    return symbol.replace('/', '_')
+
+
+def from_oanda_instrument(instrument):
+    """Convert OANDA's 'EUR_USD' to 'EUR/USD'."""
+    return instrument.replace('_', '/')
+
+
+def parse_oanda_time(value):
+    """Parse an OANDA RFC3339 timestamp (nanosecond precision) to ms."""
+    value = value.rstrip('Z')
+    if '.' in value:
+        whole, frac = value.split('.', 1)
+        value = f"{whole}.{frac[:6]}"
+    dt = datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def format_oanda_time(timestamp):
+    """Format a ms timestamp as an OANDA RFC3339 string."""
+    dt = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.%f') + '000Z'
+
+
+def parse_price_message(line):
+    """
+    Parse one line of the OANDA pricing stream.
+
+    Args:
+        line: JSON text (str or bytes)
+
+    Returns:
+        Tick for PRICE messages, None for heartbeats and anything else
+    """
+    msg = json.loads(line)
+    if msg.get('type') != 'PRICE' or not msg.get('bids') or not msg.get('asks'):
+        return None
+    return Tick(
+        from_oanda_instrument(msg['instrument']),
+        parse_oanda_time(msg['time']),
+        float(msg['bids'][0]['price']),
+        float(msg['asks'][0]['price'])
+    )
+
+
+def tick_to_message(tick):
+    """Encode a Tick as an OANDA pricing stream PRICE message."""
+    return json.dumps({
+        'type': 'PRICE',
+        'instrument': to_oanda_instrument(tick.symbol),
+        'time': format_oanda_time(tick.timestamp),
+        'bids': [{'price': f"{tick.bid:.5f}", 'liquidity': 1000000}],
+        'asks': [{'price': f"{tick.ask:.5f}", 'liquidity': 1000000}],
+        'tradeable': True,
+    })
+
+
+def load_ticks(path):
+    """
+    Load recorded ticks from a JSON-lines file of pricing stream messages.
+
+    Args:
+        path: File written by PriceStream(record_path=...)
+
+    Returns:
+        List of Tick
+    """
+    ticks = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                tick = parse_price_message(line)
+                if tick:
+                    ticks.append(tick)
+    return ticks
+
+
+class PriceStream:
+    """
+    Streaming price client for OANDA's HTTP-chunked pricing endpoint.
+
+    Calls `on_tick(tick)` for every price update. Reconnects with backoff
+    when the connection drops.
+    """
+
+    def __init__(self, url, instruments, headers=None, record_path=None,
+                 reconnect=True, reconnect_delay=1.0, max_reconnect_delay=30.0):
+        """
+        Initialize price stream.
+
+        Args:
+            url: Streaming endpoint URL
+            instruments: List of trading pairs (e.g., ['EUR/USD'])
+            headers: Extra HTTP headers (e.g., Authorization)
+            record_path: Append raw messages to this file for later replay
+            reconnect: Reconnect when the server ends the stream
+            reconnect_delay: Initial reconnect delay in seconds
+            max_reconnect_delay: Upper bound for reconnect backoff
+        """
+        self.url = url
+        self.instruments = list(instruments)
+        self.headers = headers or {}
+        self.record_path = record_path
+        self.reconnect = reconnect
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.running = False
+        self.thread = None
+        self.last_tick = {}
+        self.tick_count = 0
+        self._response = None
+
+    @classmethod
+    def for_oanda(cls, api_key, account_id, instruments, practice=True, **kwargs):
+        """Create a stream for an OANDA account."""
+        url = f"{OANDA_STREAM_URLS[practice]}/v3/accounts/{account_id}/pricing/stream"
+        headers = {'Authorization': f'Bearer {api_key}'}
+        return cls(url, instruments, headers=headers, **kwargs)
+
+    def start(self, on_tick):
+        """Start streaming in a background thread."""
+        self.running = True
+        self.thread = threading.Thread(target=self.run, args=(on_tick,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop streaming."""
+        self.running = False
+        if self._response is not None:
+            self._response.close()
+
+    def run(self, on_tick):
+        """Stream until stopped (blocking)."""
+        self.running = True
+        delay = self.reconnect_delay
+        while self.running:
+            try:
+                self._consume(on_tick)
+                delay = self.reconnect_delay
+                if not self.reconnect:
+                    break
+            except Exception as e:
+                if not self.running:
+                    break
+                if not self.reconnect:
+                    print(f"Price stream error: {e}")
+                    break
+                print(f"Price stream error: {e}, reconnecting in {delay:.0f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+        self.running = False
+
+    def _consume(self, on_tick):
+        params = {'instruments': ','.join(to_oanda_instrument(i) for i in self.instruments)}
+        record = open(self.record_path, 'a') if self.record_path else None
+        try:
+            with requests.get(self.url, params=params, headers=self.headers,
+                              stream=True, timeout=(10, 30)) as response:
+                self._response = response
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not self.running:
+                        break
+                    if not line:
+                        continue
+                    tick = parse_price_message(line)
+                    if tick is None:
+                        continue
+                    if record:
+                        record.write(line.decode() + '\n')
+                    self.last_tick[tick.symbol] = tick
+                    self.tick_count += 1
+                    on_tick(tick)
+        finally:
+            self._response = None
+            if record:
+                record.close()
+
+
+class TickReplayServer:
+    """
+    Local stand-in for the OANDA pricing stream.
+
+    Serves recorded ticks over HTTP with chunked transfer encoding in the
+    OANDA message format, either as fast as possible or paced by the
+    recorded timestamps.
+    """
+
+    def __init__(self, ticks, host='127.0.0.1', port=0, speed=None, heartbeat_interval=5.0):
+        """
+        Initialize replay server.
+
+        Args:
+            ticks: List of Tick to replay, in time order
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            speed: None for full speed, or wall-clock multiplier (1.0 = real time)
+            heartbeat_interval: Seconds between heartbeats while pacing
+        """
+        self.ticks = list(ticks)
+        self.speed = speed
+        self.heartbeat_interval = heartbeat_interval
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v3/accounts/replay/pricing/stream"
+
+    def start(self):
+        """Start serving in a background thread and return the stream URL."""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        """Stop the server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _make_handler(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    replay._stream(self.path, self._write_chunk)
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _write_chunk(self, text):
+                data = (text + '\n').encode()
+                self.wfile.write(f'{len(data):X}\r\n'.encode() + data + b'\r\n')
+                self.wfile.flush()
+
+        return Handler
+
+    def _stream(self, path, write):
+        instruments = None
+        if '?' in path:
+            query = parse_qs(urlsplit(path).query)
+            if 'instruments' in query:
+                instruments = {from_oanda_instrument(i) for i in query['instruments'][0].split(',')}
+
+        start_wall = time.monotonic()
+        start_tick = self.ticks[0].timestamp if self.ticks else 0
+        last_beat = start_wall
+        for tick in self.ticks:
+            if instruments is not None and tick.symbol not in instruments:
+                continue
+            if self.speed:
+                due = start_wall + (tick.timestamp - start_tick) / 1000 / self.speed
+                while True:
+                    now = time.monotonic()
+                    if now >= due:
+                        break
+                    if now - last_beat >= self.heartbeat_interval:
+                        write(json.dumps({'type': 'HEARTBEAT', 'time': format_oanda_time(int(time.time() * 1000))}))
+                        last_beat = now
+                    time.sleep(min(due - now, self.heartbeat_interval))
+            write(tick_to_message(tick))
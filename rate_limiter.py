@@ -0,0 +1,261 @@
+"""
+Rate Limiter Module
+Client-side throttling and request coalescing for broker API calls.
+
+Every request to the broker takes a token from a shared token bucket, so
+the trading loop, the dashboard and AI context building together stay
+under OANDA's request limits. Identical read-only requests issued while
+one is already in flight wait for that call and share its result instead
+of sending another HTTP request.
+"""
+import asyncio
+import threading
+import time
+
+
+# OANDA allows 120 requests per second per account; stay below it
+DEFAULT_REQUEST_RATE = 100
+DEFAULT_REQUEST_BURST = 20
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    A caller that finds the bucket empty reserves its token anyway and is
+    told how long to wait, so waiters are served in arrival order.
+    """
+
+    def __init__(self, rate=DEFAULT_REQUEST_RATE, capacity=DEFAULT_REQUEST_BURST):
+        """
+        Initialize token bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+        self.throttled = 0
+        self.wait_time = 0.0
+
+    def reserve(self, tokens=1):
+        """
+        Take tokens and get the time to wait before using them.
+
+        Returns:
+            Seconds to wait (0 if tokens were available)
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            if self.tokens >= 0:
+                return 0.0
+            wait = -self.tokens / self.rate
+            self.throttled += 1
+            self.wait_time += wait
+            return wait
+
+    def acquire(self, tokens=1):
+        """Take tokens, sleeping until they are available."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens=1):
+        """Take tokens, yielding to the event loop until they are available."""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls across threads.
+
+    While a call for `key` is running, other callers with the same key
+    block until it finishes and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` unless an identical call is in flight.
+
+        Args:
+            key: Hashable identity of the call
+            fn: Callable to run
+
+        Returns:
+            Result of the (possibly shared) call
+        """
+        with self.lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn(*args, **kwargs)
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self._calls[key]
+            call['done'].set()
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent identical coroutine calls on one event loop."""
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Await `fn(*args, **kwargs)` unless an identical call is in flight.
+
+        Args:
+            key: Hashable identity of the call
+            fn: Coroutine function to run
+
+        Returns:
+            Result of the (possibly shared) call
+        """
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+        self._calls[key] = task
+        try:
+            # Shield so a cancelled caller does not cancel the shared request
+            return await asyncio.shield(task)
+        finally:
+            if self._calls.get(key) is task:
+                del self._calls[key]
+
+
+class RequestLimiter:
+    """
+    Token-bucket throttling plus single-flight coalescing for sync calls.
+
+    One limiter can be shared by several connectors on the same account.
+    """
+
+    def __init__(self, rate=DEFAULT_REQUEST_RATE, burst=DEFAULT_REQUEST_BURST):
+        """
+        Initialize request limiter.
+
+        Args:
+            rate: Requests per second (None disables throttling)
+            burst: Requests allowed back to back before throttling starts
+        """
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.flight = self._make_flight()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.calls = 0
+
+    def _make_flight(self):
+        return SingleFlight()
+
+    def call(self, key, fn, *args, **kwargs):
+        """
+        Send a request through the limiter.
+
+        Args:
+            key: Hashable identity for coalescing, or None to always send
+                (use None for orders and anything else with side effects)
+            fn: Callable making the request
+
+        Returns:
+            Result of the request
+        """
+        self._count('calls')
+        if key is None:
+            return self._send(fn, *args, **kwargs)
+        return self.flight.do(key, self._send, fn, *args, **kwargs)
+
+    def _send(self, fn, *args, **kwargs):
+        if self.bucket:
+            self.bucket.acquire()
+        self._count('requests')
+        return fn(*args, **kwargs)
+
+    def _count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self):
+        """
+        Get request counters.
+
+        Returns:
+            dict with calls made by callers, requests actually sent, calls
+            throttled by the bucket, calls coalesced into another request
+            and the total seconds spent waiting for tokens
+        """
+        return {
+            'calls': self.calls,
+            'requests': self.requests,
+            'throttled': self.bucket.throttled if self.bucket else 0,
+            'coalesced': self.flight.coalesced,
+            'wait_time': round(self.bucket.wait_time, 3) if self.bucket else 0.0,
+        }
+
+
+class AsyncRequestLimiter(RequestLimiter):
+    """RequestLimiter for coroutine-based connectors."""
+
+    def _make_flight(self):
+        return AsyncSingleFlight()
+
+    async def call(self, key, fn, *args, **kwargs):
+        """
+        Send a request through the limiter.
+
+        Args:
+            key: Hashable identity for coalescing, or None to always send
+            fn: Coroutine function making the request
+
+        Returns:
+            Result of the request
+        """
+        self._count('calls')
+        if key is None:
+            return await self._send(fn, *args, **kwargs)
+        return await self.flight.do(key, self._send, fn, *args, **kwargs)
+
+    async def _send(self, fn, *args, **kwargs):
+        if self.bucket:
+            await self.bucket.acquire_async()
+        self._count('requests')
+        return await fn(*args, **kwargs)
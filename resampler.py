@@ -0,0 +1,163 @@
+"""
+Resampler Module
+Derives coarser OHLCV timeframes from a single base-resolution history.
+
+Only the finest timeframe per pair is downloaded; 1h/4h/1d bars are built
+locally (open first, high max, low min, close last, volume sum) and cached
+per timeframe, so each update only re-aggregates the newest bars.
+
+Bars are aligned like OANDA's native candles: days start at 17:00
+America/New_York (the connector's default alignmentTimezone and
+dailyAlignment), so 4h bars open at 17/21/01/05/09/13 New York time and
+derived bars match get_ohlcv(..., '4h') across DST changes.
+"""
+import numpy as np
+import pandas as pd
+
+from candle_store import timeframe_to_ms
+
+
+AGGREGATION = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+}
+
+# OANDA candle alignment defaults
+ALIGNMENT_TIMEZONE = 'America/New_York'
+DAILY_ALIGNMENT = 17
+# Weekly candles open on Friday (1970-01-02 was one) at the daily alignment
+WEEKLY_ORIGIN = pd.Timestamp('1970-01-02')
+
+
+def can_derive(base_timeframe, timeframe):
+    """Check whether `timeframe` can be built from `base_timeframe` bars."""
+    base_ms = timeframe_to_ms(base_timeframe)
+    target_ms = timeframe_to_ms(timeframe)
+    return target_ms > base_ms and target_ms % base_ms == 0
+
+
+def bar_starts(index, timeframe, timezone=ALIGNMENT_TIMEZONE, daily_alignment=DAILY_ALIGNMENT):
+    """
+    Open time of the broker-aligned `timeframe` bar containing each timestamp.
+
+    Bars are counted in wall-clock time of `timezone` from `daily_alignment`
+    o'clock, so a day around a DST change lasts 23 or 25 hours like OANDA's.
+
+    Args:
+        index: DatetimeIndex (naive timestamps are UTC)
+        timeframe: Target timeframe (e.g., '4h')
+        timezone: Alignment timezone
+        daily_alignment: Hour of the day in `timezone` that days start at
+
+    Returns:
+        DatetimeIndex of bar open times, in the same timezone and unit as `index`
+    """
+    rule = pd.Timedelta(milliseconds=timeframe_to_ms(timeframe))
+    shift = pd.Timedelta(hours=daily_alignment)
+    utc = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+    wall = utc.tz_convert(timezone).tz_localize(None) - shift
+    starts = WEEKLY_ORIGIN + ((wall - WEEKLY_ORIGIN) // rule) * rule + shift
+    # An ambiguous open time (DST ending) is the earlier of the two instants
+    starts = starts.tz_localize(timezone, ambiguous=np.ones(len(starts), dtype=bool),
+                                nonexistent='shift_forward').tz_convert(index.tz or 'UTC')
+    if index.tz is None:
+        starts = starts.tz_localize(None)
+    return starts.as_unit(index.unit).rename(index.name)
+
+
+def resample_ohlcv(df, timeframe, timezone=ALIGNMENT_TIMEZONE, daily_alignment=DAILY_ALIGNMENT):
+    """
+    Aggregate OHLCV bars into a coarser timeframe.
+
+    Args:
+        df: DataFrame with OHLCV data (timestamp as index)
+        timeframe: Target timeframe (e.g., '1h')
+        timezone: Alignment timezone
+        daily_alignment: Hour of the day in `timezone` that days start at
+
+    Returns:
+        DataFrame with OHLCV data at the target timeframe
+    """
+    if df.empty:
+        return df[list(AGGREGATION)]
+    starts = bar_starts(df.index, timeframe, timezone, daily_alignment)
+    out = df[list(AGGREGATION)].groupby(starts).agg(AGGREGATION)
+    return out.dropna(subset=['open'])
+
+
+class TimeframeResampler:
+    """
+    Incremental multi-timeframe deriver with a per-timeframe cache.
+    """
+
+    def __init__(self, base_timeframe='5m', timezone=ALIGNMENT_TIMEZONE, daily_alignment=DAILY_ALIGNMENT):
+        """
+        Initialize resampler.
+
+        Args:
+            base_timeframe: Finest timeframe that is actually downloaded
+            timezone: Alignment timezone of the broker's candles
+            daily_alignment: Hour of the day in `timezone` that days start at
+        """
+        self.base_timeframe = base_timeframe
+        self.base_ms = timeframe_to_ms(base_timeframe)
+        self.timezone = timezone
+        self.daily_alignment = daily_alignment
+
+        # (symbol, timeframe) -> derived DataFrame
+        self.cache = {}
+
+    def base_limit(self, timeframe, limit):
+        """Number of base bars needed to derive `limit` bars of `timeframe`."""
+        ratio = timeframe_to_ms(timeframe) // self.base_ms
+        return (limit + 1) * ratio
+
+    def derive(self, symbol, base_df, timeframe):
+        """
+        Derive `timeframe` bars from base bars, reusing earlier results.
+
+        Args:
+            symbol: Trading pair
+            base_df: DataFrame with base-timeframe OHLCV data
+            timeframe: Target timeframe
+
+        Returns:
+            DataFrame with OHLCV data at the target timeframe
+        """
+        if timeframe == self.base_timeframe:
+            return base_df
+        if not can_derive(self.base_timeframe, timeframe):
+            raise ValueError(f"Cannot derive {timeframe} from {self.base_timeframe}")
+        if base_df.empty:
+            return self.resample(base_df, timeframe)
+
+        key = (symbol, timeframe)
+        cached = self.cache.get(key)
+
+        if cached is not None and not cached.empty and base_df.index[0] <= cached.index[-1]:
+            # The newest cached bar may have been incomplete, rebuild from it
+            fresh = self.resample(base_df[base_df.index >= cached.index[-1]], timeframe)
+            df = pd.concat([cached.iloc[:-1], fresh])
+        else:
+            df = self.resample(base_df, timeframe)
+            # Drop a leading bar that the base window only partly covers
+            if len(df) > 0 and df.index[0] != base_df.index[0]:
+                df = df.iloc[1:]
+
+        keep = len(base_df) * self.base_ms // timeframe_to_ms(timeframe) + 1
+        df = df.iloc[-keep:]
+        self.cache[key] = df
+        return df
+
+    def resample(self, df, timeframe):
+        """Aggregate OHLCV bars into `timeframe` with this resampler's alignment."""
+        return resample_ohlcv(df, timeframe, self.timezone, self.daily_alignment)
+
+    def clear(self, symbol=None):
+        """Drop derived bars, optionally only for one symbol."""
+        for key in list(self.cache):
+            if symbol in (None, key[0]):
+                del self.cache[key]
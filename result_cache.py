@@ -0,0 +1,231 @@
+"""
+Result Cache Module
+Content-addressed on-disk cache of backtest results.
+
+A result is stored under a hash of everything that determines it: the
+price data itself (timestamps and OHLCV values, not a file name), the
+strategy name, the source code of its rules, the strategy parameters,
+the commission and the initial cash. Rerunning the same backtest - from a script, a sweep,
+a dashboard or CI - returns the stored results instead of recomputing
+them, and any change to the inputs misses the cache.
+
+Entries are small JSON files. The cache is bounded in bytes and evicts
+the least recently used entries (by file modification time, refreshed on
+every hit) once it grows past the limit.
+"""
+import hashlib
+import inspect
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from candle_store import PRICE_COLUMNS
+
+
+DEFAULT_CACHE_DIR = 'backtest_cache'
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def data_digest(df):
+    """
+    Hash the content of an OHLCV DataFrame.
+
+    Args:
+        df: DataFrame with OHLCV columns and a DatetimeIndex
+
+    Returns:
+        Hex digest; equal for equal timestamps and price/volume values
+    """
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(index.as_unit('ms').asi8.astype(np.int64).tobytes())
+    for col in PRICE_COLUMNS:
+        if col in df.columns:
+            digest.update(col.encode())
+            digest.update(df[col].to_numpy(dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def source_digest(*objects):
+    """
+    Hash the source code of the functions, classes or modules behind a result.
+
+    Used as the strategy version, so editing the rules invalidates the
+    results computed with the old ones without a manual version bump.
+
+    Args:
+        *objects: Functions, classes or modules
+
+    Returns:
+        Hex digest, or None if some source is unavailable (e.g., only
+        bytecode was shipped)
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for obj in objects:
+        try:
+            digest.update(inspect.getsource(obj).encode())
+        except (OSError, TypeError):
+            return None
+    return digest.hexdigest()
+
+
+def result_key(data, strategy, version, params, commission, initial_cash, engine=None):
+    """
+    Build the cache key of a backtest.
+
+    Args:
+        data: data_digest() of the price data
+        strategy: Strategy name
+        version: Strategy version (e.g., source_digest() of its rules)
+        params: dict of strategy parameters
+        commission: Commission rate
+        initial_cash: Initial capital
+        engine: Backtest engine name
+
+    Returns:
+        Hex digest
+    """
+    fields = {
+        'data': data,
+        'strategy': strategy,
+        'version': version,
+        'params': params,
+        'commission': commission,
+        'initial_cash': initial_cash,
+        'engine': engine,
+    }
+    blob = json.dumps(fields, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.blake2b(blob.encode(), digest_size=20).hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of results dicts on disk.
+
+    Safe to share between processes: entries are written atomically and
+    eviction tolerates files removed by another process.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initialize cache.
+
+        Args:
+            root: Cache directory
+            max_bytes: Total entry size at which old entries are evicted
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + '.json')
+
+    def get(self, key):
+        """
+        Get cached results.
+
+        Args:
+            key: Key from result_key()
+
+        Returns:
+            Results dict, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['results']
+
+    def put(self, key, results):
+        """
+        Store results, evicting old entries if the cache is over its limit.
+
+        Args:
+            key: Key from result_key()
+            results: JSON-serializable results dict
+        """
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, 'w') as f:
+                json.dump({'key': key, 'results': results}, f, default=float)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error caching backtest results: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        """List (mtime, size, path) of every entry."""
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self):
+        """Get the total size of all entries in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target=None):
+        """
+        Remove least recently used entries.
+
+        Args:
+            target: Size in bytes to shrink to (default: 90% of max_bytes,
+                so eviction does not run on every put)
+        """
+        target = int(self.max_bytes * 0.9) if target is None else target
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self._size = total
+
+    def clear(self):
+        """Remove every entry."""
+        self.evict(target=0)
+
+    def stats(self):
+        """Get hit/miss counters."""
+        return {'hits': self.hits, 'misses': self.misses}
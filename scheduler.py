@@ -0,0 +1,223 @@
+"""
+Scheduler Module
+Wakes the trading loop just after bar closes instead of polling.
+
+BarCloseScheduler knows which pairs trade on which timeframes, computes
+the next bar boundary for each timeframe and sleeps until shortly after
+it: `lag` seconds for the broker to publish the completed candle, plus
+up to `jitter` seconds of random spread so several bots do not hit the
+API in the same instant. Each wakeup returns only the (pair, timeframe)
+jobs whose bars closed, so signal-to-order latency is about lag + jitter
+and there are no wakeups with nothing to do. Jobs whose candle was not
+published in time can be retried after a short delay.
+"""
+import asyncio
+import random
+import threading
+import time
+
+from candle_store import timeframe_to_ms
+
+
+class BarCloseScheduler:
+    """
+    Bar-close aligned wakeups for (pair, timeframe) jobs.
+
+    Boundaries are multiples of the bar length since the epoch (UTC),
+    shifted by `offset` seconds for brokers that align daily bars
+    elsewhere.
+    """
+
+    def __init__(self, lag=2.0, jitter=0.5, offset=0.0, retry_delay=5.0, max_retries=5,
+                 clock=time.time, seed=None):
+        """
+        Initialize scheduler.
+
+        Args:
+            lag: Seconds to wait after a boundary for the broker's candle
+            jitter: Maximum random extra delay in seconds
+            offset: Boundary alignment offset in seconds
+            retry_delay: Default seconds before a retry
+            max_retries: Retries allowed per job and bar
+            clock: Function returning the current time in seconds
+            seed: Random seed for the jitter
+        """
+        self.lag = lag
+        self.jitter = jitter
+        self.offset_ms = int(offset * 1000)
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        self.clock = clock
+        self.random = random.Random(seed)
+
+        self.jobs = {}
+        self.fired = {}
+        self.retries = {}
+        self.attempts = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        # (loop, asyncio.Event) of each wait_async() in progress
+        self._async_waiters = set()
+
+        self.wakeups = 0
+        self.triggered = 0
+        self.retried = 0
+
+    def add(self, pair, timeframe):
+        """Trigger `pair` whenever a `timeframe` bar closes."""
+        timeframe_to_ms(timeframe)
+        with self.lock:
+            self.jobs.setdefault(timeframe, set()).add(pair)
+
+    def remove(self, pair, timeframe=None):
+        """Stop triggering `pair` (on one or all timeframes)."""
+        with self.lock:
+            for tf in [timeframe] if timeframe else list(self.jobs):
+                self.jobs.get(tf, set()).discard(pair)
+                if not self.jobs.get(tf):
+                    self.jobs.pop(tf, None)
+                    self.fired.pop(tf, None)
+
+    def last_boundary(self, timeframe, now=None):
+        """
+        Get the start of the bar forming at `now`.
+
+        Returns:
+            Boundary in ms since the epoch
+        """
+        now_ms = int((self.clock() if now is None else now) * 1000)
+        tf_ms = timeframe_to_ms(timeframe)
+        return (now_ms - self.offset_ms) // tf_ms * tf_ms + self.offset_ms
+
+    def next_close(self, timeframe, now=None):
+        """Get the time (seconds) of the next `timeframe` bar close."""
+        return (self.last_boundary(timeframe, now) + timeframe_to_ms(timeframe)) / 1000.0
+
+    def last_close(self, timeframe):
+        """Get the boundary (ms) of the last close that triggered `timeframe`, or None."""
+        return self.fired.get(timeframe)
+
+    def retry(self, pair, timeframe, delay=None):
+        """
+        Run a job again shortly, e.g. when its closed candle was not yet available.
+
+        Args:
+            pair: Trading pair
+            timeframe: Timeframe of the job
+            delay: Seconds until the retry (default: retry_delay)
+
+        Returns:
+            True if scheduled, False once max_retries is used up for this bar
+        """
+        key = (pair, timeframe)
+        with self.lock:
+            bar = self.fired.get(timeframe)
+            count = self.attempts.get(key, (bar, 0))
+            tries = count[1] if count[0] == bar else 0
+            if tries >= self.max_retries:
+                return False
+            self.attempts[key] = (bar, tries + 1)
+            self.retries[key] = self.clock() + (self.retry_delay if delay is None else delay)
+            self.retried += 1
+        return True
+
+    def due(self, now=None):
+        """
+        Collect the jobs due at `now` and mark them as fired.
+
+        The first call triggers every job, so the loop starts with a full
+        evaluation.
+
+        Returns:
+            Sorted list of (pair, timeframe)
+        """
+        now = self.clock() if now is None else now
+        due = set()
+        with self.lock:
+            for timeframe, pairs in self.jobs.items():
+                closed = self.last_boundary(timeframe, now - self.lag)
+                if self.fired.get(timeframe) != closed:
+                    self.fired[timeframe] = closed
+                    due.update((pair, timeframe) for pair in pairs)
+            for key, when in list(self.retries.items()):
+                if when <= now:
+                    del self.retries[key]
+                    due.add(key)
+            self.triggered += len(due)
+        return sorted(due)
+
+    def next_wakeup(self, now=None):
+        """Get the time (seconds) of the next close or retry, or None if idle."""
+        now = self.clock() if now is None else now
+        with self.lock:
+            times = [self.next_close(tf, now - self.lag) + self.lag for tf in self.jobs]
+            times.extend(self.retries.values())
+        return min(times) if times else None
+
+    def _delay(self, now, timeout):
+        wakeup = self.next_wakeup(now)
+        delay = None if wakeup is None else max(0.0, wakeup - now) + self.random.uniform(0, self.jitter)
+        if timeout is not None and (delay is None or timeout < delay):
+            return timeout, True
+        return delay, False
+
+    def wait(self, timeout=None):
+        """
+        Sleep until jobs are due.
+
+        Args:
+            timeout: Maximum seconds to sleep (None: until the next close)
+
+        Returns:
+            Due (pair, timeframe) jobs; empty on timeout or cancel()
+        """
+        while not self.stop_event.is_set():
+            now = self.clock()
+            jobs = self.due(now)
+            if jobs:
+                self.wakeups += 1
+                return jobs
+            delay, timed_out = self._delay(now, timeout)
+            if self.stop_event.wait(delay) or timed_out:
+                break
+        return []
+
+    async def wait_async(self, timeout=None):
+        """Coroutine version of wait() for the asyncio trading loop."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.lock:
+            self._async_waiters.add(waiter)
+        try:
+            while not self.stop_event.is_set():
+                now = self.clock()
+                jobs = self.due(now)
+                if jobs:
+                    self.wakeups += 1
+                    return jobs
+                delay, timed_out = self._delay(now, timeout)
+                # Sleep on the loop; cancel() sets the event from any thread
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                if timed_out:
+                    break
+        finally:
+            with self.lock:
+                self._async_waiters.discard(waiter)
+        return []
+
+    def cancel(self):
+        """Wake any waiter and make further waits return immediately."""
+        self.stop_event.set()
+        with self.lock:
+            waiters = list(self._async_waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    def stats(self):
+        """Get wakeup, trigger and retry counters."""
+        return {'wakeups': self.wakeups, 'triggered': self.triggered, 'retried': self.retried}
@@ -0,0 +1,114 @@
+"""
+Shared Prices Module
+OHLCV columns in shared memory for multi-process backtests.
+
+The parent process copies a DataFrame's timestamps and price columns
+once into a multiprocessing.shared_memory block. Workers receive only a
+small handle and attach to the block, getting a DataFrame whose columns
+are read-only views of the shared pages - nothing is pickled or copied
+per worker or per task, so start-up time and total memory stay flat as
+the worker count grows.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from candle_store import PRICE_COLUMNS, frame_to_columns
+
+
+def _views(memory, length):
+    """Timestamp and (columns x bars) price arrays on a block."""
+    timestamps = np.ndarray((length,), dtype=np.int64, buffer=memory.buf)
+    prices = np.ndarray((len(PRICE_COLUMNS), length), dtype=np.float64,
+                        buffer=memory.buf, offset=length * 8)
+    return timestamps, prices
+
+
+def _frame(timestamps, prices, tz=None):
+    """DataFrame over the shared arrays without copying them."""
+    index = pd.DatetimeIndex(timestamps.view('datetime64[ms]'), name='timestamp', copy=False)
+    if tz is not None:
+        index = index.tz_localize('UTC').tz_convert(tz)
+    # A (bars x columns) transpose of the C-ordered block is used as-is by pandas
+    return pd.DataFrame(prices.T, index=index, columns=list(PRICE_COLUMNS), copy=False)
+
+
+class SharedPriceData:
+    """
+    Owner of a shared memory block holding one OHLCV DataFrame.
+
+    Usage:
+        with SharedPriceData(df) as shared:
+            # in each worker:
+            memory, df = attach(shared.handle)
+    """
+
+    def __init__(self, df):
+        """
+        Copy a DataFrame's OHLCV columns into a new shared memory block.
+
+        Args:
+            df: DataFrame with open/high/low/close/volume and a DatetimeIndex
+        """
+        columns = frame_to_columns(df)
+        length = len(df)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, (1 + len(PRICE_COLUMNS)) * length * 8))
+
+        timestamps, prices = _views(self.memory, length)
+        timestamps[:] = columns['timestamp']
+        for row, col in enumerate(PRICE_COLUMNS):
+            prices[row] = columns[col]
+
+        tz = getattr(df.index, 'tz', None)
+        self.handle = {
+            'name': self.memory.name,
+            'length': length,
+            'tz': str(tz) if tz is not None else None,
+        }
+
+    @property
+    def nbytes(self):
+        """Size of the shared block in bytes."""
+        return self.memory.size
+
+    def release(self):
+        """Close and free the block; attached workers keep their mapping until they exit."""
+        if self.memory is None:
+            return
+        try:
+            self.memory.close()
+        except BufferError:
+            # Views still exported in this process; the mapping goes with them
+            pass
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+        self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def attach(handle):
+    """
+    Attach to a block created by SharedPriceData.
+
+    Args:
+        handle: SharedPriceData.handle from the parent process
+
+    Returns:
+        tuple of (SharedMemory, DataFrame); keep the SharedMemory
+        referenced for as long as the DataFrame is used
+    """
+    # Pool workers share the parent's resource tracker, so the block is
+    # unlinked once, by SharedPriceData.release()
+    memory = shared_memory.SharedMemory(name=handle['name'])
+    timestamps, prices = _views(memory, handle['length'])
+    timestamps.flags.writeable = False
+    prices.flags.writeable = False
+    return memory, _frame(timestamps, prices, handle['tz'])
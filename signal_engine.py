@@ -0,0 +1,221 @@
+"""
+Signal Engine Module
+Vectorized moving average crossover evaluation across many pairs.
+
+Takes either a (pairs x time) close-price panel or per-pair SMA values
+(e.g., from the strategy's streaming state) and computes crossovers,
+stop-loss/take-profit levels, position sizes and exit conditions for
+every pair with single NumPy operations. The result is a compact
+structured array with one row per pair, so scanning all OANDA
+instruments costs about as much as scanning one.
+
+The rules are the same as MovingAverageCrossoverStrategy.
+"""
+import numpy as np
+
+
+SIGNAL_DTYPE = np.dtype([
+    ('symbol', 'U16'),
+    ('ready', '?'),
+    ('close', 'f8'),
+    ('sma_short', 'f8'),
+    ('sma_long', 'f8'),
+    ('signal', 'i1'),
+    ('stop_loss', 'f8'),
+    ('take_profit', 'f8'),
+    ('size', 'f8'),
+    ('position', 'i1'),
+    ('exit', 'i1'),
+])
+
+# Values of the 'position' column are 1 (long), -1 (short) or 0 (flat)
+
+# Values of the 'exit' column
+EXIT_NONE = 0
+EXIT_STOP = 1
+EXIT_TARGET = 2
+EXIT_REVERSE = 3
+
+
+def exit_reason(row):
+    """Get the human-readable reason for a signal table row's exit code."""
+    if row['exit'] == EXIT_STOP:
+        return "Stop-loss hit"
+    if row['exit'] == EXIT_TARGET:
+        return "Take-profit hit"
+    if row['exit'] == EXIT_REVERSE:
+        return "Reverse signal (sell)" if row['signal'] == -1 else "Reverse signal (buy)"
+    return ""
+
+
+def build_panel(windows, length):
+    """
+    Stack close-price windows into a right-aligned (pairs x length) panel.
+
+    Args:
+        windows: List of close arrays (oldest first), one per pair
+        length: Number of newest bars to keep per pair
+
+    Returns:
+        float64 array; pairs with shorter history are NaN-padded on the left
+    """
+    panel = np.full((len(windows), length), np.nan)
+    for i, closes in enumerate(windows):
+        if closes is None:
+            continue
+        tail = np.asarray(closes)[-length:]
+        if len(tail):
+            panel[i, length - len(tail):] = tail
+    return panel
+
+
+class SignalEngine:
+    """Crossover, level, size and exit calculations for many pairs at once."""
+
+    def __init__(self, short_ma=50, long_ma=200, risk_per_trade=0.01,
+                 stop_loss_pct=0.01, take_profit_pct=0.02):
+        """
+        Initialize engine.
+
+        Args:
+            short_ma: Short moving average period
+            long_ma: Long moving average period
+            risk_per_trade: Risk per trade as a fraction of balance
+            stop_loss_pct: Stop-loss distance as a fraction of price
+            take_profit_pct: Take-profit distance as a fraction of price
+        """
+        self.short_ma = short_ma
+        self.long_ma = long_ma
+        self.risk_per_trade = risk_per_trade
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+
+    @classmethod
+    def from_strategy(cls, strategy):
+        """Create an engine with a MovingAverageCrossoverStrategy's parameters."""
+        return cls(strategy.short_ma, strategy.long_ma, strategy.risk_per_trade,
+                   strategy.stop_loss_pct, strategy.take_profit_pct)
+
+    def evaluate_panel(self, symbols, panel, balance=None, positions=None):
+        """
+        Evaluate every pair of a close-price panel.
+
+        Args:
+            symbols: Pair names, one per panel row
+            panel: (pairs x time) close prices, newest bar last, NaN where
+                a pair has no data (see build_panel)
+            balance: Account balance for position sizes (sizes are 0 if None)
+            positions: Dict of open positions keyed by symbol
+
+        Returns:
+            Structured array with SIGNAL_DTYPE rows
+        """
+        panel = np.asarray(panel, dtype=np.float64)
+        sma_short, prev_short = self._sma_pair(panel, self.short_ma)
+        sma_long, prev_long = self._sma_pair(panel, self.long_ma)
+        close = panel[:, -1] if panel.shape[1] else np.full(len(panel), np.nan)
+        return self.evaluate(symbols, close, sma_short, sma_long, prev_short, prev_long,
+                             balance, positions)
+
+    @staticmethod
+    def _sma_pair(panel, period):
+        """SMA on the newest and the previous bar for every row."""
+        rows, width = panel.shape
+        if width < period + 1:
+            now = np.full(rows, np.nan)
+            if width >= period:
+                now = panel[:, -period:].mean(axis=1)
+            return now, np.full(rows, np.nan)
+        return panel[:, -period:].mean(axis=1), panel[:, -period - 1:-1].mean(axis=1)
+
+    def evaluate(self, symbols, close, sma_short, sma_long, prev_short, prev_long,
+                 balance=None, positions=None):
+        """
+        Evaluate pairs from precomputed SMA values.
+
+        NaN SMAs mark pairs without enough history: they get no entry
+        signal, and rows without a long SMA are flagged not ready.
+
+        Args:
+            symbols: Pair names
+            close: Latest close per pair
+            sma_short, sma_long: SMAs on the newest bar
+            prev_short, prev_long: SMAs on the previous bar
+            balance: Account balance for position sizes (sizes are 0 if None)
+            positions: Dict of open positions keyed by symbol
+
+        Returns:
+            Structured array with SIGNAL_DTYPE rows
+        """
+        close = np.asarray(close, dtype=np.float64)
+        sma_short = np.asarray(sma_short, dtype=np.float64)
+        sma_long = np.asarray(sma_long, dtype=np.float64)
+        prev_short = np.asarray(prev_short, dtype=np.float64)
+        prev_long = np.asarray(prev_long, dtype=np.float64)
+
+        table = np.zeros(len(close), dtype=SIGNAL_DTYPE)
+        table['symbol'] = symbols
+        table['ready'] = ~np.isnan(sma_long) & ~np.isnan(close)
+        table['close'] = close
+        table['sma_short'] = sma_short
+        table['sma_long'] = sma_long
+
+        # NaN comparisons are False, so pairs without history stay at 0
+        with np.errstate(invalid='ignore'):
+            buy = (sma_short > sma_long) & (prev_short <= prev_long)
+            sell = (sma_short < sma_long) & (prev_short >= prev_long)
+        signal = buy.astype(np.int8) - sell.astype(np.int8)
+        table['signal'] = signal
+
+        # Entry levels on the signal's side (long levels when there is none)
+        short_side = signal == -1
+        table['stop_loss'] = np.where(short_side, close * (1 + self.stop_loss_pct), close * (1 - self.stop_loss_pct))
+        table['take_profit'] = np.where(short_side, close * (1 - self.take_profit_pct), close * (1 + self.take_profit_pct))
+
+        if balance is not None:
+            risk_per_unit = close - table['stop_loss']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                size = np.where(risk_per_unit > 0, balance * self.risk_per_trade / risk_per_unit, 0.0)
+            table['size'] = np.nan_to_num(size)
+
+        if positions:
+            self._exits(table, positions)
+        return table
+
+    def _exits(self, table, positions):
+        """Fill the position and exit columns for pairs with an open position."""
+        side = np.zeros(len(table), dtype=np.int8)
+        entry = np.full(len(table), np.nan)
+        for i, symbol in enumerate(table['symbol']):
+            position = positions.get(str(symbol))
+            if position is not None:
+                side[i] = 1 if position.get('side', 'long') == 'long' else -1
+                entry[i] = position.get('entryPrice', 0)
+        table['position'] = side
+
+        close = table['close']
+        long_side, short_side = side > 0, side < 0
+        stop = np.where(long_side, entry * (1 - self.stop_loss_pct), entry * (1 + self.stop_loss_pct))
+        target = np.where(long_side, entry * (1 + self.take_profit_pct), entry * (1 - self.take_profit_pct))
+
+        with np.errstate(invalid='ignore'):
+            stop_hit = (long_side & (close <= stop)) | (short_side & (close >= stop))
+            target_hit = (long_side & (close >= target)) | (short_side & (close <= target))
+        reverse = (long_side & (table['signal'] == -1)) | (short_side & (table['signal'] == 1))
+
+        table['exit'] = np.where(stop_hit, EXIT_STOP,
+                                 np.where(target_hit, EXIT_TARGET,
+                                          np.where(reverse, EXIT_REVERSE, EXIT_NONE)))
+
+    @staticmethod
+    def actionable(table):
+        """
+        Select the rows that need an order.
+
+        Returns:
+            Rows with an exit on an open position (price exits need no
+            indicator history) or an entry signal on a flat, ready pair
+        """
+        flat = table['position'] == 0
+        act = ((~flat) & (table['exit'] != EXIT_NONE)) | (flat & table['ready'] & (table['signal'] != 0))
+        return table[act]
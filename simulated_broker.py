@@ -0,0 +1,471 @@
+"""
+Simulated Broker Module
+In-memory paper broker with the OANDAConnector interface.
+
+Prices come from a tick stream (synthetic or recorded with PriceStream),
+bars are built with BarAggregator, and orders fill against the current
+bid/ask: market orders immediately, limit and stop orders when a tick
+crosses their price. Positions are netted per pair like an OANDA
+account. Nothing touches the network or disk, so ForexTradingBot can be
+soak-tested over simulated weeks in seconds.
+
+P&L is booked in the account currency when it is the quote or base
+currency of the pair; other crosses are booked unconverted.
+"""
+import itertools
+import math
+import random
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+
+from bar_aggregator import BarAggregator
+from broker_connector import candles_to_frame
+from candle_store import timeframe_to_ms, to_ms
+from price_stream import Tick
+
+
+class SimulatedBroker:
+    """
+    Paper broker implementing the OANDAConnector methods in memory.
+
+    Feed it prices with `on_tick(tick)` (or `run(ticks)`); everything else
+    is called exactly like OANDAConnector.
+    """
+
+    def __init__(self, initial_balance=10000.0, currency='USD', spread=None, margin_rate=0.02,
+                 timeframes=('1h',), history=5000, on_bar_close=None):
+        """
+        Initialize simulated broker.
+
+        Args:
+            initial_balance: Starting cash in the account currency
+            currency: Account currency
+            spread: Spread in price units to apply to mid-only ticks
+                (None uses the ticks' own bid/ask)
+            margin_rate: Margin required per unit of notional (0.02 = 50:1)
+            timeframes: Timeframes to build bars for
+            history: Closed bars kept per (symbol, timeframe), and orders kept
+            on_bar_close: Callback(symbol, timeframe, bar) for each closed bar
+        """
+        self.currency = currency
+        self.spread = spread
+        self.margin_rate = margin_rate
+        self.balance = float(initial_balance)
+        self.history = history
+        self.on_bar_close = on_bar_close
+
+        self.account_id = 'simulated'
+        self.practice = True
+        self.lock = threading.RLock()
+
+        self.quotes = {}
+        self.positions = {}
+        self.pending = {}
+        # Recent orders only, so long soak runs do not grow without bound
+        self.orders = deque(maxlen=history)
+        self.order_ids = itertools.count(1)
+        self.now = 0
+
+        self._bars = {}
+        self.aggregator = BarAggregator(timeframes, on_bar_close=self._bar_closed)
+
+        self.order_count = 0
+        self.fill_count = 0
+        self.rejected_count = 0
+
+    def on_tick(self, tick):
+        """
+        Update prices, bars and pending orders from one tick.
+
+        Args:
+            tick: price_stream.Tick
+        """
+        if self.spread is not None:
+            half = self.spread / 2
+            mid = tick.mid
+            tick = Tick(tick.symbol, tick.timestamp, mid - half, mid + half)
+
+        with self.lock:
+            self.now = tick.timestamp
+            self.quotes[tick.symbol] = tick
+            position = self.positions.get(tick.symbol)
+            if position:
+                self._mark(position, tick)
+            if self.pending.get(tick.symbol):
+                self._check_pending(tick)
+
+        self.aggregator.on_tick(tick)
+
+    def run(self, ticks, on_tick=None):
+        """
+        Feed a sequence of ticks.
+
+        Args:
+            ticks: Iterable of Tick (e.g., synthetic_ticks() or load_ticks())
+            on_tick: Optional callback(tick) run after the broker has
+                processed each tick (e.g., ForexTradingBot.on_tick)
+
+        Returns:
+            Number of ticks processed
+        """
+        count = 0
+        for tick in ticks:
+            self.on_tick(tick)
+            if on_tick:
+                on_tick(tick)
+            count += 1
+        self.aggregator.flush(self.now)
+        return count
+
+    def _bar_closed(self, symbol, timeframe, bar):
+        key = (symbol, timeframe)
+        bars = self._bars.get(key)
+        if bars is None:
+            bars = self._bars[key] = deque(maxlen=self.history)
+        bars.append(bar)
+        if self.on_bar_close:
+            self.on_bar_close(symbol, timeframe, bar)
+
+    def get_ohlcv(self, symbol, timeframe='1h', limit=500, use_cache=True):
+        """
+        Get bars built from the tick stream, newest (still forming) bar last.
+
+        Returns:
+            DataFrame with OHLCV data
+        """
+        try:
+            rows = list(self._bars.get((symbol, timeframe), ()))[-limit:]
+            forming = self.aggregator.current_bar(symbol, timeframe)
+            if forming:
+                rows = rows[-(limit - 1):] if limit > 1 else []
+                rows.append(forming)
+            return candles_to_frame(rows)
+        except Exception as e:
+            print(f"Error fetching OHLCV data for {symbol}: {e}")
+            return pd.DataFrame()
+
+    def get_ohlcv_since(self, symbol, timeframe, since, limit=500):
+        """Get bars at or after `since` (ms), newest (still forming) bar last."""
+        rows = []
+        for bar in reversed(self._bars.get((symbol, timeframe), ())):
+            if bar[0] < since:
+                break
+            rows.append(bar)
+        rows.reverse()
+        forming = self.aggregator.current_bar(symbol, timeframe)
+        if forming and forming[0] >= since:
+            rows.append(forming)
+        return candles_to_frame(rows)
+
+    def get_cached_ohlcv(self, symbol, timeframe='1h', limit=500):
+        """Get closed bars only."""
+        return candles_to_frame(list(self._bars.get((symbol, timeframe), ()))[-limit:])
+
+    def ingest_bars(self, symbol, timeframe, bars):
+        """Preload closed bars, e.g. history to warm up indicators."""
+        key = (symbol, timeframe)
+        if key not in self._bars:
+            self._bars[key] = deque(maxlen=self.history)
+        self._bars[key].extend(list(bar) for bar in bars)
+
+    def get_ticker(self, symbol):
+        """Get the current quote for a symbol."""
+        tick = self.quotes.get(symbol)
+        if tick is None:
+            print(f"Error fetching ticker for {symbol}: no price yet")
+            return None
+        return {
+            'symbol': symbol,
+            'timestamp': tick.timestamp,
+            'bid': tick.bid,
+            'ask': tick.ask,
+            'last': tick.mid,
+        }
+
+    def get_balance(self, refresh=False):
+        """Get account balance (total includes unrealized P&L)."""
+        with self.lock:
+            unrealized = sum(pos['unrealizedPL'] for pos in self.positions.values())
+            used = sum(pos['margin'] for pos in self.positions.values())
+            total = self.balance + unrealized
+            return {'total': total, 'free': total - used, 'used': used}
+
+    def get_positions(self, refresh=False):
+        """Get open positions keyed by symbol."""
+        with self.lock:
+            return {symbol: dict(pos) for symbol, pos in self.positions.items()}
+
+    def get_account_info(self):
+        """Get detailed account information."""
+        return {
+            'balance': self.get_balance(),
+            'positions': self.get_positions(),
+            'account_id': self.account_id,
+            'practice': self.practice,
+            'timestamp': pd.Timestamp(self.now, unit='ms').isoformat()
+        }
+
+    def create_market_order(self, symbol, side, amount):
+        """
+        Fill a market order at the current bid/ask.
+
+        Returns:
+            Order info dict, or None if there is no price or too little margin
+        """
+        amount = float(amount)
+        with self.lock:
+            self.order_count += 1
+            tick = self.quotes.get(symbol)
+            if tick is None:
+                self.rejected_count += 1
+                print(f"Error creating market order: no price for {symbol}")
+                return None
+            price = tick.ask if side == 'buy' else tick.bid
+            if not self._has_margin(symbol, side, amount, price):
+                self.rejected_count += 1
+                print(f"Error creating market order: insufficient margin for {amount} {symbol}")
+                return None
+            self._fill(symbol, side, amount, price)
+            order = self._order(symbol, 'market', side, amount, price, 'closed')
+            self.orders.append(order)
+            return order
+
+    def create_limit_order(self, symbol, side, amount, price):
+        """Place a limit order that fills when the market reaches `price`."""
+        return self._place(symbol, 'limit', side, amount, price)
+
+    def create_stop_loss_order(self, symbol, side, amount, stop_price):
+        """Place a stop order that fills at market once `stop_price` trades."""
+        return self._place(symbol, 'stop', side, amount, stop_price)
+
+    def cancel_order(self, order_id, symbol):
+        """Cancel a pending order."""
+        with self.lock:
+            for order in self.pending.get(symbol, []):
+                if order['id'] == order_id:
+                    self.pending[symbol].remove(order)
+                    order['status'] = 'canceled'
+                    return order
+        print(f"Error cancelling order: {order_id} not found")
+        return None
+
+    def close_position(self, symbol):
+        """Close a position entirely."""
+        position = self.positions.get(symbol)
+        if not position:
+            print(f"No open position for {symbol}")
+            return None
+        side = 'sell' if position['side'] == 'long' else 'buy'
+        return self.create_market_order(symbol, side, abs(position['contracts']))
+
+    def _place(self, symbol, order_type, side, amount, price):
+        amount, price = float(amount), float(price)
+        with self.lock:
+            self.order_count += 1
+            order = self._order(symbol, order_type, side, amount, price, 'open')
+            self.pending.setdefault(symbol, []).append(order)
+            self.orders.append(order)
+            tick = self.quotes.get(symbol)
+            if tick is not None:
+                self._check_pending(tick)
+            return order
+
+    def _order(self, symbol, order_type, side, amount, price, status):
+        return {
+            'id': str(next(self.order_ids)),
+            'symbol': symbol,
+            'type': order_type,
+            'side': side,
+            'amount': amount,
+            'price': price,
+            'status': status,
+            'filled': amount if status == 'closed' else 0,
+            'timestamp': self.now,
+        }
+
+    def _check_pending(self, tick):
+        remaining = []
+        for order in self.pending[tick.symbol]:
+            buy = order['side'] == 'buy'
+            market = tick.ask if buy else tick.bid
+            if order['type'] == 'limit':
+                triggered = market <= order['price'] if buy else market >= order['price']
+                fill_price = order['price']
+            else:
+                triggered = market >= order['price'] if buy else market <= order['price']
+                fill_price = market
+            if triggered and self._has_margin(tick.symbol, order['side'], order['amount'], fill_price):
+                self._fill(tick.symbol, order['side'], order['amount'], fill_price)
+                order.update(status='closed', filled=order['amount'], average=fill_price)
+            elif triggered:
+                self.rejected_count += 1
+                order['status'] = 'rejected'
+            else:
+                remaining.append(order)
+        self.pending[tick.symbol] = remaining
+
+    def _has_margin(self, symbol, side, amount, price):
+        position = self.positions.get(symbol)
+        if position and (position['side'] == 'long') != (side == 'buy'):
+            # Reducing or flipping only needs margin for the excess
+            amount = max(0.0, amount - position['contracts'])
+        required = self._to_account(symbol, amount * price * self.margin_rate, price)
+        return required <= self.get_balance()['free'] + 1e-9
+
+    def _fill(self, symbol, side, amount, price):
+        self.fill_count += 1
+        direction = 1 if side == 'buy' else -1
+        position = self.positions.get(symbol)
+
+        if position is None:
+            self._open(symbol, direction, amount, price)
+            return
+
+        held = 1 if position['side'] == 'long' else -1
+        if held == direction:
+            units = position['contracts'] + amount
+            position['entryPrice'] = (position['entryPrice'] * position['contracts'] + price * amount) / units
+            position['contracts'] = units
+        else:
+            closed = min(amount, position['contracts'])
+            pnl = (price - position['entryPrice']) * closed * held
+            self.balance += self._to_account(symbol, pnl, price)
+            position['contracts'] -= closed
+            if position['contracts'] <= 1e-9:
+                del self.positions[symbol]
+                if amount > closed:
+                    self._open(symbol, direction, amount - closed, price)
+                return
+
+        tick = self.quotes.get(symbol)
+        if tick is not None:
+            self._mark(position, tick)
+
+    def _open(self, symbol, direction, amount, price):
+        position = {
+            'symbol': symbol,
+            'side': 'long' if direction > 0 else 'short',
+            'contracts': amount,
+            'entryPrice': price,
+            'currentPrice': price,
+            'unrealizedPL': 0.0,
+            'margin': 0.0,
+        }
+        self.positions[symbol] = position
+        tick = self.quotes.get(symbol)
+        if tick is not None:
+            self._mark(position, tick)
+
+    def _mark(self, position, tick):
+        long = position['side'] == 'long'
+        price = tick.bid if long else tick.ask
+        units = position['contracts']
+        pnl = (price - position['entryPrice']) * units * (1 if long else -1)
+        position['currentPrice'] = price
+        position['unrealizedPL'] = self._to_account(tick.symbol, pnl, price)
+        position['margin'] = self._to_account(tick.symbol, units * price * self.margin_rate, price)
+
+    def _to_account(self, symbol, amount, price):
+        """Convert an amount in the pair's quote currency to the account currency."""
+        base, _, quote = symbol.partition('/')
+        if base == self.currency and price:
+            return amount / price
+        return amount
+
+    def stats(self):
+        """Get order counters."""
+        return {
+            'orders': self.order_count,
+            'fills': self.fill_count,
+            'rejected': self.rejected_count,
+            'pending': sum(len(orders) for orders in self.pending.values()),
+        }
+
+
+def synthetic_ticks(symbols, start, duration, interval=1.0, spread=0.0002, volatility=0.0001,
+                    prices=None, seed=None):
+    """
+    Generate a random-walk tick stream, skipping weekends like the FX market.
+
+    Args:
+        symbols: Trading pairs (e.g., ['EUR/USD'])
+        start: Start time (datetime, string or ms)
+        duration: Length of the stream in seconds
+        interval: Seconds between ticks per symbol
+        spread: Bid/ask spread as a fraction of price
+        volatility: Standard deviation of each log-price step
+        prices: dict of symbol -> starting mid price (default 1.1)
+        seed: Random seed for a reproducible stream
+
+    Yields:
+        Tick, in time order
+    """
+    rng = random.Random(seed)
+    mids = {symbol: (prices or {}).get(symbol, 1.1) for symbol in symbols}
+    start_ms = to_ms(start)
+    step_ms = int(interval * 1000)
+    day_ms = timeframe_to_ms('1d')
+
+    for ts in range(start_ms, start_ms + int(duration * 1000), step_ms):
+        # Epoch day 0 was a Thursday, so days 2 and 3 (mod 7) are Sat/Sun
+        if (ts // day_ms) % 7 in (2, 3):
+            continue
+        for symbol in symbols:
+            mid = mids[symbol] * math.exp(rng.gauss(0, volatility))
+            mids[symbol] = mid
+            half = mid * spread / 2
+            yield Tick(symbol, ts, mid - half, mid + half)
+
+
+def run_simulation(bot, broker, ticks, check_exits=True):
+    """
+    Run ForexTradingBot against a SimulatedBroker over a tick stream.
+
+    Entries are evaluated on every bar close of the bot's timeframe and,
+    with `check_exits`, stops and targets are checked on every tick.
+
+    Args:
+        bot: ForexTradingBot with strategy and config set
+        broker: SimulatedBroker
+        ticks: Iterable of Tick
+        check_exits: Call bot.on_tick for every tick
+
+    Returns:
+        dict with ticks, bars, seconds, ticks_per_second, bar-close latency
+        percentiles (ms) and the broker's order counters
+    """
+    bot.broker = broker
+    latencies = []
+
+    def on_bar_close(symbol, timeframe, bar):
+        started = time.perf_counter()
+        bot.on_bar_close(symbol, timeframe, bar)
+        if timeframe == bot.config.get('timeframe', '1h'):
+            latencies.append(time.perf_counter() - started)
+
+    broker.on_bar_close = on_bar_close
+    started = time.perf_counter()
+    count = broker.run(ticks, on_tick=bot.on_tick if check_exits else None)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+
+    result = {
+        'ticks': count,
+        'bars': len(latencies),
+        'seconds': round(elapsed, 3),
+        'ticks_per_second': round(count / elapsed, 1) if elapsed > 0 else float('inf'),
+        'bar_latency_p50_ms': percentile(0.5),
+        'bar_latency_p99_ms': percentile(0.99),
+        'bar_latency_max_ms': percentile(1.0),
+    }
+    result.update(broker.stats())
+    return result
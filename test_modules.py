@@ -38,6 +38,90 @@ def test_imports():
     except Exception as e:
         print(f"✗ backtester failed: {e}")
     
+    try:
+        import vector_backtester
+        print("✓ vector_backtester imported")
+    except Exception as e:
+        print(f"✗ vector_backtester failed: {e}")
+    
+    try:
+        import shared_prices
+        print("✓ shared_prices imported")
+    except Exception as e:
+        print(f"✗ shared_prices failed: {e}")
+    
+    try:
+        import ma_grid
+        print("✓ ma_grid imported")
+    except Exception as e:
+        print(f"✗ ma_grid failed: {e}")
+    
+    try:
+        import result_cache
+        print("✓ result_cache imported")
+    except Exception as e:
+        print(f"✗ result_cache failed: {e}")
+    
+    try:
+        import price_stream
+        print("✓ price_stream imported")
+    except Exception as e:
+        print(f"✗ price_stream failed: {e}")
+    
+    try:
+        import bar_aggregator
+        print("✓ bar_aggregator imported")
+    except Exception as e:
+        print(f"✗ bar_aggregator failed: {e}")
+    
+    try:
+        import rate_limiter
+        print("✓ rate_limiter imported")
+    except Exception as e:
+        print(f"✗ rate_limiter failed: {e}")
+    
+    try:
+        import broker_replay
+        print("✓ broker_replay imported")
+    except Exception as e:
+        print(f"✗ broker_replay failed: {e}")
+    
+    try:
+        import simulated_broker
+        print("✓ simulated_broker imported")
+    except Exception as e:
+        print(f"✗ simulated_broker failed: {e}")
+    
+    try:
+        import bar_buffer
+        print("✓ bar_buffer imported")
+    except Exception as e:
+        print(f"✗ bar_buffer failed: {e}")
+    
+    try:
+        import signal_engine
+        print("✓ signal_engine imported")
+    except Exception as e:
+        print(f"✗ signal_engine failed: {e}")
+    
+    try:
+        import indicators
+        print("✓ indicators imported")
+    except Exception as e:
+        print(f"✗ indicators failed: {e}")
+    
+    try:
+        import indicator_graph
+        print("✓ indicator_graph imported")
+    except Exception as e:
+        print(f"✗ indicator_graph failed: {e}")
+    
+    try:
+        import scheduler
+        print("✓ scheduler imported")
+    except Exception as e:
+        print(f"✗ scheduler failed: {e}")
+    
     try:
         import forex_gui
         print("✓ forex_gui imported")
@@ -90,6 +174,42 @@ def test_strategy():
     
     print()
 
+def test_streaming_signals():
+    """Test streaming crossover state against calculate_indicators."""
+    print("Testing streaming signals...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from forex_strategy import MovingAverageCrossoverStrategy
+        
+        closes = 1.1 + np.cumsum(np.random.default_rng(7).normal(0, 0.001, 600))
+        timestamps = np.arange(600) * 3600000
+        strategy = MovingAverageCrossoverStrategy(short_ma=10, long_ma=30)
+        
+        expected = strategy.calculate_indicators(pd.DataFrame({'close': closes}))['signal'].to_numpy()
+        streamed = []
+        for i in range(600):
+            # Each bar is first seen forming, then closed; windows overlap by one bar
+            window = slice(max(0, i - 1), i + 1)
+            forming = closes[window].copy()
+            forming[-1] += 0.01
+            strategy.update_stream('EUR/USD 1h', timestamps[window], forming)
+            signal = strategy.update_stream('EUR/USD 1h', timestamps[window], closes[window])
+            streamed.append(0 if signal is None else signal)
+            if i == 300:
+                checkpoint = strategy.get_stream_state()
+                strategy = MovingAverageCrossoverStrategy(short_ma=10, long_ma=30)
+                strategy.load_stream_state(checkpoint)
+        
+        assert (np.array(streamed) == expected).all(), "streamed signals differ"
+        print(f"✓ {int(np.abs(expected).sum())} crossovers match, including across a checkpoint restore")
+        
+    except Exception as e:
+        print(f"✗ Streaming signal test failed: {e}")
+    
+    print()
+
 def test_backtester():
     """Test backtester with sample data."""
     print("Testing backtester...")
@@ -160,6 +280,1294 @@ def test_telegram():
     
     print()
 
+def test_candle_cache():
+    """Test that the connector keeps candles and only fetches new bars."""
+    print("Testing candle cache...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        from broker_connector import OANDAConnector
+        from candle_store import CandleStore
+        
+        hour = 3600000
+        
+        class HourlyExchange:
+            def __init__(self):
+                self.newest = 1700002800000
+                self.calls = []
+            
+            def fetch_ohlcv(self, symbol, timeframe, since=None, limit=500):
+                first = since if since is not None else self.newest - (limit - 1) * hour
+                rows = [[t, 1.1, 1.101, 1.099, 1.1 + t / hour % 100 * 1e-4, 100]
+                        for t in range(first, self.newest + 1, hour)][:limit]
+                self.calls.append((since, len(rows)))
+                return rows
+        
+        exchange = HourlyExchange()
+        store = CandleStore(tempfile.mkdtemp())
+        broker = OANDAConnector('key', 'account', store=store, exchange=exchange)
+        
+        first = broker.get_ohlcv('EUR/USD', '1h', limit=50)
+        first['sma'] = 0.0  # Callers add columns; the cache must not see them
+        again = broker.get_ohlcv('EUR/USD', '1h', limit=50)
+        last_ms = int(first.index[-1].value // 1000000)
+        assert exchange.calls == [(None, 50), (last_ms, 1)], f"unexpected requests: {exchange.calls}"
+        assert 'sma' not in again.columns and again.equals(first.drop(columns='sma')), "cached candles differ"
+        
+        # Two new bars: only they (and the re-fetched forming bar) are requested
+        exchange.newest += 2 * hour
+        topped_up = broker.get_ohlcv('EUR/USD', '1h', limit=50)
+        assert exchange.calls[-1] == (last_ms, 3), "top-up should start at the last cached bar"
+        assert len(topped_up) == 50 and topped_up.index[-1].value // 1000000 == exchange.newest
+        assert topped_up.iloc[:-2].equals(again.iloc[2:]), "older bars changed during top-up"
+        
+        # A restart resumes from the closed bars in the candle store
+        restarted = OANDAConnector('key', 'account', store=store, exchange=exchange)
+        resumed = restarted.get_ohlcv('EUR/USD', '1h', limit=50)
+        assert exchange.calls[-1] == (exchange.newest - hour, 2), "restart should resume from the store"
+        assert resumed.equals(topped_up), "restarted history differs"
+        
+        # Tick-built bars are served from memory but never stored; the next
+        # top-up refetches them and persists the broker's candles instead
+        newest = exchange.newest
+        restarted.ingest_bars('EUR/USD', '1h', [[newest, 9, 9, 9, 9, 1], [newest + hour, 9, 9, 9, 9, 1]])
+        assert restarted.get_cached_ohlcv('EUR/USD', '1h')['close'].iloc[-1] == 9
+        assert store.last_timestamp('EUR/USD', '1h') == newest - hour, "tick-built bars written to the store"
+        exchange.newest += 2 * hour
+        refetched = restarted.get_ohlcv('EUR/USD', '1h', limit=50)
+        assert exchange.calls[-1] == (newest, 3), "top-up should reach back to the first tick-built bar"
+        assert (refetched['close'] != 9).all(), "tick-built bars not replaced"
+        assert (store.read('EUR/USD', '1h')['close'] != 9).all() and \
+            store.last_timestamp('EUR/USD', '1h') == newest + hour, "broker candles not persisted"
+        
+        # After a long downtime the refetched window no longer reaches the
+        # stored history; the gap is backfilled before anything is appended
+        exchange.newest += 200 * hour
+        late = OANDAConnector('key', 'account', store=store, exchange=exchange)
+        late.get_ohlcv('EUR/USD', '1h', limit=50)
+        steps = np.diff(store.read('EUR/USD', '1h').index.as_unit('ms').asi8)
+        assert (steps == hour).all(), "stored history has a gap after the restart"
+        assert store.last_timestamp('EUR/USD', '1h') == exchange.newest - hour
+        
+        broker.get_ohlcv('EUR/USD', '1h', limit=50, use_cache=False)
+        assert exchange.calls[-1] == (None, 50), "use_cache=False should fetch the full window"
+        print(f"✓ {len(exchange.calls)} requests, top-ups fetched only new bars and resumed after a restart")
+        
+    except Exception as e:
+        print(f"✗ Candle cache test failed: {e}")
+    
+    print()
+
+def test_candle_store():
+    """Test the columnar candle store and incremental yfinance loading."""
+    print("Testing candle store...")
+    
+    try:
+        import sys
+        import tempfile
+        import types
+        from datetime import datetime, timedelta
+        import numpy as np
+        import pandas as pd
+        from candle_store import CandleStore, load_yf_history
+        
+        def bars(start, periods, freq='1h'):
+            index = pd.date_range(start, periods=periods, freq=freq, name='timestamp')
+            close = 1.1 + np.arange(periods) * 1e-4
+            return pd.DataFrame({'open': close, 'high': close + 5e-4, 'low': close - 5e-4,
+                                 'close': close, 'volume': 100.0}, index=index)
+        
+        store = CandleStore(tempfile.mkdtemp())
+        history = bars('2024-01-01', 100)
+        assert store.append('EUR/USD', '1h', history.iloc[40:70]) == 30
+        assert store.append('EUR/USD', '1h', history.iloc[60:80]) == 10, "only newer bars should be appended"
+        assert store.append('EUR/USD', '1h', history.iloc[:50]) == 80, "older bars should rewrite the partition"
+        
+        stored = store.read('EUR/USD', '1h')
+        assert stored.equals(history.iloc[:80]), "stored candles differ"
+        window = store.read('EUR/USD', '1h', start='2024-01-02', end='2024-01-02 05:00', limit=3)
+        assert list(window.index.hour) == [3, 4, 5], "range read returned the wrong bars"
+        columns = store.read_columns('EUR/USD', '1h')
+        assert isinstance(columns['close'], np.memmap) and not columns['close'].flags.writeable
+        assert store.partitions() == [('EUR/USD', '1h')]
+        print(f"✓ Appended, prepended and read back {len(stored)} bars through memory maps")
+        
+        # yfinance stand-in: daily bars on weekdays up to today, minus holidays,
+        # with prices scaled by the current split/dividend adjustment
+        downloads = []
+        holidays = set()
+        adjustment = [1.0]
+        
+        def download(ticker, period=None, start=None, interval='1d', auto_adjust=True):
+            downloads.append((ticker, 'period' if period else 'start'))
+            first = datetime.now() - timedelta(days=int(period[:-1])) if period else pd.Timestamp(start)
+            days = pd.bdate_range(pd.Timestamp(first).normalize(), datetime.now().date())
+            days = days[~days.isin(list(holidays))]
+            close = (100 + np.asarray(days.dayofyear, dtype=float)) * adjustment[0]
+            df = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1.0}, index=days)
+            df.columns = pd.MultiIndex.from_product([[c.title() for c in df.columns], [ticker]])
+            return df
+        
+        today = pd.Timestamp(datetime.now().date())
+        saved = sys.modules.get('yfinance')
+        sys.modules['yfinance'] = types.SimpleNamespace(download=download)
+        try:
+            # A period starting on a Saturday has no bars until Monday
+            days = (today.weekday() - 5) % 7 + 14
+            for _ in range(2):
+                df = load_yf_history('SPY', days=days, store=store)
+            assert [kind for _, kind in downloads] == ['period', 'start'], \
+                f"weekend start re-downloaded the period: {downloads}"
+            assert df.index[0] == today - pd.Timedelta(days=days - 2), "history should start on Monday"
+            assert len(store.read('SPY', '1d')) == len(df) - 1, "forming bar should not be stored"
+            
+            # A period starting on a market holiday has no bars that day either
+            days = today.weekday() + 14
+            holidays.add(today - pd.Timedelta(days=days))
+            for _ in range(2):
+                df = load_yf_history('QQQ', days=days, store=store)
+            assert [kind for ticker, kind in downloads if ticker == 'QQQ'] == ['period', 'start'], \
+                "holiday start re-downloaded the period"
+            assert df.index[0] == today - pd.Timedelta(days=days - 1), "history should start after the holiday"
+            
+            # A dividend re-bases every adjusted price: the stored history is replaced
+            adjustment[0] = 0.98
+            df = load_yf_history('QQQ', days=days, store=store)
+            assert [kind for ticker, kind in downloads if ticker == 'QQQ'] == ['period', 'start', 'start', 'period'], \
+                "adjustment change not detected"
+            expected = (100 + np.asarray(df.index.dayofyear, dtype=float)) * 0.98
+            assert np.allclose(df['close'], expected), "stored history mixes adjustment bases"
+        finally:
+            if saved is None:
+                sys.modules.pop('yfinance')
+            else:
+                sys.modules['yfinance'] = saved
+        print("✓ load_yf_history downloads only new bars, and everything again after an adjustment change")
+        
+    except Exception as e:
+        print(f"✗ Candle store test failed: {e}")
+    
+    print()
+
+def test_concurrent_fetch():
+    """Test that market data for all pairs is fetched concurrently."""
+    print("Testing concurrent fetch...")
+    
+    try:
+        import threading
+        import pandas as pd
+        from forex_bot import ForexTradingBot
+        
+        pairs = ['EUR/USD', 'GBP/USD', 'USD/JPY', 'AUD/USD']
+        # Every pair's request must be in flight at once to get past the barrier
+        barrier = threading.Barrier(len(pairs), timeout=5)
+        
+        class SlowBroker:
+            def __init__(self):
+                self.position_calls = 0
+            
+            def get_ohlcv(self, pair, timeframe, limit=250):
+                if pair == 'BAD/PAIR':
+                    raise RuntimeError("unknown instrument")
+                barrier.wait()
+                index = pd.date_range('2024-01-01', periods=limit, freq='1h', name='timestamp')
+                return pd.DataFrame({'open': 1.1, 'high': 1.1, 'low': 1.1, 'close': 1.1, 'volume': 1.0}, index=index)
+            
+            def get_positions(self):
+                self.position_calls += 1
+                return {'EUR/USD': {'side': 'long', 'contracts': 1000}}
+        
+        bot = ForexTradingBot()
+        bot.broker = SlowBroker()
+        bot.config = {'fetch_workers': 8}
+        market_data, positions = bot.fetch_market_data(pairs + ['BAD/PAIR'], '1h', limit=50)
+        bot.fetch_pool.shutdown()
+        
+        assert sorted(market_data) == sorted(pairs), "a failing pair should only drop itself"
+        assert all(len(market_data[pair]) == 50 for pair in pairs), "bar buffers not filled"
+        assert bot.broker.position_calls == 1 and 'EUR/USD' in positions, "positions should be fetched once"
+        print(f"✓ {len(pairs)} pairs fetched in parallel; a failing pair did not stop the others")
+        
+    except Exception as e:
+        print(f"✗ Concurrent fetch test failed: {e}")
+    
+    print()
+
+def test_account_snapshot():
+    """Test that balance and positions are reused until the snapshot expires."""
+    print("Testing account snapshot...")
+    
+    try:
+        import time
+        from broker_connector import AccountSnapshot, OANDAConnector
+        
+        class CountingExchange:
+            def __init__(self):
+                self.calls = {'fetch_balance': 0, 'fetch_positions': 0}
+                self.positions = [{'symbol': 'EUR/USD', 'side': 'long', 'contracts': 1000},
+                                  {'symbol': 'GBP/USD', 'side': 'short', 'contracts': 0}]
+            
+            def fetch_balance(self):
+                self.calls['fetch_balance'] += 1
+                return {'total': {'USD': 10000}, 'free': {'USD': 9000}, 'used': {'USD': 1000}}
+            
+            def fetch_positions(self):
+                self.calls['fetch_positions'] += 1
+                return self.positions
+            
+            def create_market_order(self, symbol, side, amount):
+                self.calls['create_market_order'] = self.calls.get('create_market_order', 0) + 1
+                self.positions = []
+                return {'id': '1', 'symbol': symbol, 'side': side, 'amount': amount}
+        
+        snapshot = AccountSnapshot(ttl=0.1)
+        snapshot.put('balance', {'total': 1})
+        assert snapshot.get('balance') == {'total': 1} and snapshot.get('positions') is None
+        time.sleep(0.15)
+        assert snapshot.get('balance') is None, "entry should expire after the TTL"
+        
+        exchange = CountingExchange()
+        broker = OANDAConnector('key', 'account', store=False, snapshot_ttl=0.2, exchange=exchange)
+        
+        # One request each for a cycle's worth of account reads
+        for _ in range(3):
+            broker.get_balance()
+            broker.get_positions()
+        info = broker.get_account_info()
+        assert exchange.calls == {'fetch_balance': 1, 'fetch_positions': 1}, f"snapshot not reused: {exchange.calls}"
+        assert info['balance']['free'] == 9000 and list(info['positions']) == ['EUR/USD']
+        
+        broker.get_balance(refresh=True)
+        assert exchange.calls['fetch_balance'] == 2, "refresh=True should bypass the snapshot"
+        
+        time.sleep(0.25)
+        broker.get_positions()
+        assert exchange.calls['fetch_positions'] == 2, "expired snapshot not refetched"
+        
+        # A trade the broker closed itself is still in the snapshot, but
+        # closing must not send a reverse order for it
+        live = exchange.positions
+        exchange.positions = []
+        assert 'EUR/USD' in broker.get_positions(), "snapshot should still hold the position"
+        assert broker.close_position('EUR/USD') is None and exchange.calls['fetch_positions'] == 3, \
+            "close should refetch positions"
+        assert 'create_market_order' not in exchange.calls, "reverse order sent for a closed trade"
+        
+        exchange.positions = live
+        order = broker.close_position('EUR/USD')
+        assert order['side'] == 'sell' and exchange.calls['fetch_positions'] == 4
+        assert broker.get_positions() == {} and exchange.calls['fetch_positions'] == 5, \
+            "order should invalidate the snapshot"
+        print(f"✓ {exchange.calls['fetch_balance'] + exchange.calls['fetch_positions']} account requests for 14 reads; TTL, refresh and invalidation work")
+        
+    except Exception as e:
+        print(f"✗ Account snapshot test failed: {e}")
+    
+    print()
+
+def test_price_stream():
+    """Test price stream against the local replay server."""
+    print("Testing price stream...")
+    
+    try:
+        from price_stream import PriceStream, TickReplayServer, Tick
+        
+        ticks = [
+            Tick('EUR/USD', 1700000000000 + i * 1000, 1.1000 + i * 0.0001, 1.1002 + i * 0.0001)
+            for i in range(50)
+        ]
+        server = TickReplayServer(ticks)
+        url = server.start()
+        
+        received = []
+        stream = PriceStream(url, ['EUR/USD'], reconnect=False)
+        stream.run(received.append)
+        server.stop()
+        
+        expected = [(t.symbol, t.timestamp, round(t.bid, 5), round(t.ask, 5)) for t in ticks]
+        assert received == expected, "replayed ticks differ from recorded ticks"
+        print(f"✓ Replayed {len(received)} ticks through the streaming client")
+        
+    except Exception as e:
+        print(f"✗ Price stream test failed: {e}")
+    
+    print()
+
+def test_bar_aggregator():
+    """Test building bars from ticks."""
+    print("Testing bar aggregator...")
+    
+    try:
+        from bar_aggregator import BarAggregator
+        from price_stream import Tick
+        
+        closed = []
+        unlocked = []
+        
+        def on_bar_close(symbol, timeframe, bar):
+            # Callbacks must not hold up ticks arriving on other threads
+            unlocked.append(aggregator.lock.acquire(blocking=False))
+            if unlocked[-1]:
+                aggregator.lock.release()
+            closed.append((timeframe, bar))
+        
+        aggregator = BarAggregator(['1m', '5m'], on_bar_close=on_bar_close)
+        
+        # One tick per second for 10 minutes, starting on a 5m boundary
+        start = 1700000100000
+        for i in range(600):
+            aggregator.on_tick(Tick('EUR/USD', start + i * 1000, 1.1 + i * 1e-5, 1.1 + i * 1e-5))
+        aggregator.flush(start + 600 * 1000)
+        
+        one_minute = [bar for tf, bar in closed if tf == '1m']
+        five_minute = [bar for tf, bar in closed if tf == '5m']
+        assert len(one_minute) == 10 and len(five_minute) == 2, "wrong number of bars"
+        assert five_minute[0][5] == 300, "5m bar should contain 300 ticks"
+        assert all(unlocked), "callback ran with the aggregator locked"
+        print(f"✓ Built {len(one_minute)} 1m bars and {len(five_minute)} 5m bars from 600 ticks")
+        
+    except Exception as e:
+        print(f"✗ Bar aggregator test failed: {e}")
+    
+    print()
+
+def test_resampler():
+    """Test deriving coarser timeframes from base-timeframe bars."""
+    print("Testing timeframe resampler...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from broker_connector import OANDAConnector
+        from resampler import TimeframeResampler, can_derive
+        
+        # 5m random walk starting mid-hour, so the first 1h bar is partial
+        rng = np.random.default_rng(3)
+        close = 1.1 + np.cumsum(rng.normal(0, 1e-4, 2000))
+        index = pd.date_range('2024-01-01 00:10', periods=len(close), freq='5min', name='timestamp')
+        base = pd.DataFrame({'open': close - 5e-5, 'high': close + 2e-4, 'low': close - 2e-4,
+                             'close': close, 'volume': rng.integers(1, 100, len(close)).astype(float)}, index=index)
+        
+        resampler = TimeframeResampler('5m')
+        hourly = resampler.derive('EUR/USD', base.iloc[:1000], '1h')
+        assert hourly.index[0] == pd.Timestamp('2024-01-01 01:00'), "partial leading bar not dropped"
+        bar = base.loc['2024-01-01 01:00':'2024-01-01 01:55']
+        expected = [bar['open'].iloc[0], bar['high'].max(), bar['low'].min(), bar['close'].iloc[-1], bar['volume'].sum()]
+        assert np.allclose(hourly.iloc[0].to_numpy(), expected), "1h bar aggregated incorrectly"
+        
+        # Sliding the base window re-aggregates only the newest bars
+        for end in (1003, 1100, 2000):
+            window = base.iloc[end - 1000:end]
+            derived = resampler.derive('EUR/USD', window, '1h')
+            fresh = TimeframeResampler('5m').derive('EUR/USD', window, '1h')
+            assert derived.iloc[-len(fresh):].equals(fresh), f"incremental 1h bars differ at {end}"
+        four_hour = resampler.derive('EUR/USD', base, '4h')
+        assert four_hour['volume'].sum() <= base['volume'].sum()
+        
+        # 4h/1d bars follow OANDA's 17:00 New York alignment across DST changes
+        def new_york(index):
+            return index.tz_localize('UTC').tz_convert('America/New_York')
+        assert (new_york(four_hour.index).hour % 4 == 1).all(), "4h bars not aligned to 17:00 New York"
+        autumn = pd.date_range('2024-10-28', '2024-11-08', freq='5min', name='timestamp')
+        autumn = pd.DataFrame({'open': 1.0, 'high': 1.0, 'low': 1.0, 'close': 1.0, 'volume': 1.0}, index=autumn)
+        daily = TimeframeResampler('5m').derive('EUR/USD', autumn, '1d')
+        assert (new_york(daily.index).hour == 17).all(), "daily bars not opening at 17:00 New York"
+        assert set(daily.index.hour) == {21, 22}, "daily alignment ignores DST"
+        four_hour = TimeframeResampler('5m').derive('EUR/USD', autumn, '4h')
+        assert four_hour.loc['2024-11-03 05:00', 'volume'] == 60, "4h bar over the DST change not 5 hours"
+        
+        assert can_derive('5m', '1h') and not can_derive('5m', '7m') and not can_derive('1h', '5m')
+        try:
+            resampler.derive('EUR/USD', base, '7m')
+            raise AssertionError("7m should not be derivable from 5m")
+        except ValueError:
+            pass
+        
+        # The connector downloads only the base timeframe
+        class FiveMinuteExchange:
+            def __init__(self):
+                self.timeframes = []
+            
+            def fetch_ohlcv(self, symbol, timeframe, since=None, limit=500):
+                self.timeframes.append(timeframe)
+                rows = base.iloc[-limit:]
+                return [[int(t.value // 1000000)] + list(row) for t, row in zip(rows.index, rows.to_numpy())]
+        
+        exchange = FiveMinuteExchange()
+        broker = OANDAConnector('key', 'account', store=False, base_timeframe='5m', exchange=exchange)
+        frames = broker.get_ohlcv_timeframes('EUR/USD', ['5m', '1h', '4h'], limit=20)
+        assert set(exchange.timeframes) == {'5m'} and len(exchange.timeframes) == 1, \
+            f"expected one 5m download, got {exchange.timeframes}"
+        assert all(len(df) == 20 for df in frames.values()), "wrong number of bars per timeframe"
+        assert frames['1h'].equals(resampler.derive('EUR/USD', base, '1h').iloc[-20:]), "connector 1h bars differ"
+        print(f"✓ 1h/4h bars match direct aggregation on OANDA's alignment; 3 timeframes from {len(exchange.timeframes)} download")
+        
+    except Exception as e:
+        print(f"✗ Resampler test failed: {e}")
+    
+    print()
+
+def test_rate_limiter():
+    """Test request throttling and coalescing."""
+    print("Testing rate limiter...")
+    
+    try:
+        import threading
+        import time
+        from rate_limiter import RequestLimiter
+        
+        limiter = RequestLimiter(rate=1000, burst=5)
+        calls = []
+        
+        def fetch_positions():
+            calls.append(1)
+            time.sleep(0.1)
+            return ['EUR/USD']
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(limiter.call('positions', fetch_positions)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert len(calls) == 1 and len(results) == 8, "identical calls were not coalesced"
+        
+        for _ in range(20):
+            limiter.call(None, lambda: None)
+        stats = limiter.stats()
+        assert stats['throttled'] > 0, "burst should have been throttled"
+        print(f"✓ Coalesced {stats['coalesced']} calls, throttled {stats['throttled']} of {stats['requests']} requests")
+        
+    except Exception as e:
+        print(f"✗ Rate limiter test failed: {e}")
+    
+    print()
+
+def test_broker_replay():
+    """Test recording broker responses and replaying them through the bot."""
+    print("Testing broker record/replay...")
+    
+    try:
+        import os
+        import tempfile
+        from broker_replay import RecordingExchange, replay_connector, benchmark, record, load_log
+        from forex_bot import ForexTradingBot
+        from forex_strategy import MovingAverageCrossoverStrategy
+        
+        class SampleExchange:
+            def fetch_ohlcv(self, symbol, timeframe, since=None, limit=500):
+                start = 1700000000000
+                return [[start + i * 3600000, 1.1, 1.101, 1.099, 1.1 + i * 1e-5, 100] for i in range(limit)]
+            
+            def fetch_positions(self):
+                return []
+            
+            def fetch_balance(self):
+                return {'total': {'USD': 10000}, 'free': {'USD': 10000}, 'used': {'USD': 0}}
+        
+        path = os.path.join(tempfile.mkdtemp(), 'broker.jsonl.gz')
+        recorder = RecordingExchange(SampleExchange(), path)
+        live = [recorder.fetch_ohlcv('EUR/USD', '1h', since=None, limit=250), recorder.fetch_positions()]
+        recorder.close_log()
+        
+        broker = replay_connector(path)
+        replayed = [broker.exchange.fetch_ohlcv('EUR/USD', '1h', since=None, limit=250), broker.exchange.fetch_positions()]
+        assert replayed == live, "replayed responses differ from recorded ones"
+        
+        bot = ForexTradingBot()
+        bot.state_file = os.path.join(tempfile.mkdtemp(), 'forex_bot_state.json')
+        bot.broker = broker
+        bot.strategy = MovingAverageCrossoverStrategy(short_ma=5, long_ma=20)
+        bot.config = {'pairs': ['EUR/USD'], 'timeframe': '1h'}
+        bot.should_run_ai_analysis = lambda: False
+        result = benchmark(bot, cycles=20)
+        print(f"✓ Replayed {recorder.count} recorded calls, {result['cycles_per_second']} trading cycles/s")
+        
+        # stop() closes a session's recorder so the gzip log is complete
+        session = os.path.join(tempfile.mkdtemp(), 'session.jsonl.gz')
+        bot.recorder = record(broker, session)
+        broker.exchange.fetch_positions()
+        exchange = broker.exchange
+        bot.stop()
+        exchange.fetch_positions()
+        assert bot.recorder is None and exchange.file.closed, "recorder left open on stop"
+        assert [e['method'] for e in load_log(session)] == ['fetch_positions'], "log truncated or written after close"
+        print("✓ stop() closed the broker log; later responses were not written")
+        
+    except Exception as e:
+        print(f"✗ Broker replay test failed: {e}")
+    
+    print()
+
+def test_simulated_broker():
+    """Test paper trading against the in-memory broker."""
+    print("Testing simulated broker...")
+    
+    try:
+        import os
+        import tempfile
+        from simulated_broker import SimulatedBroker, synthetic_ticks, run_simulation
+        from price_stream import Tick
+        from forex_bot import ForexTradingBot
+        from forex_strategy import MovingAverageCrossoverStrategy
+        
+        broker = SimulatedBroker(initial_balance=10000)
+        broker.on_tick(Tick('EUR/USD', 0, 1.1000, 1.1002))
+        broker.create_market_order('EUR/USD', 'buy', 10000)
+        broker.create_limit_order('EUR/USD', 'sell', 10000, 1.1010)
+        broker.on_tick(Tick('EUR/USD', 1000, 1.1010, 1.1012))
+        
+        assert not broker.get_positions(), "limit order should have closed the position"
+        assert abs(broker.get_balance()['total'] - 10008) < 1e-6, "wrong realized P&L"
+        print("✓ Market and limit orders filled, P&L booked")
+        
+        bot = ForexTradingBot()
+        bot.state_file = os.path.join(tempfile.mkdtemp(), 'forex_bot_state.json')
+        bot.strategy = MovingAverageCrossoverStrategy(short_ma=5, long_ma=20)
+        bot.config = {'pairs': ['EUR/USD'], 'timeframe': '1h'}
+        ticks = synthetic_ticks(['EUR/USD'], '2024-01-01', 2 * 86400, interval=10, seed=1)
+        result = run_simulation(bot, SimulatedBroker(), ticks)
+        print(f"✓ Simulated {result['ticks']} ticks and {result['bars']} bar closes in {result['seconds']}s")
+        
+    except Exception as e:
+        print(f"✗ Simulated broker test failed: {e}")
+    
+    print()
+
+def test_candle_ingestion():
+    """Test converting broker OHLCV payloads into DataFrames."""
+    print("Testing candle ingestion...")
+    
+    try:
+        import numpy as np
+        import pandas as pd
+        from broker_connector import candles_to_frame, dedupe_candles, merge_candles
+        
+        hour = 3600000
+        ohlcv = [[1700000000000 + i * hour, 1.1 + i * 1e-4, 1.2, 1.0, 1.15 + i * 1e-4, 100 + i] for i in range(1000)]
+        df = candles_to_frame(ohlcv)
+        
+        expected = pd.DataFrame([row[1:] for row in ohlcv], columns=['open', 'high', 'low', 'close', 'volume'],
+                                index=pd.to_datetime([row[0] for row in ohlcv], unit='ms'))
+        assert np.array_equal(df.to_numpy(), expected.to_numpy()), "prices differ from the payload"
+        assert (df.index == expected.index).all() and df.index.name == 'timestamp', "timestamps differ"
+        assert df._mgr.nblocks == 1, "prices should live in one contiguous block"
+        
+        compact = candles_to_frame(ohlcv, dtype=np.float32)
+        assert (compact.dtypes == np.float32).all() and np.allclose(compact['close'], df['close'])
+        
+        # Missing values take the slower NaN-aware path
+        gappy = candles_to_frame(ohlcv[:2] + [[ohlcv[2][0], None, None, None, None, None]])
+        assert gappy['close'].isna().tolist() == [False, False, True], "missing values not NaN"
+        assert candles_to_frame([]).empty
+        
+        # Overlapping pages out of order: sorted, and the last fetched copy of a bar wins
+        pages = pd.concat([df.iloc[500:], df.iloc[:501].assign(close=0.0)])
+        merged = dedupe_candles(pages)
+        assert merged.index.is_monotonic_increasing and len(merged) == 1000
+        assert merged['close'].iloc[500] == 0.0 and merged['close'].iloc[501] == df['close'].iloc[501], \
+            "duplicate should keep the last fetched copy"
+        assert dedupe_candles(df) is df, "ordered unique candles should not be copied"
+        assert merge_candles(df.iloc[:-5], df.iloc[-6:], limit=50).equals(df), "top-up not merged"
+        print(f"✓ {len(df)} candles ingested into one {df['close'].dtype} block; float32, NaN and merge paths work")
+        
+    except Exception as e:
+        print(f"✗ Candle ingestion test failed: {e}")
+    
+    print()
+
+def test_bar_buffer():
+    """Test the ring buffer keeps contiguous zero-copy windows."""
+    print("Testing bar buffer...")
+    
+    try:
+        import numpy as np
+        from bar_buffer import BarRingBuffer
+        
+        buffer = BarRingBuffer(capacity=100)
+        for i in range(250):
+            buffer.append(i * 60000, 1.0, 1.0, 1.0, float(i), 1)
+        buffer.update_last(1.0, 1.0, 1.0, 999.0, 2)
+        
+        closes = buffer['close']
+        assert len(closes) == 100 and closes[0] == 150 and closes[-1] == 999, "wrong window contents"
+        assert np.shares_memory(closes, buffer.values), "window should be a view"
+        print(f"✓ Kept {len(buffer)} of 250 bars with a contiguous view")
+        
+    except Exception as e:
+        print(f"✗ Bar buffer test failed: {e}")
+    
+    print()
+
+def test_signal_engine():
+    """Test the vectorized signal engine against the per-pair strategy."""
+    print("Testing signal engine...")
+    
+    try:
+        import numpy as np
+        from forex_strategy import MovingAverageCrossoverStrategy
+        from signal_engine import SignalEngine, exit_reason
+        
+        strategy = MovingAverageCrossoverStrategy(short_ma=10, long_ma=30)
+        engine = SignalEngine.from_strategy(strategy)
+        panel = 1.1 + np.cumsum(np.random.default_rng(11).normal(0, 0.002, (70, 400)), axis=1)
+        symbols = [f"PAIR{i}" for i in range(70)]
+        positions = {symbols[i]: {'side': 'short', 'entryPrice': panel[i, -20]} for i in range(0, 70, 4)}
+        
+        mismatches = 0
+        signals = 0
+        for t in range(31, 400):
+            table = engine.evaluate_panel(symbols, panel[:, :t + 1], balance=10000, positions=positions)
+            for i, symbol in enumerate(symbols):
+                signal = strategy.get_signal(panel[i, :t + 1])
+                signals += abs(signal)
+                mismatches += signal != table['signal'][i]
+                if symbol in positions:
+                    _, reason = strategy.check_exit(panel[i, t], signal, positions[symbol]['entryPrice'], 'short')
+                    mismatches += reason != exit_reason(table[i])
+        
+        assert mismatches == 0, f"{mismatches} rows differ from the strategy"
+        print(f"✓ {signals} signals and all exits match across 70 pairs")
+        
+    except Exception as e:
+        print(f"✗ Signal engine test failed: {e}")
+    
+    print()
+
+def test_indicators():
+    """Test the indicator functions and the shared indicator cache."""
+    print("Testing indicators...")
+    
+    try:
+        import numpy as np
+        import indicators as ind
+        
+        rng = np.random.default_rng(5)
+        close = 1.1 + np.cumsum(rng.normal(0, 0.002, 500))
+        high = close + rng.uniform(0, 0.003, 500)
+        low = close - rng.uniform(0, 0.003, 500)
+        
+        ema = ind.ema(close, 20)
+        assert np.isnan(ema[18]) and abs(ema[19] - close[:20].mean()) < 1e-12, "EMA not seeded with the SMA"
+        adx = ind.adx(high, low, close, 14)
+        assert np.isnan(adx[25]) and 0 < adx[-1] < 100, "ADX warm-up or range wrong"
+        print(f"✓ SMA-seeded EMA and Wilder ADX: {adx[-1]:.2f}")
+        
+        cache = ind.IndicatorCache()
+        bars = {'high': high, 'low': low, 'close': close}
+        sid = ind.series_id('EUR/USD', '1h', np.arange(500), high, low, close)
+        first = cache.get(sid, 'ema', bars, period=20)
+        second = cache.get(sid, 'ema', bars, period=20)
+        assert first is second and cache.stats()['hits'] == 1, "EMA computed twice"
+        print(f"✓ EMA(20) computed once for two strategies: {cache.stats()}")
+        
+        # The forming bar's close moves without a new timestamp
+        forming = np.array([1.0] * 8 + [2.0])
+        moved = forming.copy()
+        moved[-1] = 11.0
+        for closes in (forming, moved):
+            sid = ind.series_id('EUR/USD', '1h', np.arange(9), closes)
+            value = cache.get(sid, 'sma', {'close': closes}, period=9)[-1]
+        assert abs(value - 19.0 / 9) < 1e-12, f"stale SMA for a moved close: {value}"
+        print(f"✓ Moved forming bar gets a fresh SMA: {value:.4f}")
+        
+        
+    except Exception as e:
+        print(f"✗ Indicators test failed: {e}")
+    
+    print()
+
+def test_indicator_graph():
+    """Test the indicator graph shares indicators across strategies."""
+    print("Testing indicator graph...")
+    
+    try:
+        import numpy as np
+        import indicators as ind
+        from indicator_graph import IndicatorGraph, ema_adx_requirements
+        from forex_strategy import MovingAverageCrossoverStrategy
+        
+        rng = np.random.default_rng(5)
+        close = 1.1 + np.cumsum(rng.normal(0, 0.002, 300))
+        high = close + rng.uniform(0, 0.003, 300)
+        low = close - rng.uniform(0, 0.003, 300)
+        
+        graph = IndicatorGraph()
+        graph.require('trend', ema_adx_requirements())
+        graph.require('asymmetric', ema_adx_requirements())
+        graph.require('ma', MovingAverageCrossoverStrategy(20, 50).indicator_requirements())
+        assert graph.plan().count(('atr', 14)) == 1, "ATR(14) planned twice"
+        
+        bars = {'high': high, 'low': low, 'close': close}
+        cache = ind.IndicatorCache()
+        sid = ind.series_id('EUR/USD', '1h', np.arange(300), high, low, close)
+        results = graph.evaluate(bars, cache=cache, series=sid)
+        assert results['trend']['adx'] is results['asymmetric']['adx'], "ADX computed per strategy"
+        assert np.allclose(results['asymmetric']['adx'], ind.adx(high, low, close, 14), equal_nan=True), "ADX differs"
+        graph.evaluate(bars, cache=cache, series=sid)
+        assert cache.stats()['hits'] == len(graph.plan()), "same bars evaluated twice"
+        print(f"✓ 3 strategies share {len(graph.plan())} indicators; ADX {results['trend']['adx'][-1]:.2f}")
+        
+        # The bot's bar-close path takes the MA signal from the graph
+        import pandas as pd
+        from forex_bot import ForexTradingBot
+        bot = ForexTradingBot()
+        bot.strategy = MovingAverageCrossoverStrategy(short_ma=5, long_ma=20)
+        bot.config = {'timeframe': '1h'}
+        df = pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close, 'volume': 0.0},
+                          index=pd.date_range('2024-01-01', periods=300, freq='h'))
+        for t in range(21, 300):
+            window = df.iloc[:t]
+            signal = bot.strategy.signal_from_indicators(bot.evaluate_indicators('EUR/USD', window)['ma'])
+            assert signal == bot.strategy.get_signal(close[:t]), f"graph signal differs at bar {t}"
+        hits = ind.shared_cache.stats()['hits']
+        bot.evaluate_indicators('EUR/USD', df.iloc[:299])
+        assert ind.shared_cache.stats()['hits'] > hits, "same candles not served from the shared cache"
+        assert list(bot.indicator_values['EUR/USD']) == ['ma'], "indicators of inactive strategies computed"
+        assert all(key[0] == 'sma' for key in bot.indicator_graph.plan()), "bar close plans unused indicators"
+        print(f"✓ Bar-close signals match the strategy; only its {len(bot.indicator_graph.plan())} SMAs computed")
+        
+    except Exception as e:
+        print(f"✗ Indicator graph test failed: {e}")
+    
+    print()
+
+def test_bar_change_skip():
+    """Test entries are evaluated once per closed bar and exits every cycle."""
+    print("Testing bar change detection...")
+    
+    try:
+        from forex_bot import ForexTradingBot
+        from forex_strategy import MovingAverageCrossoverStrategy
+        from bar_buffer import BarRingBuffer
+        
+        bot = ForexTradingBot()
+        bot.strategy = MovingAverageCrossoverStrategy(short_ma=3, long_ma=5)
+        bot.config = {'timeframe': '1h'}
+        
+        # The last bar is still forming; the crossover is on the bar before it
+        bars = BarRingBuffer(50)
+        for i, close in enumerate([1.0] * 6 + [0.9, 0.9, 1.3, 1.4]):
+            bars.append(i * 3600000, close, close, close, close, 0)
+        
+        signals = [int(bot.scan_pairs(['EUR/USD'], {'EUR/USD': bars}, {})['signal'][0]) for _ in range(3)]
+        assert signals == [1, 0, 0], f"signal repeated on the same bar: {signals}"
+        
+        positions = {'EUR/USD': {'side': 'long', 'entryPrice': 1.5}}
+        table = bot.scan_pairs(['EUR/USD'], {'EUR/USD': bars}, positions)
+        assert table['exit'][0] == 1, "stop-loss not checked without a new bar"
+        
+        # A move in the forming bar is not evaluated until that bar closes
+        key = bot.stream_key('EUR/USD')
+        marker = bot.strategy.stream_timestamp(key)
+        bars.update_last(1.4, 1.4, 0.5, 0.5, 0)
+        table = bot.scan_pairs(['EUR/USD'], {'EUR/USD': bars}, {})
+        assert table['signal'][0] == 0 and bot.strategy.stream_timestamp(key) == marker, \
+            "forming bar evaluated as closed"
+        bars.append(10 * 3600000, 0.5, 0.5, 0.5, 0.5, 0)
+        signals = [int(bot.scan_pairs(['EUR/USD'], {'EUR/USD': bars}, {})['signal'][0]) for _ in range(2)]
+        assert signals == [-1, 0], f"new closed bar not evaluated once: {signals}"
+        assert bot.strategy.stream_timestamp(key) == 9 * 3600000, "stream did not advance to the closed bar"
+        print("✓ Crossover fired once over 3 cycles; stop-loss still checked every cycle")
+        print("✓ Forming bar skipped; the next closed bar fired the cross-down once")
+        
+        # The bar-close path and the polling scan both act on the same bar
+        class SnapshotBroker:
+            def __init__(self):
+                self.live = {}
+                self.orders = []
+            
+            def get_positions(self, refresh=False):
+                # The cached snapshot still predates the first order
+                return dict(self.live) if refresh else {}
+            
+            def get_balance(self, refresh=False):
+                return {'free': 10000}
+            
+            def create_market_order(self, pair, side, amount):
+                self.orders.append((pair, side, amount))
+                self.live[pair] = {'symbol': pair, 'side': 'long', 'contracts': amount}
+                return {'id': str(len(self.orders))}
+        
+        bot.broker = SnapshotBroker()
+        bot.open_position('EUR/USD', 'buy', 1.1, None, bar_time=9 * 3600000)
+        bot.open_position('EUR/USD', 'buy', 1.1, None, bar_time=9 * 3600000)
+        bot.broker.live.clear()
+        bot.open_position('EUR/USD', 'buy', 1.1, None, bar_time=9 * 3600000)
+        assert len(bot.broker.orders) == 1, f"same bar opened {len(bot.broker.orders)} positions"
+        bot.broker.live['EUR/USD'] = {'side': 'long', 'contracts': 1000}
+        bot.open_position('EUR/USD', 'buy', 1.1, None, bar_time=10 * 3600000)
+        assert len(bot.broker.orders) == 1, "opened on top of a live position"
+        print("✓ One order per bar and none on top of a live position")
+        
+    except Exception as e:
+        print(f"✗ Bar change test failed: {e}")
+    
+    print()
+
+def test_scheduler():
+    """Test bar-close scheduling with a simulated clock."""
+    print("Testing scheduler...")
+    
+    try:
+        from scheduler import BarCloseScheduler
+        
+        now = [1700000000.0]
+        scheduler = BarCloseScheduler(lag=2.0, jitter=0.0, clock=lambda: now[0])
+        scheduler.add('EUR/USD', '1h')
+        scheduler.add('GBP/USD', '1h')
+        scheduler.add('EUR/USD', '5m')
+        
+        assert len(scheduler.due()) == 3, "first call should trigger every job"
+        assert scheduler.due() == [], "nothing closed yet"
+        
+        now[0] = scheduler.next_wakeup()
+        assert now[0] == scheduler.next_close('5m', now[0] - 3) + 2.0, "wakeup not lag after the close"
+        assert scheduler.due() == [('EUR/USD', '5m')], "only the 5m job closed"
+        
+        retries = [scheduler.retry('EUR/USD', '5m', delay=1.0) for _ in range(6)]
+        assert retries == [True] * 5 + [False], "retries not capped"
+        print(f"✓ Woke {now[0] % 300:.0f}s after the 5m close with only the closed job due")
+        
+        import asyncio
+        import threading
+        import time
+        
+        async def cancelled_wait():
+            sleeper = BarCloseScheduler(lag=0.0, jitter=0.0, clock=lambda: now[0])
+            sleeper.add('EUR/USD', '1d')
+            sleeper.due()
+            task = asyncio.create_task(sleeper.wait_async())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            timer = threading.Timer(0.05, sleeper.cancel)
+            timer.start()
+            started = time.monotonic()
+            jobs = await sleeper.wait_async()
+            return jobs, time.monotonic() - started
+        
+        threads = threading.active_count()
+        jobs, waited = asyncio.run(cancelled_wait())
+        assert jobs == [] and waited < 1.0, "cancel() did not wake wait_async"
+        assert threading.active_count() <= threads, "wait_async left a thread sleeping"
+        print(f"✓ cancel() woke wait_async after {waited:.2f}s with no worker thread")
+        
+    except Exception as e:
+        print(f"✗ Scheduler test failed: {e}")
+    
+    print()
+
+def test_vectorized_backtest():
+    """Test the vectorized backtest against the Backtrader engine."""
+    print("Testing vectorized backtest...")
+    
+    try:
+        import io
+        import contextlib
+        import pandas as pd
+        import numpy as np
+        from backtester import ForexBacktester
+        
+        # Four years of daily bars, so the yearly Sharpe ratio is defined
+        rng = np.random.default_rng(7)
+        close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.002, 1500)))
+        opens = np.r_[1.1, close[:-1]] * np.exp(rng.normal(0, 0.0005, 1500))
+        df = pd.DataFrame({
+            'open': opens,
+            'high': np.maximum(opens, close) * 1.001,
+            'low': np.minimum(opens, close) * 0.999,
+            'close': close,
+            'volume': 1000.0
+        }, index=pd.date_range(start='2020-01-01', periods=1500, freq='1D'))
+        params = dict(short_ma=10, long_ma=30, risk_per_trade=0.005, stop_loss_pct=0.01, take_profit_pct=0.02)
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = ForexBacktester().run_backtest(df, **params)
+        results = ForexBacktester().run_backtest(df, engine='vectorized', **params)
+        
+        assert set(results) == set(expected), "results keys differ"
+        assert expected['total_trades'] > 5, "too few trades to compare"
+        for key in ['total_trades', 'won_trades', 'lost_trades']:
+            assert results[key] == expected[key], f"{key}: {results[key]} != {expected[key]}"
+        for key in ['final_value', 'max_drawdown', 'sharpe_ratio', 'win_rate']:
+            assert abs(results[key] - expected[key]) <= 1e-9 * max(1.0, abs(expected[key])), \
+                f"{key}: {results[key]} != {expected[key]}"
+        print(f"✓ Matches Backtrader over {results['total_trades']} trades "
+              f"(final ${results['final_value']:.2f}, Sharpe {results['sharpe_ratio']:.3f})")
+        
+    except Exception as e:
+        print(f"✗ Vectorized backtest test failed: {e}")
+    
+    print()
+
+def test_parameter_sweep():
+    """Test a parallel parameter sweep."""
+    print("Testing parameter sweep...")
+    
+    try:
+        import io
+        import contextlib
+        import pandas as pd
+        import numpy as np
+        from backtester import ForexBacktester, expand_grid
+        
+        rng = np.random.default_rng(3)
+        close = 1.1 * np.exp(np.cumsum(rng.normal(0, 0.002, 2000)))
+        df = pd.DataFrame({
+            'open': np.r_[1.1, close[:-1]],
+            'high': close * 1.001,
+            'low': close * 0.999,
+            'close': close,
+            'volume': 1000.0
+        }, index=pd.date_range(start='2020-01-01', periods=2000, freq='1D'))
+        grid = {'short_ma': [5, 10, 20], 'long_ma': [10, 30, 60], 'risk_per_trade': [0.005]}
+        
+        assert len(expand_grid(grid)) == 7, "short_ma >= long_ma combinations not dropped"
+        
+        finished = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            table = ForexBacktester().sweep(grid, df, workers=2, callback=lambda p, r: finished.append(p))
+        
+        assert len(table) == 7 and len(finished) == 7, "missing sweep results"
+        assert table['sharpe_ratio'].is_monotonic_decreasing, "sweep not ranked"
+        best = table.iloc[0]
+        expected = ForexBacktester().run_backtest(
+            df, engine='vectorized', short_ma=int(best['short_ma']), long_ma=int(best['long_ma']),
+            risk_per_trade=0.005
+        )
+        assert best['final_value'] == expected['final_value'], "sweep result differs from run_backtest"
+        print(f"✓ Swept {len(table)} combinations on 2 workers, best "
+              f"{int(best['short_ma'])}/{int(best['long_ma'])} (Sharpe {best['sharpe_ratio']:.3f})")
+        
+    except Exception as e:
+        print(f"✗ Parameter sweep test failed: {e}")
+    
+    print()
+
+def test_shared_prices():
+    """Test zero-copy price data in shared memory."""
+    print("Testing shared prices...")
+    
+    try:
+        import pandas as pd
+        import numpy as np
+        from shared_prices import SharedPriceData, attach
+        
+        dates = pd.date_range(start='2023-01-01', periods=1000, freq='1h')
+        prices = 1.1 + np.cumsum(np.random.default_rng(1).normal(0, 0.0002, 1000))
+        df = pd.DataFrame({
+            'open': prices,
+            'high': prices + 0.0005,
+            'low': prices - 0.0005,
+            'close': prices,
+            'volume': 1000.0
+        }, index=dates)
+        
+        with SharedPriceData(df) as shared:
+            memory, view = attach(shared.handle)
+            block = np.ndarray((shared.nbytes // 8,), dtype=np.float64, buffer=memory.buf)
+            
+            assert np.shares_memory(view['close'].to_numpy(), block), "close column was copied"
+            assert view.index.equals(df.index), "index differs"
+            assert (view.to_numpy() == df[list(view.columns)].to_numpy()).all(), "prices differ"
+            assert not view['close'].to_numpy().flags.writeable, "shared prices should be read-only"
+            print(f"✓ {len(view)} bars attached zero-copy from a {shared.nbytes} byte block")
+            
+            del view, block
+            memory.close()
+        
+    except Exception as e:
+        print(f"✗ Shared prices test failed: {e}")
+    
+    print()
+
+def test_ma_grid():
+    """Test the prefix-sum MA grid search."""
+    print("Testing MA grid...")
+    
+    try:
+        import numpy as np
+        from ma_grid import MAGrid
+        from indicators import sma, crossover
+        
+        close = 1.1 * np.exp(np.cumsum(np.random.default_rng(5).normal(0, 0.002, 3000)))
+        grid = MAGrid(close, commission=0.0)
+        result = grid.evaluate(range(1, 41), range(1, 81))
+        heatmap = result.heatmap('return_pct')
+        
+        assert heatmap.shape == (40, 80), "heatmap shape"
+        assert np.isnan(heatmap.loc[20, 10]) and not np.isnan(heatmap.loc[10, 20]), "short >= long not masked"
+        assert np.array_equal(grid.sma(37), sma(close, 37), equal_nan=True), "prefix-sum SMA differs"
+        assert grid.cache.stats()['misses'] == 80, "SMA windows not computed once"
+        
+        # Crossover rule with fills at the crossing closes, computed the slow way
+        cross = crossover(sma(close, 10), sma(close, 30))
+        growth, entry, trades = 1.0, None, 0
+        for i in np.flatnonzero(cross):
+            if cross[i] > 0:
+                entry, trades = close[i], trades + 1
+            elif entry is not None:
+                growth, entry = growth * close[i] / entry, None
+        if entry is not None:
+            growth *= close[-1] / entry
+        
+        assert result.surfaces['total_trades'][9, 29] == trades, "trade count differs"
+        assert abs(result.surfaces['return_pct'][9, 29] - (growth - 1) * 100) < 1e-9, "return differs"
+        best = result.best('return_pct', n=1).iloc[0]
+        print(f"✓ {len(result.to_frame())} combinations, best "
+              f"{int(best['short_ma'])}/{int(best['long_ma'])}: {best['return_pct']:.2f}%")
+        
+    except Exception as e:
+        print(f"✗ MA grid test failed: {e}")
+    
+    print()
+
+def test_result_cache():
+    """Test the content-addressed backtest result cache."""
+    print("Testing result cache...")
+    
+    try:
+        import io
+        import contextlib
+        import tempfile
+        import pandas as pd
+        import numpy as np
+        from backtester import ForexBacktester
+        from result_cache import ResultCache
+        
+        close = 1.1 * np.exp(np.cumsum(np.random.default_rng(9).normal(0, 0.002, 1000)))
+        df = pd.DataFrame({
+            'open': close,
+            'high': close * 1.001,
+            'low': close * 0.999,
+            'close': close,
+            'volume': 1000.0
+        }, index=pd.date_range(start='2020-01-01', periods=1000, freq='1D'))
+        params = dict(short_ma=10, long_ma=30, risk_per_trade=0.005, engine='vectorized')
+        
+        with tempfile.TemporaryDirectory() as root, contextlib.redirect_stdout(io.StringIO()):
+            cache = ResultCache(root)
+            first = ForexBacktester(cache=cache).run_backtest(df, **params)
+            second = ForexBacktester(cache=cache).run_backtest(df.copy(), **params)
+            assert cache.stats() == {'hits': 1, 'misses': 1}, "equal data and parameters should hit"
+            assert second == first, "cached results differ"
+            
+            ForexBacktester(cache=cache).run_backtest(df, initial_cash=5000, **params)
+            changed = df.copy()
+            changed.iloc[-1, changed.columns.get_loc('close')] *= 1.001
+            ForexBacktester(cache=cache).run_backtest(changed, **params)
+            assert cache.stats()['misses'] == 3, "changed inputs should miss"
+            
+            # Room for the three entries; a fourth evicts the least recently used
+            small = ResultCache(root, max_bytes=cache.size())
+            ForexBacktester(cache=small).run_backtest(df, **params)
+            small.put('0' * 40, first)
+            assert small.size() <= small.max_bytes, "cache not evicted"
+            assert ForexBacktester(cache=small).run_backtest(df, **params) == first, \
+                "recently used entry evicted"
+            assert small.stats()['hits'] == 2, "recently used entry should still hit"
+            
+            # A cached result has no Backtrader run behind it; plotting replays one
+            import backtrader as bt
+            plotted = []
+            original_plot = bt.Cerebro.plot
+            bt.Cerebro.plot = lambda cerebro, **kwargs: plotted.append(cerebro)
+            try:
+                backtester = ForexBacktester(cache=cache)
+                backtester.run_backtest(df, **params)
+                assert backtester.cerebro is None, "expected a cache hit"
+                backtester.plot_results()
+            finally:
+                bt.Cerebro.plot = original_plot
+            assert plotted and backtester.results == first, "cached run not replayed for the plot"
+        
+        print("✓ Second run served from cache, changed data/cash missed, LRU eviction kept the size bounded, plot replayed")
+        
+    except Exception as e:
+        print(f"✗ Result cache test failed: {e}")
+    
+    print()
+
+def test_backfill_resume():
+    """Test that a later backfill does not leave a gap after the stored history."""
+    print("Testing backfill resume...")
+    
+    try:
+        import tempfile
+        import numpy as np
+        import pandas as pd
+        from broker_connector import OANDAConnector
+        from candle_store import CandleStore
+        
+        hour = 3600000
+        
+        class HourlyExchange:
+            def fetch_ohlcv(self, symbol, timeframe, since=None, limit=500):
+                first = since - since % hour
+                return [[first + i * hour, 1.1, 1.101, 1.099, 1.1, 100] for i in range(limit)]
+        
+        store = CandleStore(tempfile.mkdtemp())
+        broker = OANDAConnector('key', 'account', store=store, exchange=HourlyExchange())
+        broker.backfill('EUR/USD', '1h', '2024-01-01', '2024-01-03', page_size=24)
+        broker.backfill('EUR/USD', '1h', '2024-01-10', '2024-01-12', page_size=24)
+        broker.backfill('EUR/USD', '1h', '2023-12-20', '2023-12-21', page_size=24)
+        
+        stored = store.read('EUR/USD', '1h')
+        steps = np.diff(stored.index.as_unit('ms').asi8)
+        assert stored.index[0] == pd.Timestamp('2023-12-20'), "older range not stored"
+        assert stored.index[-1] == pd.Timestamp('2024-01-11 23:00'), "newer range not stored"
+        assert (steps == hour).all(), "stored history has a gap"
+        print(f"✓ Resumed across gaps, {len(stored)} contiguous bars stored")
+        
+    except Exception as e:
+        print(f"✗ Backfill resume test failed: {e}")
+    
+    print()
+
+def test_async_connector():
+    """Test the asyncio connector against a mocked async exchange."""
+    print("Testing async connector...")
+    
+    try:
+        import asyncio
+        import tempfile
+        import threading
+        import time
+        import pandas as pd
+        from broker_connector import AsyncOANDAConnector, OANDAConnector
+        from candle_store import CandleStore
+        from rate_limiter import AsyncRequestLimiter
+        
+        hour = 3600000
+        
+        class AsyncExchange:
+            def __init__(self):
+                self.calls = []
+                self.positions = [{'symbol': 'EUR/USD', 'side': 'long', 'contracts': 1000}]
+                self.closed = False
+            
+            async def fetch_ohlcv(self, symbol, timeframe, since=None, limit=500):
+                self.calls.append(('fetch_ohlcv', since))
+                await asyncio.sleep(0)
+                now = int(time.time() * 1000)
+                newest = now - now % hour
+                first = since - since % hour if since is not None else newest - (limit - 1) * hour
+                return [[t, 1.1, 1.101, 1.099, 1.1, 100] for t in range(first, newest + 1, hour)][:limit]
+            
+            async def fetch_balance(self):
+                self.calls.append(('fetch_balance', None))
+                return {'total': {'USD': 10000}, 'free': {'USD': 9000}, 'used': {'USD': 1000}}
+            
+            async def fetch_positions(self):
+                self.calls.append(('fetch_positions', None))
+                return self.positions
+            
+            async def create_market_order(self, symbol, side, amount):
+                self.positions = []
+                return {'id': '1', 'symbol': symbol, 'side': side, 'amount': amount}
+            
+            async def close(self):
+                self.closed = True
+        
+        store = CandleStore(tempfile.mkdtemp())
+        writers = []
+        append = store.append
+        store.append = lambda *args: writers.append(threading.current_thread()) or append(*args)
+        exchange = AsyncExchange()
+        
+        async def session():
+            limiter = AsyncRequestLimiter(rate=None)
+            async with AsyncOANDAConnector('key', 'account', store=store, exchange=exchange, limiter=limiter) as broker:
+                first = await broker.get_ohlcv('EUR/USD', '1h', limit=50)
+                topped_up = await broker.get_ohlcv('EUR/USD', '1h', limit=50)
+                balances = [await broker.get_balance(), await broker.get_balance()]
+                order = await broker.close_position('EUR/USD')
+                positions = await broker.get_positions()
+                backfilled = await broker.backfill('EUR/USD', '1h', first.index[0] - pd.Timedelta(hours=48))
+                return first, topped_up, balances, order, positions, backfilled
+        
+        first, topped_up, balances, order, positions, backfilled = asyncio.run(session())
+        
+        assert not issubclass(AsyncOANDAConnector, OANDAConnector), "async connector should not subclass the blocking one"
+        assert len(first) == 50 and topped_up.equals(first), "cached candles differ"
+        assert exchange.calls[1] == ('fetch_ohlcv', int(first.index[-1].value // 1000000)), \
+            "second call should only fetch from the last cached bar"
+        assert balances[0]['free'] == 9000 and exchange.calls.count(('fetch_balance', None)) == 1, \
+            "balance not served from the snapshot"
+        assert order['side'] == 'sell' and positions == {}, "position not closed or snapshot not invalidated"
+        assert len(backfilled) == 48 + 49, "older range not backfilled"
+        assert writers and threading.main_thread() not in writers, "candle store written on the event loop"
+        assert exchange.closed, "exchange not closed"
+        print(f"✓ Cached top-up, snapshot, order and backfill work; {len(writers)} store writes ran off the event loop")
+        
+    except Exception as e:
+        print(f"✗ Async connector test failed: {e}")
+    
+    print()
+
+def test_bar_flush():
+    """Test that the bot closes streamed bars at the boundary without a new tick."""
+    print("Testing bar flush timer...")
+    
+    try:
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from forex_bot import ForexTradingBot
+        from bar_aggregator import BarAggregator
+        from price_stream import Tick
+        from scheduler import BarCloseScheduler
+        
+        closed = []
+        bot = ForexTradingBot()
+        bot.config = {'pairs': ['EUR/USD'], 'timeframe': '1m'}
+        bot.bar_aggregator = BarAggregator(['1m'], on_bar_close=lambda s, tf, bar: closed.append((s, tf, bar)))
+        
+        # Ticks in the first seconds of a minute, then silence
+        base = 1700000040
+        for i in range(5):
+            bot.bar_aggregator.on_tick(Tick('EUR/USD', (base + i) * 1000, 1.1, 1.1002))
+        
+        # Clock just before the next boundary, running in real time
+        t0 = time.time()
+        scheduler = BarCloseScheduler(lag=0.1, jitter=0, clock=lambda: base + 59.8 + time.time() - t0)
+        scheduler.add('EUR/USD', '1m')
+        scheduler.due()  # The first call fires every job; consume it before the boundary
+        bot.start_bar_flusher(scheduler)
+        
+        deadline = time.time() + 3
+        while not closed and time.time() < deadline:
+            time.sleep(0.01)
+        bot.bar_flusher.cancel()
+        
+        assert len(closed) == 1, "bar not closed at the boundary"
+        symbol, timeframe, bar = closed[0]
+        assert (symbol, timeframe, bar[0], bar[5]) == ('EUR/USD', '1m', base * 1000, 5), "wrong bar closed"
+        assert bot.bar_aggregator.current_bar('EUR/USD', '1m') is None, "closed bar still forming"
+        
+        # Closed bars are evaluated on the bar-close worker, not the stream thread
+        threads = []
+        bot.on_bar_close = lambda symbol, timeframe, bar: threads.append(threading.current_thread().name)
+        bot.bar_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='bar-close')
+        bot.queue_bar_close('EUR/USD', '1m', bar)
+        bot.bar_pool.shutdown(wait=True)
+        assert threads and threads[0].startswith('bar-close'), f"bar evaluated on {threads}"
+        print(f"✓ Bar closed {time.time() - t0:.2f}s later by the flush timer, without a new tick")
+        
+    except Exception as e:
+        print(f"✗ Bar flush test failed: {e}")
+    
+    print()
+
 def main():
     """Run all tests."""
     print("=" * 60)
@@ -169,8 +1577,34 @@ def main():
     
     test_imports()
     test_strategy()
+    test_streaming_signals()
     test_backtester()
     test_telegram()
+    test_candle_cache()
+    test_candle_store()
+    test_concurrent_fetch()
+    test_account_snapshot()
+    test_price_stream()
+    test_bar_aggregator()
+    test_resampler()
+    test_rate_limiter()
+    test_broker_replay()
+    test_simulated_broker()
+    test_candle_ingestion()
+    test_bar_buffer()
+    test_signal_engine()
+    test_indicators()
+    test_indicator_graph()
+    test_bar_change_skip()
+    test_scheduler()
+    test_vectorized_backtest()
+    test_parameter_sweep()
+    test_shared_prices()
+    test_ma_grid()
+    test_result_cache()
+    test_backfill_resume()
+    test_async_connector()
+    test_bar_flush()
     
     print("=" * 60)
     print("Testing complete!")
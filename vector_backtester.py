@@ -0,0 +1,220 @@
+"""
+Vector Backtester Module
+Vectorized backtest of the moving average crossover strategy with NumPy.
+
+Runs the same rules as backtester.ForexStrategy (and
+MovingAverageCrossoverStrategy) without Backtrader's per-bar event loop:
+SMAs, crossovers and the equity curve are whole-array operations, and the
+only Python loop runs once per trade, finding each exit with an array
+search over the bars after the entry. The fills, commission, margin
+checks and analyzers follow Backtrader's defaults, so the results dict
+has the same keys and values as ForexBacktester.run_backtest:
+
+- market orders fill at the next bar's open
+- entries are sized from the cash at signal time and rejected (margin)
+  if the cash does not cover them at the signal close or the fill open
+- stop-loss/take-profit are measured from the fill price and checked
+  on closes, starting with the fill bar
+- sharpe_ratio uses calendar-year returns (None with fewer than two
+  years), max_drawdown the per-bar portfolio value
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from indicators import sma, crossover
+
+
+# First window of bars scanned for an exit; doubles until an exit is found
+EXIT_SCAN_WINDOW = 64
+
+
+class VectorizedBacktester:
+    """
+    NumPy backtester for the moving average crossover strategy.
+    """
+
+    def __init__(self, commission=0.0001, riskfreerate=0.01):
+        """
+        Initialize backtester.
+
+        Args:
+            commission: Commission per side as a fraction of the traded value
+            riskfreerate: Annual risk-free rate for the Sharpe ratio
+        """
+        self.commission = commission
+        self.riskfreerate = riskfreerate
+        self.results = {}
+        self.trades = []
+        self.equity = None
+
+    def run_backtest(self, data_df, initial_cash=10000, short_ma=50, long_ma=200,
+                     risk_per_trade=0.01, stop_loss_pct=0.01, take_profit_pct=0.02):
+        """
+        Run backtest with given parameters.
+
+        Args:
+            data_df: DataFrame with OHLC data (timestamp as index)
+            initial_cash: Initial capital
+            short_ma: Short MA period
+            long_ma: Long MA period
+            risk_per_trade: Risk per trade (fraction)
+            stop_loss_pct: Stop-loss percentage
+            take_profit_pct: Take-profit percentage
+
+        Returns:
+            dict with backtest results (same keys as ForexBacktester)
+        """
+        for col in ['open', 'close']:
+            if col not in data_df.columns:
+                raise ValueError(f"Missing required column: {col}")
+
+        opens = data_df['open'].to_numpy(dtype=np.float64)
+        close = data_df['close'].to_numpy(dtype=np.float64)
+        cross = crossover(sma(close, short_ma), sma(close, long_ma))
+        bars = len(close)
+
+        # Backtrader starts calling next() once the crossover has a value
+        up = np.flatnonzero(cross > 0)
+        up = up[up >= long_ma]
+        down = np.flatnonzero(cross < 0)
+
+        cash = float(initial_cash)
+        cash_curve = np.full(bars, cash)
+        size_curve = np.zeros(bars)
+        self.trades = []
+        open_trades = 0
+
+        index = 0
+        while True:
+            # Next entry signal from `index`
+            k = int(np.searchsorted(up, index))
+            if k == len(up) or up[k] + 1 >= bars:
+                break
+            signal = int(up[k])
+            fill = signal + 1
+            index = fill
+
+            entry_close = close[signal]
+            risk_per_unit = entry_close - entry_close * (1 - stop_loss_pct)
+            if risk_per_unit <= 0:
+                continue
+            size = math.floor(cash * risk_per_trade / risk_per_unit)
+            if size <= 0:
+                continue
+
+            # Margin checks: at the signal close (submission), then at the fill
+            if cash - size * entry_close - size * self.commission * entry_close < 0.0:
+                continue
+            entry = opens[fill]
+            entry_comm = size * self.commission * entry
+            after_entry = cash - size * entry - entry_comm
+            if after_entry < 0.0:
+                continue
+
+            stop = entry * (1 - stop_loss_pct)
+            target = entry * (1 + take_profit_pct)
+            exit_signal = self._find_exit(close, down, fill, stop, target)
+            if exit_signal is None or exit_signal + 1 >= bars:
+                # Still open at the end of the data
+                cash_curve[fill:] = after_entry
+                size_curve[fill:] = size
+                cash = after_entry
+                open_trades = 1
+                break
+
+            exit_bar = exit_signal + 1
+            price = opens[exit_bar]
+            pnl = size * (price - entry) * 1.0
+            exit_comm = size * self.commission * price
+            cash = after_entry + (size * entry + pnl) - exit_comm
+
+            cash_curve[fill:exit_bar] = after_entry
+            size_curve[fill:exit_bar] = size
+            cash_curve[exit_bar:] = cash
+            self.trades.append({
+                'date': data_df.index[exit_bar],
+                'pnl': pnl,
+                'pnl_net': pnl - (entry_comm + exit_comm),
+            })
+            index = exit_bar
+
+        self.equity = cash_curve + size_curve * close
+        final_value = float(self.equity[-1]) if bars else float(initial_cash)
+
+        won = sum(1 for trade in self.trades if trade['pnl_net'] >= 0.0)
+        total = len(self.trades) + open_trades
+        self.results = {
+            'initial_value': initial_cash,
+            'final_value': final_value,
+            'profit': final_value - initial_cash,
+            'return_pct': ((final_value - initial_cash) / initial_cash) * 100,
+            'sharpe_ratio': self._sharpe_ratio(data_df.index, initial_cash),
+            'max_drawdown': self._max_drawdown(),
+            'total_trades': total,
+            'won_trades': won,
+            'lost_trades': len(self.trades) - won,
+            'win_rate': (won / total) * 100 if total > 0 else 0,
+        }
+        return self.results
+
+    @staticmethod
+    def _find_exit(close, down, start, stop, target):
+        """
+        Find the first bar from `start` whose close hits the stop or target,
+        or where the short MA crosses below the long MA.
+
+        Returns:
+            Bar index, or None if the position is never exited
+        """
+        k = int(np.searchsorted(down, start))
+        reverse = int(down[k]) if k < len(down) else len(close)
+
+        # Scan growing windows so short trades touch few bars
+        window = EXIT_SCAN_WINDOW
+        lo = start
+        while lo < reverse:
+            hi = min(lo + window, reverse)
+            segment = close[lo:hi]
+            hits = np.flatnonzero((segment <= stop) | (segment >= target))
+            if len(hits):
+                return lo + int(hits[0])
+            lo = hi
+            window *= 2
+        return reverse if reverse < len(close) else None
+
+    def _max_drawdown(self):
+        """Largest peak-to-trough drop of the portfolio value in percent."""
+        if self.equity is None or not len(self.equity):
+            return 0
+        peak = np.maximum.accumulate(self.equity)
+        return float(np.max(100.0 * (peak - self.equity) / peak))
+
+    def _sharpe_ratio(self, index, initial_cash):
+        """
+        Sharpe ratio of calendar-year returns, as Backtrader's SharpeRatio
+        analyzer computes it by default (not annualized, population std).
+
+        Returns:
+            float, or None if it is undefined (e.g., a single year)
+        """
+        if self.equity is None or not len(self.equity):
+            return None
+        years = pd.DatetimeIndex(index).year.to_numpy()
+        year_ends = np.flatnonzero(np.append(years[1:] != years[:-1], True))
+
+        returns = []
+        previous = float(initial_cash)
+        for value in self.equity[year_ends].tolist():
+            returns.append(value / previous - 1.0)
+            previous = value
+
+        rate = pow(1.0 + self.riskfreerate, 1.0 / 1) - 1.0
+        excess = [r - rate for r in returns]
+        average = math.fsum(excess) / len(excess)
+        deviation = math.sqrt(math.fsum([pow(r - average, 2.0) for r in excess]) / len(excess))
+        try:
+            return average / deviation
+        except ZeroDivisionError:
+            return None